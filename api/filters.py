@@ -1,8 +1,26 @@
+import hashlib
+import json
+
 import django_filters
+from django.core.exceptions import ValidationError
+
+from items import geo
 from items.models import Item
+from orders.models import Order
 from users.models import CustomUser
 
 
+def parse_point(value):
+    """"lat,lon" -> (lat, lon) floats, or ValidationError."""
+    try:
+        lat, lon = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValidationError("Expected latitude,longitude.")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValidationError("Latitude must be within ±90 and longitude within ±180.")
+    return lat, lon
+
+
 class ItemFilter(django_filters.FilterSet):
     """
     Filters for Items:
@@ -13,6 +31,7 @@ class ItemFilter(django_filters.FilterSet):
     - Price range
     - Date range
     - Location search
+    - Radius search around a point (nearest first)
     - Free/paid filter
     """
 
@@ -92,6 +111,26 @@ class ItemFilter(django_filters.FilterSet):
         label="Location search"
     )
 
+    #Geo search: items within radius_km of near=lat,lon, nearest first
+    near = django_filters.CharFilter(
+        method="filter_near",
+        validators=[parse_point],
+        label="Near (lat,lon)"
+    )
+
+    radius_km = django_filters.NumberFilter(
+        method="filter_radius",
+        min_value=0,
+        max_value=geo.geo_settings()["MAX_RADIUS_KM"],
+        label="Radius in km around near"
+    )
+
+    def filter_near(self, queryset, name, value):
+        return queryset  # applied last, in filter_queryset()
+
+    def filter_radius(self, queryset, name, value):
+        return queryset  # read by filter_queryset()
+
     #Free items only
     is_free = django_filters.BooleanFilter(
         field_name="is_free",
@@ -112,5 +151,70 @@ class ItemFilter(django_filters.FilterSet):
             "created_after",
             "created_before",
             "location",
+            "near",
+            "radius_km",
             "is_free",
         ]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # the radius search keeps only the nearest MAX_RESULTS of the queryset
+        # it gets, so it has to run after every other filter has narrowed it
+        point = self.form.cleaned_data.get("near")
+        if not point:
+            return queryset
+        lat, lon = parse_point(point)
+        radius = self.form.cleaned_data.get("radius_km")
+        if radius is None:
+            radius = geo.geo_settings()["DEFAULT_RADIUS_KM"]
+        return geo.near(queryset, lat, lon, float(radius))
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Filters for Orders (list and both CSV exports):
+    - Status
+    - Date range
+    """
+
+    status = django_filters.CharFilter(
+        field_name="status",
+        lookup_expr="iexact"
+    )
+
+    created_after = django_filters.DateFilter(
+        field_name="created_at",
+        lookup_expr="gte"
+    )
+
+    created_before = django_filters.DateFilter(
+        field_name="created_at",
+        lookup_expr="date__lte"
+    )
+
+    class Meta:
+        model = Order
+        fields = ["status", "created_after", "created_before"]
+
+
+def filter_signature(filterset, exclude=()):
+    """
+    Stable hash of a validated filterset's effective filters, so equivalent
+    queries (parameter order, case of case-insensitive filters, 10 vs 10.00,
+    empty parameters) share a cache entry.
+    """
+    normalized = {}
+    for name, value in filterset.form.cleaned_data.items():
+        if name in exclude or value in (None, "", [], ()):
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+            if filterset.filters[name].lookup_expr.startswith("i"):
+                value = value.lower()
+        elif hasattr(value, "normalize"):  # Decimal
+            value = value.normalize()
+        normalized[name] = str(value)
+    payload = json.dumps(normalized, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
@@ -0,0 +1,93 @@
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from items import autocomplete
+from items.models import Item
+from users.models import CustomUser
+
+
+WORDS = (
+    "vintage leather sofa chair table lamp mountain bike helmet guitar amp "
+    "phone case laptop stand kettle blender baby stroller cot desk shelf "
+    "novel textbook jacket boots dress camera lens speaker fridge fan"
+).split()
+QUERIES = ("b", "bi", "bik", "bike h", "lea", "vintage le", "zzz")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time /api/autocomplete/ against the ?search= catalog list the search box "
+        "used to call on every keystroke. --seed adds published items inside a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Published items to add (e.g. 1000000).")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            self.run(options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        seller = CustomUser.objects.bulk_create_users(
+            [CustomUser(email="bench-autocomplete@regive.local", full_name="Benchmark", role="SELLER")]
+        )[0]
+        rng = random.Random(43)
+        for start in range(0, count, 5000):
+            Item.objects.bulk_create(
+                Item(
+                    seller=seller,
+                    name=" ".join(rng.sample(WORDS, rng.randint(2, 4))).capitalize(),
+                    slug=f"bench-autocomplete-{n}",
+                    price=Decimal(rng.randrange(100, 50000)) / 100,
+                    location="Lagos",
+                )
+                for n in range(start, min(start + 5000, count))
+            )
+        self.stdout.write(f"seeded {count:,} items in {time.perf_counter() - started:.1f}s")
+
+    def run(self, repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        index = autocomplete.build_index()
+        build_s = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        autocomplete.reset_index(index)
+        self.stdout.write(
+            f"{len(index):,} entries, {len(index.keys):,} keys, built in {build_s:.1f}s, ~{memory / 2**20:.0f} MiB"
+        )
+
+        client = APIClient()
+        self.stdout.write(f"  {'query':<12} {'search list ms':>14} {'index us':>9} {'endpoint ms':>11} {'queries':>7}")
+        with override_settings(ALLOWED_HOSTS=["testserver"], CATALOG_CACHE_TIMEOUT=0):
+            for query in QUERIES:
+                list_ms = self.best(lambda: client.get("/api/public-items/", {"search": query, "page_size": 8}), 1)
+                index_us = self.best(lambda: index.search(query, 8), repeat * 20) * 1000
+                endpoint_ms = self.best(lambda: client.get("/api/autocomplete/", {"q": query}), repeat)
+                with CaptureQueriesContext(connection) as queries:
+                    client.get("/api/autocomplete/", {"q": query})
+                self.stdout.write(
+                    f"  {query!r:<12} {list_ms:>14.1f} {index_us:>9.1f} {endpoint_ms:>11.2f} {len(queries):>7}"
+                )
+        autocomplete.reset_index()
+
+    def best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
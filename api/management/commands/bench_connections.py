@@ -0,0 +1,172 @@
+import asyncio
+import http.client
+import statistics
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from regive import db_pool
+from users.models import CustomUser
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests/second against a local WSGI server with CONN_MAX_AGE=0 "
+        "(connect per request) and with persistent connections, then against "
+        "Django's ASGI handler, driven in-process with --concurrency requests in "
+        "flight, without and with the connection pool (regive.db_pool). Works "
+        "against MySQL or a SQLite stand-in (DB_ENGINE=django.db.backends.sqlite3)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/profile/", help="Endpoint to hit.")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--max-age", type=int, default=60, help="CONN_MAX_AGE for the persistent run.")
+        parser.add_argument("--concurrency", type=int, default=10, help="ASGI requests in flight at once.")
+        parser.add_argument(
+            "--email",
+            default="bench@regive.local",
+            help="User to authenticate as (created if missing).",
+        )
+
+    def handle(self, *args, **options):
+        user, _ = CustomUser.objects.get_or_create(
+            email=options["email"], defaults={"full_name": "Benchmark"}
+        )
+        token = str(AccessToken.for_user(user))
+        alias_settings = connections.settings["default"]
+        original_max_age = alias_settings.get("CONN_MAX_AGE", 0)
+
+        with override_settings(ALLOWED_HOSTS=["127.0.0.1"]):
+            server = make_server("127.0.0.1", 0, WSGIHandler(), WSGIServer, QuietHandler)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                results = []
+                for label, max_age in (("CONN_MAX_AGE=0", 0), (f"CONN_MAX_AGE={options['max_age']}", options["max_age"])):
+                    # The server thread reads this dict when it (re)connects.
+                    alias_settings["CONN_MAX_AGE"] = max_age
+                    results.append((label, self.run(server.server_port, options["path"], token, options["requests"])))
+            finally:
+                alias_settings["CONN_MAX_AGE"] = original_max_age
+                server.shutdown()
+                server.server_close()
+
+        self.stdout.write(f"{options['requests']} x GET {options['path']} ({alias_settings['ENGINE']})")
+        for label, (rps, mean_ms, p95_ms) in results:
+            self.stdout.write(f"  {label:<18} {rps:8.1f} req/s   mean {mean_ms:6.2f} ms   p95 {p95_ms:6.2f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Speed-up: {results[1][1][0] / results[0][1][0]:.2f}x"))
+
+        self.stdout.write(f"ASGI, {options['concurrency']} in flight")
+        asgi_results = []
+        for label, enabled in (("no pool", False), ("pooled", True)):
+            db_pool.close_all()
+            with override_settings(ALLOWED_HOSTS=["127.0.0.1"], DATABASE_POOL={**db_pool.pool_settings(), "ENABLED": enabled}):
+                handler = ASGIHandler()  # middleware reads DATABASE_POOL when loaded
+                rps, mean_ms, p95_ms = asyncio.run(
+                    self.run_asgi(handler, options["path"], token, options["requests"], options["concurrency"])
+                )
+            asgi_results.append(rps)
+            self.stdout.write(f"  {label:<18} {rps:8.1f} req/s   mean {mean_ms:6.2f} ms   p95 {p95_ms:6.2f} ms")
+            for stats in db_pool.pool_stats():
+                self.stdout.write(
+                    f"    pool {stats['alias']}: {stats['created']} connections opened, "
+                    f"{stats['waits']} waits, {stats['timeouts']} timeouts"
+                )
+        db_pool.close_all()
+        self.stdout.write(self.style.SUCCESS(f"Speed-up: {asgi_results[1] / asgi_results[0]:.2f}x"))
+
+    def run(self, port, path, token, count):
+        headers = {"Authorization": f"Bearer {token}", "Host": "127.0.0.1"}
+        # warm-up so imports/URL resolution don't count
+        self.fetch(port, path, headers)
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(count):
+            t0 = time.perf_counter()
+            self.fetch(port, path, headers)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - started
+
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        return count / elapsed, statistics.mean(latencies), p95
+
+    def fetch(self, port, path, headers):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f"GET {path} returned {response.status}")
+        finally:
+            conn.close()
+
+    async def run_asgi(self, handler, path, token, count, concurrency):
+        headers = [(b"host", b"127.0.0.1"), (b"authorization", f"Bearer {token}".encode())]
+        await self.fetch_asgi(handler, path, headers)
+
+        latencies = []
+        queue = asyncio.Queue()
+        for _ in range(count):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                t0 = time.perf_counter()
+                await self.fetch_asgi(handler, path, headers)
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        return count / elapsed, statistics.mean(latencies), p95
+
+    async def fetch_asgi(self, handler, path, headers):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("127.0.0.1", 80),
+        }
+        body_sent = False
+        statuses = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Future()  # the client never disconnects
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        await handler(scope, receive, send)
+        if statuses != [200]:
+            raise RuntimeError(f"GET {path} returned {statuses}")
@@ -0,0 +1,131 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.filters import ItemFilter
+from items import facets
+from items.models import Category, Item
+from users.models import CustomUser
+
+
+# The first two are served from the facet index, the rest by a grouped query.
+FILTER_SETS = [
+    ("no filters", {}),
+    ("category", {"category": "bench-facets-3"}),
+    ("condition + price", {"condition": "USED", "price_max": "100"}),
+    ("location search", {"location": "lagos"}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time /api/public-items/facets/ against one COUNT query per facet value "
+        "(what the storefront used to send). --seed adds published items inside a "
+        "transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Published items to add (e.g. 1000000).")
+        parser.add_argument("--categories", type=int, default=30)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"], options["categories"])
+            self.stdout.write(f"{Item.objects.filter(status='PUBLISHED').count():,} published items")
+            self.stdout.write(f"  {'filters':<20} {'per value ms':>12} {'queries':>8} {'uncached ms':>11} {'cached ms':>10}")
+            for label, params in FILTER_SETS:
+                self.report(label, params, options["repeat"])
+
+            published = Item.objects.filter(status="PUBLISHED")
+            if facets.count_facets(facets.index_rows(), {}) != facets.count_facets(
+                facets.facet_rows(published, facets.price_buckets()), {}
+            ):
+                self.stdout.write(self.style.WARNING("Facet index is out of date: run rebuild_catalog_facets."))
+            transaction.set_rollback(True)
+
+    def seed(self, count, categories):
+        started = time.perf_counter()
+        seller = CustomUser.objects.bulk_create_users(
+            [CustomUser(email="bench-facets@regive.local", full_name="Benchmark", role="SELLER")]
+        )[0]
+        category_ids = [
+            category.pk
+            for category in Category.objects.bulk_create(
+                Category(name=f"Bench facets {n}", slug=f"bench-facets-{n}") for n in range(categories)
+            )
+        ]
+        rng = random.Random(41)
+        conditions = [value for value, _ in Item.CONDITION_CHOICES]
+        for start in range(0, count, 5000):
+            batch = []
+            for n in range(start, min(start + 5000, count)):
+                is_free = rng.random() < 0.1
+                batch.append(
+                    Item(
+                        seller=seller,
+                        name=f"Benchmark item {n}",
+                        slug=f"bench-facets-{n}",
+                        category_id=rng.choice(category_ids),
+                        condition=rng.choice(conditions),
+                        is_free=is_free,
+                        price=Decimal(0) if is_free else Decimal(rng.randrange(100, 50000)) / 100,
+                        location=rng.choice(["Lagos", "Abuja", "Ibadan", "Kano"]),
+                    )
+                )
+            Item.objects.bulk_create(batch)
+        cells = facets.rebuild_index()  # bulk_create() skips the signals that maintain it
+        self.stdout.write(f"seeded {count:,} items, {cells} facet index cells in {time.perf_counter() - started:.1f}s")
+
+    def report(self, label, params, repeat):
+        base = Item.objects.filter(status="PUBLISHED")
+        filterset = ItemFilter(params, queryset=base)
+        filterset.is_valid()
+
+        def per_value():
+            queries = 0
+            for field, values in (
+                ("category__slug", Category.objects.values_list("slug", flat=True)),
+                ("condition", [value for value, _ in Item.CONDITION_CHOICES]),
+                ("is_free", [True, False]),
+            ):
+                for value in values:
+                    filterset.qs.filter(**{field: value}).count()
+                    queries += 1
+            lower = [0, *facets.price_buckets()]
+            for low, high in zip(lower, [*lower[1:], None]):
+                price = {"price__gte": low, **({"price__lt": high} if high is not None else {})}
+                filterset.qs.filter(**price).count()
+                queries += 1
+            return queries
+
+        queries = per_value()
+        per_value_ms = self.best(per_value, repeat)
+
+        cache.clear()
+        client = APIClient()
+        with override_settings(ALLOWED_HOSTS=["testserver"], CATALOG_CACHE_TIMEOUT=0):
+            def uncached():
+                cache.clear()
+                client.get("/api/public-items/facets/", params)
+
+            uncached_ms = self.best(uncached, repeat)
+            client.get("/api/public-items/facets/", params)
+            cached_ms = self.best(lambda: client.get("/api/public-items/facets/", params), repeat)
+
+        self.stdout.write(f"  {label:<20} {per_value_ms:>12.1f} {queries:>8} {uncached_ms:>11.1f} {cached_ms:>10.2f}")
+
+    def best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,106 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from items import geo
+from items.models import Item
+from users.models import CustomUser
+
+
+# Lagos Island; seeded items are spread over Nigeria's bounding box.
+CENTER = (6.4550, 3.3841)
+AREA = {"lat": (4.3, 13.9), "lon": (2.7, 14.7)}
+RADII_KM = (1, 5, 25, 100)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ?near= radius search (geohash ranges + batch haversine) against a "
+        "location icontains search and a haversine pass over every geotagged item. "
+        "--seed adds geotagged items inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Geotagged items to add (e.g. 1000000).")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            self.run(options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        seller = CustomUser.objects.bulk_create_users(
+            [CustomUser(email="bench-geo@regive.local", full_name="Benchmark", role="SELLER")]
+        )[0]
+        rng = random.Random(42)
+        towns = ["Lagos", "Abuja", "Ibadan", "Kano", "Enugu"]
+        for start in range(0, count, 5000):
+            batch = []
+            for n in range(start, min(start + 5000, count)):
+                lat, lon = rng.uniform(*AREA["lat"]), rng.uniform(*AREA["lon"])
+                batch.append(
+                    Item(
+                        seller=seller,
+                        name=f"Benchmark item {n}",
+                        slug=f"bench-geo-{n}",
+                        price=Decimal(rng.randrange(100, 50000)) / 100,
+                        location=rng.choice(towns),
+                        latitude=lat,
+                        longitude=lon,
+                        geohash=geo.encode(lat, lon),  # bulk_create() skips Item.save()
+                    )
+                )
+            Item.objects.bulk_create(batch)
+
+        # planner statistics, so the (status, geohash) ranges are costed as selective
+        table = connection.ops.quote_name(Item._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {table}" if connection.vendor == "sqlite" else f"ANALYZE TABLE {table}")
+        self.stdout.write(f"seeded {count:,} items in {time.perf_counter() - started:.1f}s")
+
+    def run(self, repeat):
+        published = Item.objects.filter(status="PUBLISHED")
+        total = published.filter(latitude__isnull=False).count()
+        self.stdout.write(f"{total:,} geotagged published items, numpy {'on' if geo.numpy else 'off'}")
+
+        ms = self.best(lambda: list(published.filter(location__icontains="lagos").values_list("pk")[:500]), repeat)
+        self.stdout.write(f"  location icontains 'lagos' (first 500):       {ms:9.1f} ms")
+
+        def full_scan():
+            rows = list(published.filter(latitude__isnull=False).values_list("pk", "latitude", "longitude"))
+            _, lats, lons = zip(*rows)
+            return geo.haversine_km(*CENTER, lats, lons)
+
+        ms = self.best(full_scan, 1)
+        self.stdout.write(f"  haversine over every item:                    {ms:9.1f} ms")
+
+        client = APIClient()
+        self.stdout.write(f"  {'radius km':>9} {'ranges':>7} {'candidates':>11} {'hits':>6} {'search ms':>10} {'page ms':>8}")
+        for radius in RADII_KM:
+            ranges = geo.prefix_ranges(geo.covering_cells(*CENTER, radius))
+            candidates = published.filter(geo.ranges_q(ranges)).count()
+            hits = len(geo.nearby(published, *CENTER, radius))
+            search_ms = self.best(lambda: geo.nearby(published, *CENTER, radius), repeat)
+            params = {"near": f"{CENTER[0]},{CENTER[1]}", "radius_km": radius, "page_size": 20}
+            with override_settings(ALLOWED_HOSTS=["testserver"], CATALOG_CACHE_TIMEOUT=0):
+                page_ms = self.best(lambda: client.get("/api/public-items/", params), repeat)
+            self.stdout.write(
+                f"  {radius:>9} {len(ranges):>7} {candidates:>11,} {hits:>6} {search_ms:>10.1f} {page_ms:>8.1f}"
+            )
+
+    def best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
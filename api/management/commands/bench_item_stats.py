@@ -0,0 +1,139 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from cart.models import Cart, CartItem
+from items import stats
+from items.models import Item
+from orders.models import Order, OrderItem
+from users.models import CustomUser
+from wishlist.models import Wishlist
+
+
+class Command(BaseCommand):
+    help = (
+        "Time item popularity counts (wishlisted, in carts, sold) computed with "
+        "Count joins against the ItemStats counters (items.stats), for a catalog "
+        "page and a seller's totals, and time reconcile_item_stats. --seed adds "
+        "items, users, wishlists, carts and orders inside a transaction that is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Items to add (e.g. 100000); rows scale with it.")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            self.run(options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        rng = random.Random(49)
+        users = CustomUser.objects.bulk_create_users(
+            [CustomUser(email=f"bench-stats-{n}@regive.local", full_name="Benchmark", role="BUYER") for n in range(count // 10)]
+            + [CustomUser(email=f"bench-stats-seller-{n}@regive.local", full_name="Benchmark", role="SELLER") for n in range(10)],
+            batch_size=5000,
+        )
+        buyers, sellers = users[:-10], users[-10:]
+        for start in range(0, count, 5000):
+            Item.objects.bulk_create(
+                Item(seller=sellers[n % 10], name=f"Benchmark item {n}", slug=f"bench-stats-{n}", price=Decimal(5), status="PUBLISHED")
+                for n in range(start, min(start + 5000, count))
+            )
+        ids = list(Item.objects.filter(slug__startswith="bench-stats-").values_list("pk", flat=True))
+
+        def picks(size):
+            return rng.sample(ids, min(size, len(ids)))
+
+        Wishlist.objects.bulk_create(
+            (Wishlist(user=buyer, item_id=item_id) for buyer in buyers for item_id in picks(20)), batch_size=5000
+        )
+        carts = Cart.objects.bulk_create(Cart(buyer=buyer) for buyer in buyers)
+        CartItem.objects.bulk_create(
+            (CartItem(cart=cart, item_id=item_id, quantity=1) for cart in carts for item_id in picks(3)), batch_size=5000
+        )
+        orders = Order.objects.bulk_create(
+            (Order(buyer=buyer, total_amount=0, status=rng.choice(["PAID", "PAID", "CANCELLED"])) for buyer in buyers for _ in range(3)),
+            batch_size=5000,
+        )
+        OrderItem.objects.bulk_create(
+            (
+                OrderItem(order=order, item_id=item_id, quantity=rng.randint(1, 3), price=Decimal(5))
+                for order in orders
+                for item_id in picks(4)
+            ),
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            for model in (Item, Wishlist, CartItem, Order, OrderItem):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"ANALYZE {table}" if connection.vendor == "sqlite" else f"ANALYZE TABLE {table}")
+        self.stdout.write(
+            f"seeded {count:,} items, {Wishlist.objects.count():,} wishlist rows, {CartItem.objects.count():,} "
+            f"cart lines, {OrderItem.objects.count():,} order lines in {time.perf_counter() - started:.1f}s"
+        )
+
+    def run(self, repeat):
+        started = time.perf_counter()
+        checked, fixed, created = stats.reconcile()
+        self.stdout.write(
+            f"  reconcile_item_stats: {checked:,} items, {fixed:,} fixed, {created:,} created "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        published = Item.objects.filter(status="PUBLISHED")
+        page = list(published.order_by("-pk").values_list("pk", flat=True)[:20])
+        seller_id = published.order_by("-pk").values_list("seller_id", flat=True).first()
+
+        def joined_page():
+            # one Count per relation: separate subqueries, as three joins would multiply rows
+            return list(
+                Item.objects.filter(pk__in=page).values("pk").annotate(
+                    wishlisted=Count("wishlisted_by", distinct=True),
+                )
+            ), [
+                list(CartItem.objects.filter(item_id__in=page).values("item_id").annotate(n=Count("id"))),
+                list(
+                    OrderItem.objects.filter(item_id__in=page).exclude(order__status="CANCELLED")
+                    .values("item_id").annotate(n=Sum("quantity"))
+                ),
+            ]
+
+        def counters_page():
+            return list(Item.objects.filter(pk__in=page).values("pk", "stats__wishlist_count", "stats__cart_count", "stats__sold_count"))
+
+        def joined_totals():
+            return (
+                Wishlist.objects.filter(item__seller_id=seller_id).count(),
+                CartItem.objects.filter(item__seller_id=seller_id).count(),
+                OrderItem.objects.filter(item__seller_id=seller_id).exclude(order__status="CANCELLED").aggregate(n=Sum("quantity")),
+            )
+
+        def counters_totals():
+            return Item.objects.filter(seller_id=seller_id).aggregate(
+                Sum("stats__wishlist_count"), Sum("stats__cart_count"), Sum("stats__sold_count")
+            )
+
+        for label, fn in (
+            ("page of 20, Count queries", joined_page),
+            ("page of 20, counters", counters_page),
+            ("seller totals, Count queries", joined_totals),
+            ("seller totals, counters", counters_totals),
+        ):
+            self.stdout.write(f"  {label:<32} {self.best(fn, repeat):9.2f} ms")
+
+    def best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
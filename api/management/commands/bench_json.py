@@ -0,0 +1,94 @@
+import io
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from items.models import Item
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch /api/public-items/?page_size=N once, then time DRF's JSONRenderer/"
+        "JSONParser against FastJSONRenderer/FastJSONParser on that payload and "
+        "check both produce identical output. --seed adds temporary published "
+        "items when the catalog is smaller than the page."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=200)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--seed", action="store_true", help="Create missing items (removed afterwards).")
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        seller = None
+        missing = page_size - Item.objects.filter(status="PUBLISHED").count()
+        if missing > 0 and options["seed"]:
+            seller = CustomUser.objects.bulk_create_users(
+                [CustomUser(email="bench-json@regive.local", full_name="Benchmark", role="SELLER")]
+            )[0]
+            Item.objects.bulk_create(
+                Item(
+                    seller=seller,
+                    name=f"Benchmark item {n}",
+                    slug=f"bench-json-{n}",
+                    description="Lightly used, collection only. " * 4,
+                    price=Decimal("19.99") + n,
+                    location="Lagos",
+                )
+                for n in range(missing)
+            )
+
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                response = APIClient().get("/api/public-items/", {"page_size": page_size})
+            if response.status_code != 200:
+                raise CommandError(f"/api/public-items/ returned {response.status_code}")
+            data = response.data
+        finally:
+            if seller is not None:
+                with transaction.atomic():
+                    seller.delete()
+
+        rows = len(data["results"])
+        if rows < page_size:
+            self.stdout.write(self.style.WARNING(f"Only {rows} published items; use --seed for a full page."))
+
+        stdlib_bytes = JSONRenderer().render(data)
+        fast_bytes = FastJSONRenderer().render(data)
+        if stdlib_bytes != fast_bytes:
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer")
+
+        iterations = options["iterations"]
+        self.stdout.write(
+            f"{rows} items, {len(stdlib_bytes):,} bytes, {iterations} iterations "
+            f"(orjson {'available' if orjson else 'NOT installed: fallback'})"
+        )
+        self.stdout.write(f"  {'':<10} {'stdlib ms':>10} {'fast ms':>10} {'speed-up':>9}")
+        for label, slow, fast in (
+            ("render", lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+            (
+                "parse",
+                lambda: JSONParser().parse(io.BytesIO(stdlib_bytes)),
+                lambda: FastJSONParser().parse(io.BytesIO(stdlib_bytes)),
+            ),
+        ):
+            slow_ms = self.time(slow, iterations)
+            fast_ms = self.time(fast, iterations)
+            self.stdout.write(f"  {label:<10} {slow_ms:10.3f} {fast_ms:10.3f} {slow_ms / fast_ms:8.1f}x")
+
+    def time(self, func, iterations):
+        func()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) * 1000 / iterations
@@ -0,0 +1,140 @@
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from items import related
+from items.models import Category, Item
+from orders.models import Order, OrderItem
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Time and measure build_related_items (numpy and pure Python) and the "
+        "/related/ endpoint against a per-request co-occurrence query. --seed adds "
+        "order lines inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Order lines to add (e.g. 1000000).")
+        parser.add_argument("--items", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"], options["items"])
+            self.run(options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, lines, item_count):
+        started = time.perf_counter()
+        seller, buyer = CustomUser.objects.bulk_create_users([
+            CustomUser(email="bench-related-seller@regive.local", full_name="Benchmark", role="SELLER"),
+            CustomUser(email="bench-related-buyer@regive.local", full_name="Benchmark", role="BUYER"),
+        ])
+        categories = Category.objects.bulk_create(
+            Category(name=f"Bench related {n}", slug=f"bench-related-{n}") for n in range(20)
+        )
+        item_ids = []
+        for start in range(0, item_count, 5000):
+            item_ids += [
+                item.pk
+                for item in Item.objects.bulk_create(
+                    Item(
+                        seller=seller,
+                        name=f"Benchmark item {n}",
+                        slug=f"bench-related-{n}",
+                        category=categories[n % len(categories)],
+                        price=Decimal(5),
+                    )
+                    for n in range(start, min(start + 5000, item_count))
+                )
+            ]
+        # half the picks skewed towards a few popular items, half uniform
+        rng = random.Random(45)
+
+        def pick():
+            if rng.random() < 0.5:
+                return item_ids[min(int(rng.paretovariate(0.8)) - 1, len(item_ids) - 1)]
+            return rng.choice(item_ids)
+
+        written = 0
+        while written < lines:
+            orders = Order.objects.bulk_create(Order(buyer=buyer, total_amount=Decimal(10)) for _ in range(2000))
+            batch = []
+            for order in orders:
+                size = min(rng.randint(1, 7), lines - written - len(batch))
+                picks = {pick() for _ in range(size)}
+                batch += [OrderItem(order=order, item_id=item_id, price=Decimal(5)) for item_id in picks]
+                if written + len(batch) >= lines:
+                    break
+            OrderItem.objects.bulk_create(batch, batch_size=5000)
+            written += len(batch)
+        with connection.cursor() as cursor:
+            for model in (Item, OrderItem):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"ANALYZE {table}" if connection.vendor == "sqlite" else f"ANALYZE TABLE {table}")
+        self.stdout.write(f"seeded {written:,} order lines over {item_count:,} items in {time.perf_counter() - started:.1f}s")
+
+    def run(self, repeat):
+        self.stdout.write(f"{OrderItem.objects.count():,} order lines")
+        started = time.perf_counter()
+        rows = related.basket_rows()
+        self.stdout.write(f"  load basket rows:              {time.perf_counter() - started:9.2f} s")
+
+        options = related.related_settings()
+        numpy = related.numpy
+        for label, module_numpy in (("numpy", numpy), ("pure Python", None)):
+            if label == "numpy" and numpy is None:
+                continue
+            related.numpy = module_numpy
+            combined = related.combine(rows, ("order", "cart", "wishlist"), options["WEIGHTS"])
+            started = time.perf_counter()
+            result = related.neighbours(*combined, options)
+            elapsed = time.perf_counter() - started
+            tracemalloc.start()
+            related.neighbours(*combined, options)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.stdout.write(
+                f"  co-occurrence, {label:<12}   {elapsed:9.2f} s, peak {peak / 2**20:6.0f} MiB, {len(result):,} items"
+            )
+        related.numpy = numpy
+
+        started = time.perf_counter()
+        stored = related.build()
+        self.stdout.write(f"  build_related_items (total):   {time.perf_counter() - started:9.2f} s, {stored:,} rows")
+
+        popular = OrderItem.objects.values("item_id").annotate(n=Count("pk")).order_by("-n")[0]["item_id"]
+
+        def per_request():
+            return list(
+                OrderItem.objects.filter(order__items__item_id=popular)
+                .exclude(item_id=popular)
+                .values("item_id")
+                .annotate(together=Count("order_id", distinct=True))
+                .order_by("-together")
+                .values_list("item_id", flat=True)[: options["TOP_N"]]
+            )
+
+        self.stdout.write(f"  per-request co-occurrence SQL: {self.best(per_request, 1):9.1f} ms (most ordered item)")
+        client = APIClient()
+        with override_settings(ALLOWED_HOSTS=["testserver"], CATALOG_CACHE_TIMEOUT=0):
+            ms = self.best(lambda: client.get(f"/api/public-items/{popular}/related/"), repeat)
+        self.stdout.write(f"  /related/ endpoint:            {ms:9.1f} ms")
+
+    def best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
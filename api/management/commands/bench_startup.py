@@ -0,0 +1,79 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Cold worker: import the WSGI app, then serve one request through it. The
+# URLconf is loaded lazily by the first request, as under gunicorn.
+WORKER_SCRIPT = """
+import json, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.time()
+
+from django.conf import settings
+settings.ALLOWED_HOSTS = ["localhost"]
+environ = {"PATH_INFO": sys.argv[1], "HTTP_HOST": "localhost", "wsgi.input": BytesIO()}
+setup_testing_defaults(environ)
+statuses = []
+b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+print(json.dumps({"ready": ready, "served": time.time(), "status": statuses[0]}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure time-to-first-request of a cold worker process (interpreter start, "
+        "django.setup(), URLconf, one GET) with full settings and with API_ONLY=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/categories/", help="Endpoint for the first request.")
+        parser.add_argument("--runs", type=int, default=5, help="Cold starts per mode.")
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, api_only in (("full", "False"), ("API_ONLY", "True")):
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "regive.settings"),
+                "API_ONLY": api_only,
+                "PYTHONWARNINGS": "ignore",
+            }
+            results[label] = [self.cold_start(env, options["path"]) for _ in range(options["runs"])]
+
+        self.stdout.write(f"GET {options['path']}, median of {options['runs']} cold starts")
+        self.stdout.write(f"  {'settings':<10} {'ready ms':>9} {'first response ms':>18}")
+        for label, runs in results.items():
+            ready = statistics.median(run[0] for run in runs)
+            served = statistics.median(run[1] for run in runs)
+            self.stdout.write(f"  {label:<10} {ready:9.0f} {served:18.0f}")
+        full = statistics.median(run[1] for run in results["full"])
+        api_only = statistics.median(run[1] for run in results["API_ONLY"])
+        self.stdout.write(self.style.SUCCESS(f"API_ONLY saves {full - api_only:.0f} ms ({full / api_only:.2f}x)"))
+
+    def cold_start(self, env, path):
+        started = time.time()
+        result = subprocess.run(
+            [sys.executable, "-c", WORKER_SCRIPT, path],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        try:
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            raise CommandError(f"Worker failed:\n{result.stderr[-2000:]}")
+        if not timings["status"].startswith("2"):
+            raise CommandError(f"GET {path} returned {timings['status']}")
+        return (timings["ready"] - started) * 1000, (timings["served"] - started) * 1000
@@ -0,0 +1,105 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from items import trending
+from items.models import Category, Item, ItemTrendScore
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Time refresh_trending and /api/public-items/trending/ against ranking by "
+        "counting wishlist, cart and order rows per request. --seed adds published "
+        "items (a share of them with trending scores) inside a transaction that is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Published items to add (e.g. 1000000).")
+        parser.add_argument("--active", type=float, default=0.1, help="Share of seeded items with recent activity.")
+        parser.add_argument("--categories", type=int, default=30)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"], options["active"], options["categories"])
+            self.run(options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, count, active, categories):
+        started = time.perf_counter()
+        seller = CustomUser.objects.bulk_create_users(
+            [CustomUser(email="bench-trending@regive.local", full_name="Benchmark", role="SELLER")]
+        )[0]
+        category_ids = [
+            category.pk
+            for category in Category.objects.bulk_create(
+                Category(name=f"Bench trending {n}", slug=f"bench-trending-{n}") for n in range(categories)
+            )
+        ]
+        rng = random.Random(44)
+        now = trending.epoch_units()
+        for start in range(0, count, 5000):
+            items = Item.objects.bulk_create(
+                Item(
+                    seller=seller,
+                    name=f"Benchmark item {n}",
+                    slug=f"bench-trending-{n}",
+                    category_id=rng.choice(category_ids),
+                    price=Decimal(rng.randrange(100, 50000)) / 100,
+                )
+                for n in range(start, min(start + 5000, count))
+            )
+            ItemTrendScore.objects.bulk_create(
+                ItemTrendScore(item=item, score=rng.paretovariate(1.2) * now) for item in items if rng.random() < active
+            )
+        # planner statistics, so pk IN (...) lookups aren't costed as status scans
+        with connection.cursor() as cursor:
+            for model in (Item, ItemTrendScore):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"ANALYZE {table}" if connection.vendor == "sqlite" else f"ANALYZE TABLE {table}")
+        self.stdout.write(f"seeded {count:,} items in {time.perf_counter() - started:.1f}s")
+
+    def run(self, repeat):
+        published = Item.objects.filter(status="PUBLISHED")
+        self.stdout.write(
+            f"{published.count():,} published items, {ItemTrendScore.objects.count():,} with trending scores"
+        )
+
+        def per_request():
+            return list(
+                published.annotate(
+                    popularity=Count("wishlisted_by", distinct=True)
+                    + Count("cart_items", distinct=True)
+                    + Count("orderitem", distinct=True)
+                )
+                .filter(Q(popularity__gt=0))
+                .order_by("-popularity")
+                .values_list("pk", flat=True)[:50]
+            )
+
+        self.stdout.write(f"  count joins per request:       {self.best(per_request, 1):9.1f} ms")
+        self.stdout.write(f"  refresh_trending:              {self.best(trending.refresh, repeat):9.1f} ms")
+        client = APIClient()
+        category = Category.objects.filter(slug__startswith="bench-trending-").values_list("slug", flat=True).first()
+        with override_settings(ALLOWED_HOSTS=["testserver"], CATALOG_CACHE_TIMEOUT=0):
+            ms = self.best(lambda: client.get("/api/public-items/trending/", {"limit": 20}), repeat)
+            self.stdout.write(f"  /trending/ (overall, 20):      {ms:9.1f} ms")
+            ms = self.best(lambda: client.get("/api/public-items/trending/", {"category": category, "limit": 20}), repeat)
+            self.stdout.write(f"  /trending/?category= (20):     {ms:9.1f} ms")
+
+    def best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
@@ -0,0 +1,87 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from items import viewcounts
+from items.models import Item, ItemStats
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Time buffered item view counting (items.viewcounts) against one UPDATE per "
+        "view, and the flush for growing numbers of distinct items. --seed adds "
+        "items inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Published items to add (e.g. 1000000).")
+        parser.add_argument("--views", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            self.run(options["views"])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        seller = CustomUser.objects.bulk_create_users(
+            [CustomUser(email="bench-views@regive.local", full_name="Benchmark", role="SELLER")]
+        )[0]
+        for start in range(0, count, 5000):
+            Item.objects.bulk_create(
+                Item(seller=seller, name=f"Benchmark item {n}", slug=f"bench-views-{n}", price=Decimal(5))
+                for n in range(start, min(start + 5000, count))
+            )
+        item_ids = Item.objects.filter(seller=seller).values_list("pk", flat=True)
+        ItemStats.objects.bulk_create((ItemStats(item_id=pk) for pk in item_ids.iterator()), batch_size=5000)
+        with connection.cursor() as cursor:
+            for model in (Item, ItemStats):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"ANALYZE {table}" if connection.vendor == "sqlite" else f"ANALYZE TABLE {table}")
+        self.stdout.write(f"seeded {count:,} items in {time.perf_counter() - started:.1f}s")
+
+    def run(self, views):
+        ids = list(Item.objects.order_by().values_list("pk", flat=True)[:200000])
+        rng = random.Random(46)
+        # a few hot items take most views
+        stream = [ids[min(int(rng.paretovariate(1.0)) - 1, len(ids) - 1)] for _ in range(views)]
+        self.stdout.write(f"{len(ids):,} items, {views:,} views over {len(set(stream)):,} of them")
+
+        started = time.perf_counter()
+        for pk in stream:
+            ItemStats.objects.filter(pk=pk).update(view_count=F("view_count") + 1)
+        per_view = time.perf_counter() - started
+        self.stdout.write(f"  UPDATE per view:        {per_view * 1000:9.1f} ms total, {per_view / views * 1e6:8.1f} us/view")
+
+        buffer = viewcounts.ViewBuffer()
+        with override_settings(VIEW_COUNTS={"FLUSH_INTERVAL": 10**9, "MAX_PENDING": 10**9}):
+            started = time.perf_counter()
+            for pk in stream:
+                buffer.add(pk)
+            added = time.perf_counter() - started
+            started = time.perf_counter()
+            entries = buffer.flush()
+            flushed = time.perf_counter() - started
+        self.stdout.write(
+            f"  buffered + one flush:   {(added + flushed) * 1000:9.1f} ms total, {(added + flushed) / views * 1e6:8.1f} us/view "
+            f"(flush of {entries:,} entries: {flushed * 1000:.1f} ms)"
+        )
+
+        today = timezone.localdate()
+        self.stdout.write(f"  {'distinct items':>14} {'flush ms':>9}")
+        for size in (100, 1000, 2000, 10000):
+            buffer = viewcounts.ViewBuffer()
+            for pk in rng.sample(ids, min(size, len(ids))):
+                buffer.pending[(pk, today)] = rng.randint(1, 5)
+            started = time.perf_counter()
+            buffer.flush()
+            self.stdout.write(f"  {size:>14,} {(time.perf_counter() - started) * 1000:>9.1f}")
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from items.models import Item
+from notifications.models import Notification
+from users.models import CustomUser
+from wishlist import alerts
+from wishlist.models import Wishlist, WishlistAlert
+
+
+class Command(BaseCommand):
+    help = (
+        "Time wishlist price-drop alerts (wishlist.alerts) for one item wishlisted "
+        "by --wishlisters users: the cost added to Item.save(), and the debounced "
+        "keyset fan-out, against notifying every wishlister from the save. Runs "
+        "inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wishlisters", type=int, default=100000)
+        parser.add_argument(
+            "--naive-sample", type=int, default=5000,
+            help="Wishlisters notified one by one for the naive timing (scaled up to all of them).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            item = self.seed(options["wishlisters"])
+            self.run(item, options["wishlisters"], options["naive_sample"])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        seller, *buyers = CustomUser.objects.bulk_create_users(
+            [CustomUser(email="bench-alerts-seller@regive.local", full_name="Benchmark", role="SELLER")]
+            + [
+                CustomUser(email=f"bench-alerts-{n}@regive.local", full_name="Benchmark", role="BUYER")
+                for n in range(count)
+            ],
+            batch_size=5000,
+        )
+        item = Item.objects.create(seller=seller, name="Benchmark lamp", price=Decimal(100), status="PUBLISHED")
+        Wishlist.objects.bulk_create((Wishlist(user=buyer, item=item) for buyer in buyers), batch_size=5000)
+        with connection.cursor() as cursor:
+            for model in (Wishlist, Notification):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"ANALYZE {table}" if connection.vendor == "sqlite" else f"ANALYZE TABLE {table}")
+        self.stdout.write(f"seeded 1 item wishlisted by {count:,} users in {time.perf_counter() - started:.1f}s")
+        return item
+
+    def run(self, item, count, sample):
+        # naive: notify every wishlister from the save itself
+        wishlisters = Wishlist.objects.filter(item=item).values_list("user_id", flat=True)
+        started = time.perf_counter()
+        with transaction.atomic():
+            for user_id in wishlisters[:sample]:
+                Notification.objects.create(user_id=user_id, title="Price drop", message="...")
+            transaction.set_rollback(True)
+        naive = (time.perf_counter() - started) / sample * count
+        self.stdout.write(f"  notify from save(), one row per wishlister: {naive:9.2f} s per save (from {sample:,})")
+
+        # five edits in a row: each arms the same alert. The arming runs on
+        # commit, which never comes in here; run it as part of the save.
+        timings = []
+        for price in (95, 90, 80, 85, 82):
+            item.price = Decimal(price)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                with TestCase.captureOnCommitCallbacks(execute=True):
+                    item.save()
+                timings.append((time.perf_counter() - started) * 1000)
+        pending = WishlistAlert.objects.filter(item=item, pending=True).count()
+        self.stdout.write(
+            f"  save() with alerts:                        {min(timings):9.2f} ms "
+            f"({len(queries.captured_queries)} queries, with on-commit), {pending} pending alert after 5 edits"
+        )
+
+        later = timezone.now() + timedelta(seconds=alerts.alert_settings()["QUIET_SECONDS"] + 1)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            sent, notified = alerts.send_due(later)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"  send_wishlist_alerts fan-out:              {elapsed:9.2f} s "
+            f"({sent} alert, {notified:,} notifications, {len(queries.captured_queries)} queries)"
+        )
+        rows = Notification.objects.filter(kind=Notification.Kinds.PRICE_DROP).values_list("message", flat=True)
+        self.stdout.write(f"  message: {rows.first()}")
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from api.schema import SchemaArtifact, schema_dir, source_fingerprint
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the OpenAPI schema (YAML and JSON) with gzip/brotli variants into "
+        "OPENAPI_SCHEMA_DIR, named by content hash. Run on deploy; /api/schema/ "
+        "serves the result without introspecting views at request time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", help="Defaults to settings.OPENAPI_SCHEMA_DIR.")
+
+    def handle(self, *args, **options):
+        directory = Path(options["output_dir"]) if options["output_dir"] else schema_dir()
+        artifact = SchemaArtifact.build(source_fingerprint())
+        artifact.write(directory)
+
+        for (fmt, encoding), data in sorted(artifact.variants.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+            self.stdout.write(f"  {artifact.filename(fmt, encoding):<36} {len(data):>9,} bytes")
+        self.stdout.write(self.style.SUCCESS(f"Schema {artifact.content_hash} written to {directory}"))
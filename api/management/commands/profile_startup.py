@@ -0,0 +1,100 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What a worker imports before it can serve: app registry plus the URLconf
+# (which pulls in every view, serializer and schema decorator).
+STARTUP_SCRIPT = """
+import importlib
+import django
+django.setup()
+from django.conf import settings
+importlib.import_module(settings.ROOT_URLCONF)
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def owner(module, apps):
+    """The installed app (longest dotted prefix) or top-level package a module belongs to."""
+    for app in apps:
+        if module == app or module.startswith(app + "."):
+            return app
+    return module.split(".")[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a fresh interpreter with `-X importtime`, run django.setup() and load "
+        "the URLconf, and report import cost per installed app (or top-level "
+        "package). 'self' is time spent in the group's own modules; 'cumulative' "
+        "is the outermost import of the group, including what it pulled in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20, help="Rows to show.")
+        parser.add_argument(
+            "--api-only",
+            action="store_true",
+            help="Profile with API_ONLY=True (see settings.API_ONLY).",
+        )
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "regive.settings")}
+        if options["api_only"]:
+            env["API_ONLY"] = "True"
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        rows = parse_importtime(result.stderr)
+        if result.returncode != 0 or not rows:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+        # app labels sorted longest first so "allauth.account" wins over "allauth"
+        apps = sorted(set(settings.INSTALLED_APPS) | {"django.contrib.admin", "drf_spectacular"}, key=len, reverse=True)
+        self_us = defaultdict(int)
+        cumulative_us = defaultdict(int)
+        modules = defaultdict(int)
+        # importtime lists children before their parent, so walk it backwards
+        # with a stack of ancestors. An import with no ancestor in its own
+        # group is where that group was entered; its cumulative time counts.
+        ancestors = []
+        for module, own, cumulative, depth in reversed(rows):
+            group = owner(module, apps)
+            while ancestors and ancestors[-1][0] >= depth:
+                ancestors.pop()
+            if all(ancestor_group != group for _, ancestor_group in ancestors):
+                cumulative_us[group] += cumulative
+            ancestors.append((depth, group))
+            self_us[group] += own
+            modules[group] += 1
+
+        total = sum(own for _, own, _, _ in rows)
+        mode = "API_ONLY" if options["api_only"] else "full"
+        self.stdout.write(f"{len(rows)} modules, {total / 1000:.0f} ms total import time ({mode} settings)")
+        self.stdout.write(f"  {'app / package':<34} {'self ms':>8} {'cumul ms':>9} {'modules':>8}")
+        for group in sorted(self_us, key=self_us.get, reverse=True)[: options["limit"]]:
+            self.stdout.write(
+                f"  {group:<34} {self_us[group] / 1000:8.1f} {cumulative_us[group] / 1000:9.1f} {modules[group]:8d}"
+            )
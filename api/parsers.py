@@ -0,0 +1,31 @@
+"""
+JSON request parsing through orjson when installed (see api.renderers).
+Bodies orjson rejects are re-parsed by DRF's JSONParser, so errors behave
+exactly as before.
+"""
+import io
+import re
+
+from rest_framework import parsers
+
+from api.renderers import orjson
+
+
+# orjson reads integers beyond 64 bits as floats; json keeps them exact.
+LONG_NUMBER = re.compile(rb"\d{19}")
+
+
+class FastJSONParser(parsers.JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("_", "-") not in {"utf-8", "utf8"}:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_NUMBER.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,54 @@
+"""
+JSON rendering through orjson (optional C extension) with DRF's output.
+
+orjson produces the same compact UTF-8 JSON as DRF's JSONRenderer with
+COMPACT_JSON/UNICODE_JSON. Types DRF formats its own way (datetimes,
+Decimal, lazy strings, ...) are passed to DRF's JSONEncoder, and anything
+orjson refuses (indent other than pretty-printing for the browsable API,
+integers over 64 bits, ...) is rendered by DRF's JSONRenderer itself.
+One difference remains: NaN and infinite floats become null rather than
+raising (STRICT_JSON). Serializers here never produce them. Without orjson
+installed this is simply JSONRenderer.
+
+Enabled globally in REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"]; a view can
+pick either class through `renderer_classes`.
+"""
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder so they keep its "Z" suffix; dict
+    # keys may be ints etc. like with json.dumps.
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    # json.dumps(ensure_ascii=False) escapes nothing, DRF then escapes these two
+    LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type or "", renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(data, default=self.default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in content:
+                content = content.replace(raw, escaped)
+        return content
+
+    def default(self, obj):
+        return self.encoder_class().default(obj)
@@ -0,0 +1,213 @@
+"""
+Precomputed OpenAPI schema.
+
+`manage.py build_openapi_schema` renders the schema once (YAML and JSON),
+names each file after its content hash, writes gzip and, if available,
+brotli variants next to it, and records everything in manifest.json.
+SchemaView serves those bytes from memory with a strong ETag, so the docs
+UIs never trigger serializer introspection at request time.
+
+Without a build the schema is generated in-process and only kept in
+memory. With OPENAPI_SCHEMA_AUTO_REBUILD (local development) the view also
+regenerates it, and rewrites the artifact, whenever the source has changed
+since the last build; that check stats every .py file, at most once per
+SOURCE_CHECK_INTERVAL, so it is off unless asked for.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+from regive.compression import available_encodings, compress, negotiate_encoding
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "yaml": "application/vnd.oai.openapi; charset=utf-8",
+    "json": "application/vnd.oai.openapi+json; charset=utf-8",
+}
+# How often OPENAPI_SCHEMA_AUTO_REBUILD re-checks source files for changes
+SOURCE_CHECK_INTERVAL = 1.0
+
+
+def schema_dir():
+    return Path(getattr(settings, "OPENAPI_SCHEMA_DIR", settings.BASE_DIR / "build" / "openapi"))
+
+
+def auto_rebuild():
+    return getattr(settings, "OPENAPI_SCHEMA_AUTO_REBUILD", False)
+
+
+def source_fingerprint():
+    """Hash of the path, size and mtime of every project .py file."""
+    digest = hashlib.sha256()
+    base = Path(settings.BASE_DIR)
+    for root, dirs, files in os.walk(base):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "__")) and d not in {"build", "media", "venv"})
+        for name in sorted(files):
+            if name.endswith(".py"):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{os.path.relpath(os.path.join(root, name), base)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def render_schema():
+    """{fmt: bytes} for the current code, rendered like SpectacularAPIView does."""
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema, renderer_context={}),
+        "json": OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+class SchemaArtifact:
+    """The rendered schema in every format and encoding, held in memory."""
+
+    def __init__(self, content_hash, source, variants):
+        self.content_hash = content_hash
+        self.source = source
+        self.variants = variants  # {(fmt, encoding or None): bytes}
+
+    def etag(self, fmt, encoding=None):
+        # strong validators must differ per representation, so per format and encoding
+        suffix = f"-{encoding}" if encoding else ""
+        return f'"{self.content_hash}.{fmt}{suffix}"'
+
+    @classmethod
+    def build(cls, source=None):
+        rendered = render_schema()
+        content_hash = hashlib.sha256(rendered["yaml"]).hexdigest()[:16]
+        variants = {}
+        for fmt, data in rendered.items():
+            variants[(fmt, None)] = data
+            for encoding in available_encodings():
+                variants[(fmt, encoding)] = compress(data, encoding)
+        return cls(content_hash, source, variants)
+
+    def filename(self, fmt, encoding=None):
+        suffix = {None: "", "gzip": ".gz", "br": ".br"}[encoding]
+        return f"schema.{self.content_hash}.{fmt}{suffix}"
+
+    def write(self, directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        files = {}
+        for (fmt, encoding), data in self.variants.items():
+            name = self.filename(fmt, encoding)
+            tmp = directory / f".{name}.tmp"
+            tmp.write_bytes(data)
+            os.replace(tmp, directory / name)
+            files.setdefault(fmt, {})[encoding or "identity"] = name
+        manifest = {"hash": self.content_hash, "source": self.source, "files": files}
+        tmp = directory / ".manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, directory / "manifest.json")
+
+        # drop files from earlier builds
+        current = {name for names in files.values() for name in names.values()}
+        for path in directory.glob("schema.*"):
+            if path.name not in current:
+                path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, directory):
+        try:
+            manifest = json.loads((directory / "manifest.json").read_text())
+            variants = {}
+            for fmt, names in manifest["files"].items():
+                for encoding, name in names.items():
+                    variants[(fmt, None if encoding == "identity" else encoding)] = (directory / name).read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(manifest["hash"], manifest.get("source"), variants)
+
+
+class SchemaStore:
+    """Per-process holder of the current artifact."""
+
+    def __init__(self):
+        self._artifact = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._artifact = None
+            self._checked_at = 0.0
+
+    def get(self):
+        artifact = self._artifact
+        if artifact is not None and not auto_rebuild():
+            return artifact
+        with self._lock:
+            if self._artifact is None:
+                self._artifact = SchemaArtifact.load(schema_dir())
+            if auto_rebuild():
+                self._refresh_if_stale()
+            elif self._artifact is None:
+                logger.warning("No OpenAPI schema build in %s; generating in-process. Run build_openapi_schema.", schema_dir())
+                self._artifact = SchemaArtifact.build()
+            return self._artifact
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        if self._artifact is not None and now - self._checked_at < SOURCE_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        source = source_fingerprint()
+        if self._artifact is None or self._artifact.source != source:
+            self._artifact = SchemaArtifact.build(source)
+            try:
+                self._artifact.write(schema_dir())
+            except OSError:
+                logger.warning("Could not write the OpenAPI schema to %s", schema_dir(), exc_info=True)
+
+
+store = SchemaStore()
+
+
+class SchemaView(View):
+    """
+    Serves the precomputed schema as YAML, or JSON with ?format=json or
+    Accept: application/json. Drop-in for SpectacularAPIView at url name
+    "schema", which the Swagger and Redoc views load.
+    """
+
+    def get(self, request, *args, **kwargs):
+        artifact = store.get()
+        fmt = self.get_format(request)
+        offered = [encoding for encoding in available_encodings() if (fmt, encoding) in artifact.variants]
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding"), offered)
+        etag = artifact.etag(fmt, encoding)
+
+        if etag in {tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")}:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(artifact.variants[(fmt, encoding)], content_type=FORMATS[fmt])
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=300"
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return response
+
+    def get_format(self, request):
+        fmt = request.GET.get("format")
+        if fmt in FORMATS:
+            return fmt
+        if "json" in request.headers.get("Accept", ""):
+            return "json"
+        return "yaml"
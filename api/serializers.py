@@ -1,17 +1,18 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from django.db.models import Q, Avg
+from django.db.models import Q, Avg, Count
 import re
 from drf_spectacular.utils import extend_schema_field, OpenApiTypes
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from dj_rest_auth.serializers import LoginSerializer
 from users.models import CustomUser, Profile, Address
-from items.models import Category, Item, ItemReview
+from items.models import Category, Item, ItemReview, VideoUpload
 from orders.models import Order, OrderItem
 from payments.models import Payment
 from notifications.models import Notification
 from wishlist.models import Wishlist
 from cart.models import Cart, CartItem
+from api.shaping import Expandable, ShapedSerializerMixin
 
 
 from dj_rest_auth.registration.serializers import RegisterSerializer
@@ -82,13 +83,13 @@ class CustomLoginSerializer(LoginSerializer):
 
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ["phone_number", "bio", "avatar", "birth_date"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(read_only=True)
 
     class Meta:
@@ -102,56 +103,116 @@ class UserSerializer(serializers.ModelSerializer):
             "date_joined",
             "profile",
         ]
+        expandable_fields = {"profile": Expandable(ProfileSerializer, collapse=None)}
+        default_expand = ["profile"]
 
 
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = ["id", "street", "city", "state", "country"]
         read_only_fields = ["user"]
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "slug", "description"]
 
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class CounterField(serializers.IntegerField):
+    """A read-only counter on a related row that may not exist yet (then 0)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(read_only=True, **kwargs)
+
+    def get_attribute(self, instance):
+        return super().get_attribute(instance) or 0
+
+
+class ItemSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     seller = UserSerializer(read_only=True)
     reviews_count = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    # only present on ?near= searches
+    distance_km = serializers.FloatField(read_only=True)
+    # popularity counters (items.stats) and page views, joined with the item
+    view_count = CounterField(source="stats.view_count")
+    wishlist_count = CounterField(source="stats.wishlist_count")
+    cart_count = CounterField(source="stats.cart_count")
+    sold_count = CounterField(source="stats.sold_count")
 
     class Meta:
         model = Item
         fields = [
             "id", "name", "slug", "description", "category",
             "condition", "is_free", "price", "is_negotiable",
-            "stock", "location", "status",
-            "image", "video",
+            "stock", "location", "latitude", "longitude", "status",
+            "image", "video", "view_count",
+            "wishlist_count", "cart_count", "sold_count",
             "created_at", "updated_at",
-            "seller", "reviews_count", "average_rating",
+            "seller", "reviews_count", "average_rating", "distance_km",
         ]
+        expandable_fields = {
+            "seller": Expandable(UserSerializer),
+            "category": Expandable(CategorySerializer),
+        }
+        default_expand = ["seller"]
+        field_dependencies = {"reviews_count": [], "average_rating": [], "distance_km": []}
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        latitude = attrs.get("latitude", getattr(self.instance, "latitude", None))
+        longitude = attrs.get("longitude", getattr(self.instance, "longitude", None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Provide both latitude and longitude, or neither.")
+        return attrs
+
+    @classmethod
+    def annotate_queryset(cls, queryset, field_names):
+        # one aggregate query instead of two per item
+        if "reviews_count" in field_names:
+            queryset = queryset.annotate(reviews_count_value=Count("reviews"))
+        if "average_rating" in field_names:
+            queryset = queryset.annotate(average_rating_value=Avg("reviews__rating"))
+        return queryset
 
     @extend_schema_field(OpenApiTypes.INT)
     def get_reviews_count(self, obj):
+        if hasattr(obj, "reviews_count_value"):
+            return obj.reviews_count_value
         return obj.reviews.count()
 
     @extend_schema_field(OpenApiTypes.FLOAT)
     def get_average_rating(self, obj):
-        avg = obj.reviews.aggregate(avg=Avg("rating"))["avg"]
+        if hasattr(obj, "average_rating_value"):
+            avg = obj.average_rating_value
+        else:
+            avg = obj.reviews.aggregate(avg=Avg("rating"))["avg"]
         return round(avg or 0, 2)
 
 
-class ItemReviewSerializer(serializers.ModelSerializer):
+class VideoUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VideoUpload
+        fields = ["id", "item", "filename", "length", "offset", "is_complete", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class ItemReviewSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     reviewer = UserSerializer(read_only=True)
 
     class Meta:
         model = ItemReview
         fields = ["id", "item", "reviewer", "rating", "comment", "created_at"]
+        expandable_fields = {
+            "item": Expandable(ItemSerializer),
+            "reviewer": Expandable(UserSerializer),
+        }
+        default_expand = ["reviewer"]
 
 
 
@@ -168,7 +229,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ["id", "item", "item_name", "quantity", "price"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     buyer = UserSerializer(read_only=True)
     items = OrderItemCreateSerializer(many=True, help_text='Format: [{"item": 1, "quantity": 2}]')
     shipping_address = serializers.PrimaryKeyRelatedField(queryset=Address.objects.all())
@@ -184,6 +245,11 @@ class OrderSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = ["id", "buyer", "total_amount", "created_at"]
+        expandable_fields = {
+            "buyer": Expandable(UserSerializer),
+            "shipping_address": Expandable(AddressSerializer),
+        }
+        default_expand = ["buyer"]
 
     def create(self, validated_data):
         items_data = validated_data.pop("items")
@@ -221,7 +287,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = "__all__"
@@ -229,18 +295,20 @@ class PaymentSerializer(serializers.ModelSerializer):
 
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = "__all__"
 
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     item = ItemSerializer(read_only=True)
 
     class Meta:
         model = Wishlist
         fields = ["id", "item", "added_at"]
+        expandable_fields = {"item": Expandable(ItemSerializer)}
+        default_expand = ["item"]
 
 
 class WishlistAddInputSerializer(serializers.Serializer):
@@ -251,21 +319,26 @@ class CheckoutInputSerializer(serializers.Serializer):
 
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     item_detail = ItemSerializer(source='item', read_only=True)
 
     class Meta:
         model = CartItem
         fields = ["id", "item", "item_detail", "quantity", "subtotal"]
+        expandable_fields = {"item_detail": Expandable(ItemSerializer, collapse=None)}
+        default_expand = ["item_detail"]
+        field_dependencies = {"subtotal": ["quantity", "item.price"]}
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Cart
         fields = ["id", "buyer", "items", "total_amount", "created_at", "updated_at"]
         read_only_fields = ["buyer", "created_at", "updated_at", "total_amount"]
+        # computed from the prefetched items
+        field_dependencies = {"total_amount": []}
 
 
 
@@ -276,8 +349,18 @@ class AdminDashboardSerializer(serializers.Serializer):
     total_reviews = serializers.IntegerField()
 
 
+class DailyViewsSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    views = serializers.IntegerField()
+
+
 class SellerDashboardSerializer(serializers.Serializer):
     items_count = serializers.IntegerField()
+    total_views = serializers.IntegerField()
+    daily_views = DailyViewsSerializer(many=True)
+    wishlist_count = serializers.IntegerField()
+    cart_count = serializers.IntegerField()
+    sold_count = serializers.IntegerField()
     category_stats = serializers.ListField(child=serializers.DictField())
     average_rating = serializers.FloatField()
 
@@ -290,6 +373,7 @@ class BuyerDashboardSerializer(serializers.Serializer):
 class MarketplaceDashboardSerializer(serializers.Serializer):
     top_categories = serializers.ListField(child=serializers.DictField())
     latest_items = ItemSerializer(many=True)
+    trending_items = ItemSerializer(many=True)
 
 
 class ItemStatsSerializer(serializers.Serializer):
@@ -0,0 +1,317 @@
+"""
+Response shaping for GET requests: ?fields=, ?omit= and ?expand=.
+
+- fields=id,name,seller.full_name  keep only these; dotted paths reach into
+  embedded objects.
+- omit=description,seller.profile  drop these.
+- expand=seller,category           embed these relations (Meta.expandable_fields),
+  collapse the others to their id. Without ?expand= every serializer keeps
+  its Meta.default_expand, i.e. the shape the API always had; an empty
+  `expand=` collapses everything.
+
+ShapedSerializerMixin applies the shape to a serializer and hands each
+embedded serializer its part of it. ShapedQuerysetMixin makes a viewset's
+list/retrieve queryset load what that shape needs: .only() the columns,
+select_related() embedded foreign keys, prefetch_related() embedded lists,
+and let serializers annotate aggregates (annotate_queryset).
+
+Writes are never shaped: input is validated against the full serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+
+
+SHAPED_METHODS = ("GET", "HEAD")
+
+SHAPE_PARAMETERS = [
+    OpenApiParameter("fields", str, description="Comma-separated fields to return (dotted for nested, e.g. seller.full_name)."),
+    OpenApiParameter("omit", str, description="Comma-separated fields to leave out."),
+    OpenApiParameter("expand", str, description="Comma-separated relations to embed (e.g. seller,category); empty embeds none."),
+]
+
+
+def parse_paths(value):
+    return {tuple(part.strip() for part in path.split(".")) for path in value.split(",") if path.strip()}
+
+
+class Shape:
+    """Requested fields/omit/expand for one serializer level, as sets of path tuples."""
+
+    def __init__(self, fields=None, omit=frozenset(), expand=None):
+        self.fields = fields
+        self.omit = omit
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None or request.method not in SHAPED_METHODS:
+            return cls()
+        params = request.query_params
+        return cls(
+            fields=parse_paths(params["fields"]) if "fields" in params else None,
+            omit=parse_paths(params.get("omit", "")),
+            expand=parse_paths(params["expand"]) if "expand" in params else None,
+        )
+
+    def includes(self, name):
+        if (name,) in self.omit:
+            return False
+        return self.fields is None or any(path[0] == name for path in self.fields)
+
+    def expands(self, name, default):
+        if self.expand is None:
+            return default
+        return any(path[0] == name for path in self.expand)
+
+    def child(self, name):
+        def below(paths):
+            return {path[1:] for path in paths if path[0] == name and len(path) > 1}
+
+        fields = None if self.fields is None or (name,) in self.fields else below(self.fields)
+        expand = None if self.expand is None else below(self.expand)
+        return Shape(fields=fields or None, omit=below(self.omit), expand=expand)
+
+
+class Expandable:
+    """
+    A relation a serializer can embed. Collapsed, it is the relation's id
+    (collapse="pk") or left out entirely (collapse=None).
+    """
+
+    def __init__(self, serializer_class, collapse="pk"):
+        self.serializer_class = serializer_class
+        self.collapse = collapse
+
+    def expanded(self, field):
+        if isinstance(field, serializers.BaseSerializer):
+            return field
+        return self.serializer_class(read_only=True, **({"source": field.source} if field.source else {}))
+
+    def collapsed(self, field):
+        if self.collapse is None:
+            return None
+        if not isinstance(field, serializers.BaseSerializer):
+            return field  # the model's own (possibly writable) id field
+        return serializers.PrimaryKeyRelatedField(read_only=True, **({"source": field.source} if field.source else {}))
+
+
+class ShapedSerializerMixin:
+    """
+    ModelSerializer mixin. Optional Meta attributes:
+
+    - expandable_fields: {name: Expandable(SerializerClass)}
+    - default_expand: names embedded when the request has no ?expand=
+    - field_dependencies: {name: ["column", "relation.column"]} for fields
+      that aren't model fields (properties, method fields), so querysets
+      can still be narrowed with .only(). [] means no columns needed.
+    """
+
+    @property
+    def shape(self):
+        if getattr(self, "_shape", None) is None:
+            root = self.parent is None or (
+                isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+            )
+            self._shape = Shape.from_request(self.context.get("request")) if root else Shape()
+        return self._shape
+
+    def get_fields(self):
+        fields = super().get_fields()
+        shape = self.shape
+        default_expand = set(getattr(self.Meta, "default_expand", ()))
+
+        for name, expandable in getattr(self.Meta, "expandable_fields", {}).items():
+            if name not in fields:
+                continue
+            if shape.expands(name, name in default_expand):
+                fields[name] = expandable.expanded(fields[name])
+            else:
+                collapsed = expandable.collapsed(fields[name])
+                if collapsed is None:
+                    del fields[name]
+                else:
+                    fields[name] = collapsed
+
+        for name in [name for name in fields if not shape.includes(name)]:
+            del fields[name]
+
+        for name, field in fields.items():
+            target = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(target, ShapedSerializerMixin):
+                target._shape = shape.child(name)
+        return fields
+
+    @classmethod
+    def annotate_queryset(cls, queryset, field_names):
+        """Hook: add annotations the selected top-level fields can read."""
+        return queryset
+
+
+class QueryPlan:
+    def __init__(self):
+        self.only = set()
+        self.select = set()
+        self.prefetch = []
+        self.narrow = True  # False once a column set can't be determined
+
+
+def relation_step(model, name):
+    """(field, joinable) for `name` on `model`, or (None, False) if not a model field."""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None, False
+    joinable = field.is_relation and (field.many_to_one or field.one_to_one)
+    return field, joinable
+
+
+def add_source(plan, model, prefix, source):
+    """
+    Record the columns/joins a dotted `source` needs. Returns False for
+    sources that aren't plain model fields (properties, reverse relations).
+    """
+    parts = source.split(".")
+    for index, part in enumerate(parts):
+        field, joinable = relation_step(model, part)
+        if field is None or (field.is_relation and not joinable):
+            return False
+        last = index == len(parts) - 1
+        if last:
+            if field.concrete:
+                plan.only.add(prefix + part)
+            else:  # reverse one-to-one: join it, load all its columns
+                plan.select.add(prefix + part)
+            return True
+        plan.select.add(prefix + part)
+        if field.concrete:
+            plan.only.add(prefix + part)
+        model, prefix = field.related_model, f"{prefix}{part}__"
+    return True
+
+
+def all_columns(plan, model, prefix):
+    for field in model._meta.concrete_fields:
+        plan.only.add(prefix + field.name)
+
+
+def plan_serializer(serializer, model, prefix, plan):
+    dependencies = getattr(getattr(serializer, "Meta", None), "field_dependencies", {})
+    narrow = True
+    plan.only.add(prefix + model._meta.pk.name)
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in dependencies:
+            for path in dependencies[name]:
+                narrow &= add_source(plan, model, prefix, path)
+            continue
+        if field.source == "*":
+            narrow = False
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.BaseSerializer):
+            related, joinable = relation_step(model, field.source)
+            if related is None:
+                narrow = False
+            elif joinable and not annotates(nested):
+                plan.select.add(prefix + field.source)
+                if related.concrete:
+                    plan.only.add(prefix + field.source)
+                plan_serializer(nested, related.related_model, f"{prefix}{field.source}__", plan)
+            else:
+                if related.concrete:
+                    plan.only.add(prefix + field.source)
+                plan.prefetch.append(
+                    Prefetch(prefix + field.source, queryset=nested_queryset(nested, related))
+                )
+            continue
+
+        narrow &= add_source(plan, model, prefix, field.source)
+
+    if not narrow:
+        all_columns(plan, model, prefix)
+        plan.narrow &= bool(prefix)  # a nested model can load in full; the root can't be narrowed
+    return plan
+
+
+def annotates(serializer):
+    """Whether a serializer adds annotations, which a join can't carry."""
+    return (
+        isinstance(serializer, ShapedSerializerMixin)
+        and type(serializer).annotate_queryset.__func__ is not ShapedSerializerMixin.annotate_queryset.__func__
+    )
+
+
+def nested_queryset(serializer, relation):
+    """
+    Queryset for a prefetched relation (a list, or a single object whose
+    serializer annotates), shaped like its serializer.
+    """
+    model = relation.related_model
+    queryset = model._default_manager.all()
+    if not hasattr(serializer, "Meta"):
+        return queryset
+    plan = plan_serializer(serializer, model, "", QueryPlan())
+    if relation.one_to_many or (relation.one_to_one and not relation.concrete):
+        plan.only.add(relation.field.name)  # the link back to the parent rows
+    queryset = apply_plan(queryset, plan)
+    if isinstance(serializer, ShapedSerializerMixin):
+        queryset = keep_ordering(serializer.annotate_queryset(queryset, set(serializer.fields)))
+    return queryset
+
+
+def apply_plan(queryset, plan):
+    # A prefetched relation loads its own columns; also joining it (e.g. for
+    # a field_dependencies path) would leave a deferred copy in its place.
+    prefetched = [lookup.prefetch_to + "__" for lookup in plan.prefetch]
+    select = {path for path in plan.select if not (path + "__").startswith(tuple(prefetched))}
+    only = {path for path in plan.only if not path.startswith(tuple(prefetched))}
+
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if plan.prefetch:
+        queryset = queryset.prefetch_related(*plan.prefetch)
+    if plan.narrow:
+        queryset = queryset.only(*sorted(only))
+    return queryset
+
+
+def keep_ordering(queryset):
+    """
+    Django leaves Meta.ordering out of GROUP BY queries, so an aggregate
+    annotation (review counts, ...) would page through rows in no order;
+    spell the default ordering out.
+    """
+    if not queryset.ordered and queryset.query.default_ordering and queryset.model._meta.ordering:
+        queryset = queryset.order_by(*queryset.model._meta.ordering)
+    return queryset
+
+
+def shape_queryset(queryset, serializer):
+    """Narrow `queryset` to what `serializer` (already shaped) will read."""
+    plan = plan_serializer(serializer, queryset.model, "", QueryPlan())
+    queryset = apply_plan(queryset, plan)
+    if isinstance(serializer, ShapedSerializerMixin):
+        queryset = keep_ordering(serializer.annotate_queryset(queryset, set(serializer.fields)))
+    return queryset
+
+
+class ShapedQuerysetMixin:
+    """
+    Viewset mixin: list/retrieve querysets load only what the requested
+    serializer shape reads. Other actions get the queryset unchanged.
+    """
+
+    shaped_actions = ("list", "retrieve")
+
+    # list() and get_object() both pass get_queryset() through here, and
+    # viewsets override get_queryset() itself.
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SHAPED_METHODS and getattr(self, "action", None) in self.shaped_actions:
+            queryset = shape_queryset(queryset, self.get_serializer())
+        return queryset
@@ -1,3 +1,1536 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import uuid
+import warnings
+from array import array
+from datetime import timedelta
+from pathlib import Path
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import DatabaseError, connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, force_authenticate
+
+from api import schema
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.schema import SchemaView
+from api.serializers import ItemSerializer
+from api.shaping import shape_queryset
+from api.views import OrderViewSet, stream_user
+from cart.models import Cart, CartItem
+from items import autocomplete, facets, related, uploads, viewcounts
+from items.models import CatalogFacetCount, Category, Item, ItemDailyViews, ItemReview, ItemStats, TrendingItem, VideoUpload
+from notifications import inbox, stream
+from notifications.models import Notification
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from regive import compression, db_router
+from regive.db_pool import PoolTimeout
+from regive.middleware import PooledConnectionMiddleware
+from regive.db_router import ReplicaRouter, replica_reads
+from users import cache as user_cache
+from users.models import CustomUser, Profile
+from wishlist import alerts, bulk as wishlist_bulk
+from wishlist.models import Wishlist, WishlistAlert
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        db_router.reset_health()
+        self.router = ReplicaRouter()
+        patcher = mock.patch.object(db_router, "check_replica", return_value=True)
+        self.check_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(db_router.reset_health)
+
+    def test_reads_outside_replica_block_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Item), "default")
+
+    def test_reads_inside_replica_block_use_a_replica(self):
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Item), {"replica1", "replica2"})
+
+    def test_block_stays_on_one_replica(self):
+        for _ in range(5):
+            with replica_reads():
+                chosen = {self.router.db_for_read(Item) for _ in range(20)}
+            self.assertEqual(len(chosen), 1)
+
+        with replica_reads():
+            first = self.router.db_for_read(Item)
+            db_router.mark_unhealthy(first)
+            self.assertNotIn(self.router.db_for_read(Item), {first, "default"})
+
+    def test_migrations_skip_replicas(self):
+        self.assertTrue(self.router.allow_migrate("default", "items"))
+        self.assertFalse(self.router.allow_migrate("replica1", "items"))
+        with override_settings(DATABASE_REPLICAS_MIGRATE=True):
+            self.assertTrue(self.router.allow_migrate("replica1", "items"))
+
+    def test_write_pins_rest_of_block_to_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Item), "default")
+            self.assertEqual(self.router.db_for_read(Item), "default")
+        with replica_reads():
+            self.assertNotEqual(self.router.db_for_read(Item), "default")
+
+    def test_unhealthy_replicas_fall_back_to_primary(self):
+        self.check_replica.side_effect = lambda alias: alias == "replica2"
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Item), "replica2")
+
+        db_router.reset_health()
+        self.check_replica.side_effect = None
+        self.check_replica.return_value = False
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Item), "default")
+
+    def test_health_is_cached_between_checks(self):
+        with replica_reads():
+            for _ in range(5):
+                self.router.db_for_read(Item)
+        self.assertEqual(self.check_replica.call_count, 2)
+
+
+class FakePool:
+    def __init__(self):
+        self.lent = []
+        self.returned = []
+
+    def acquire(self):
+        wrapper = mock.Mock(vendor="fake")
+        self.lent.append(wrapper)
+        return wrapper
+
+    def release(self, wrapper):
+        self.returned.append(wrapper)
+
+
+@override_settings(DATABASE_POOL={"ENABLED": True})
+class PooledConnectionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        for target, value in (("get_pool", lambda alias: self.pool), ("replicas", lambda: [])):
+            patcher = mock.patch(f"regive.middleware.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.original = connections["default"]
+        self.request = AsyncRequestFactory().get("/")
+
+    def call(self, view):
+        return PooledConnectionMiddleware(view)(self.request)
+
+    def test_connection_is_checked_out_on_first_use(self):
+        self.call(lambda request: HttpResponse())
+        self.assertEqual(self.pool.lent, [])
+
+        self.call(lambda request: HttpResponse(connections["default"].vendor))
+        self.assertEqual(len(self.pool.lent), 1)
+        self.assertEqual(self.pool.returned, self.pool.lent)
+        self.assertIs(connections["default"], self.original)
+
+    def test_streaming_body_keeps_connection_until_sent(self):
+        def view(request):
+            return StreamingHttpResponse(connections["default"].vendor for _ in range(2))
+
+        response = self.call(view)
+        self.assertEqual(self.pool.returned, [])
+        self.assertEqual(b"".join(response), b"fakefake")
+        self.assertEqual(len(self.pool.returned), 1)
+        self.assertIs(connections["default"], self.original)
+
+    def test_unsent_streaming_body_gives_back_on_close(self):
+        response = self.call(lambda request: StreamingHttpResponse(iter([connections["default"].vendor])))
+        response.close()
+        self.assertEqual(len(self.pool.returned), 1)
+
+    def test_pool_timeout_answers_503(self):
+        response = PooledConnectionMiddleware(None).process_exception(self.request, PoolTimeout("busy"))
+        self.assertEqual(response.status_code, 503)
+
+
+HAS_REPLICA = "replica1" in settings.DATABASES
+
+
+@skipUnless(
+    HAS_REPLICA,
+    "Set DB_REPLICAS (e.g. DB_ENGINE=django.db.backends.sqlite3 DB_REPLICAS=replica.sqlite3)",
+)
+class ReplicaRoutingDatabaseTests(TestCase):
+    """
+    Runs against two real databases (the primary and replica1). Nothing
+    replicates between them in tests, so where a row is visible shows which
+    database served the read.
+    """
+    # The runner sets up every alias a test class names, even skipped ones.
+    databases = {"default", "replica1"} if HAS_REPLICA else {"default"}
+
+    def setUp(self):
+        db_router.reset_health()
+        self.addCleanup(db_router.reset_health)
+        cache.clear()  # public catalog pages are cached
+        # bulk_create skips the profile signals, which would write to the primary
+        [seller] = CustomUser.objects.using("replica1").bulk_create(
+            [CustomUser(email="seller@example.com", full_name="Seller", role="SELLER")]
+        )
+        Item.objects.using("replica1").bulk_create([Item(seller=seller, name="Replica only", slug="replica-only")])
+
+    def test_catalog_reads_are_served_by_replica(self):
+        response = APIClient().get("/api/public-items/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Replica only"])
+
+    def test_write_pins_request_to_primary(self):
+        with replica_reads():
+            self.assertEqual(Item.objects.count(), 1)
+            CustomUser.objects.create_user(email="buyer@example.com", full_name="Buyer", password="x")
+            self.assertEqual(Item.objects.count(), 0)
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        db_router.mark_unhealthy("replica1")
+        response = APIClient().get("/api/public-items/")
+        self.assertEqual(response.data["results"], [])
+
+
+class VideoUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media, VIDEO_UPLOAD_TEMP_DIR=os.path.join(media, "video_uploads"))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.item = Item.objects.create(seller=self.seller, name="Lamp", price=Decimal(5))
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def start(self, length):
+        return self.client.post(f"/api/items/{self.item.pk}/video-uploads/", HTTP_UPLOAD_LENGTH=str(length))
+
+    def send(self, upload_id, offset, data):
+        return self.client.generic(
+            "PATCH", f"/api/video-uploads/{upload_id}/", data,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def upload(self, data):
+        upload_id = self.start(len(data)).data["id"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.send(upload_id, 0, data).status_code, 204)
+        self.item.refresh_from_db()
+        return upload_id
+
+    def test_upload_length_is_validated(self):
+        self.assertEqual(self.start(0).status_code, 400)
+        self.assertEqual(self.start(-1).status_code, 400)
+        with override_settings(VIDEO_UPLOAD_MAX_SIZE=10):
+            self.assertEqual(self.start(11).status_code, 413)
+
+    def test_chunks_resume_and_finalize(self):
+        upload_id = self.start(10).data["id"]
+        self.assertEqual(self.send(upload_id, 0, b"01234").status_code, 204)
+        self.assertEqual(self.client.head(f"/api/video-uploads/{upload_id}/")["Upload-Offset"], "5")
+        self.assertEqual(self.send(upload_id, 5, b"56789").status_code, 204)
+
+        self.item.refresh_from_db()
+        with self.item.video.open("rb") as fh:
+            self.assertEqual(fh.read(), b"0123456789")
+        self.assertTrue(VideoUpload.objects.get(pk=upload_id).is_complete)
+        self.assertFalse(os.listdir(uploads.temp_dir()))
+        self.assertEqual(self.send(upload_id, 10, b"x").status_code, 409)
+
+    def test_offset_conflicts_are_rejected(self):
+        upload_id = self.start(10).data["id"]
+        self.assertEqual(self.send(upload_id, 0, b"01234").status_code, 204)
+
+        response = self.send(upload_id, 0, b"01234")  # retried chunk
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "5")
+        self.assertEqual(self.send(upload_id, 5, b"56789abc").status_code, 413)
+
+        # two PATCHes that both read offset 5: only the first commits
+        first, second = VideoUpload.objects.get(pk=upload_id), VideoUpload.objects.get(pk=upload_id)
+        self.assertTrue(uploads.commit_offset(first, 7))
+        self.assertFalse(uploads.commit_offset(second, 7))
+        self.assertEqual(VideoUpload.objects.get(pk=upload_id).offset, 7)
+
+    def test_chunk_is_not_written_while_another_request_holds_the_upload(self):
+        upload_id = self.start(10).data["id"]
+        with mock.patch.object(uploads, "lock", return_value=False), mock.patch.object(uploads, "write_chunk") as write:
+            response = self.send(upload_id, 0, b"01234")
+        self.assertEqual(response.status_code, 409)
+        write.assert_not_called()
+        self.assertEqual(VideoUpload.objects.get(pk=upload_id).offset, 0)
+
+    def test_malformed_content_length_is_rejected(self):
+        upload_id = self.start(10).data["id"]
+        for length in ("abc", "-1"):
+            with self.subTest(length=length):
+                response = self.client.generic(
+                    "PATCH", f"/api/video-uploads/{upload_id}/", b"01234",
+                    content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0", CONTENT_LENGTH=length,
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_replaced_video_is_deleted(self):
+        self.upload(b"old")
+        old = self.item.video.name
+        self.upload(b"new")
+        self.assertNotEqual(self.item.video.name, old)
+        self.assertFalse(self.item.video.storage.exists(old))
+        self.assertTrue(self.item.video.storage.exists(self.item.video.name))
+
+    def test_collect_stale(self):
+        stale, fresh = self.start(10).data["id"], self.start(10).data["id"]
+        done = self.upload(b"video")
+        orphan = os.path.join(uploads.temp_dir(), "orphan.part")
+        open(orphan, "wb").close()
+        old = timezone.now() - timedelta(days=2)
+        VideoUpload.objects.filter(pk__in=[stale, done]).update(updated_at=old)
+        os.utime(orphan, (old.timestamp(), old.timestamp()))
+
+        self.assertEqual(uploads.collect_stale(), (2, 1))
+        self.assertEqual([str(pk) for pk in VideoUpload.objects.values_list("pk", flat=True)], [fresh])
+        self.assertEqual(os.listdir(uploads.temp_dir()), [f"{fresh}.part"])
+        self.assertTrue(self.item.video.storage.exists(self.item.video.name))
+
+
+@skipUnless("django.contrib.admin" in settings.INSTALLED_APPS, "API-only workers have no admin")
+class AdminChangelistQueryTests(TestCase):
+    """
+    Changelist pages run a fixed number of queries, however many rows they
+    show: columns are joined (list_select_related) and related filters come
+    from the cache after the first load.
+    """
+    # queries per page once filter choices are cached, session and user lookups included
+    CHANGELISTS = {
+        "/admin/orders/order/": 6,
+        "/admin/items/item/": 6,
+        "/admin/items/itemreview/": 6,
+        "/admin/cart/cartitem/": 5,
+        "/admin/payments/payment/": 6,
+        "/admin/wishlist/wishlist/": 5,
+        "/admin/notifications/notification/": 5,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        admin = CustomUser.objects.create_superuser(email="admin@example.com", full_name="Admin", password="x")
+        self.client.force_login(admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            n = self.rows
+            seller = CustomUser.objects.create_user(email=f"seller{n}@example.com", full_name="Seller", password="x", role="SELLER")
+            buyer = CustomUser.objects.create_user(email=f"buyer{n}@example.com", full_name="Buyer", password="x", role="BUYER")
+            item = Item.objects.create(seller=seller, name=f"Item {n}", price=Decimal(5))
+            order = Order.objects.create(buyer=buyer, total_amount=Decimal(5))
+            OrderItem.objects.create(order=order, item=item, price=Decimal(5))
+            Payment.objects.create(order=order, user=buyer, amount=Decimal(5), provider="paystack", reference=f"ref-{n}")
+            CartItem.objects.create(cart=Cart.objects.create(buyer=buyer), item=item)
+            ItemReview.objects.create(item=item, reviewer=buyer, rating=4)
+            Wishlist.objects.create(user=buyer, item=item)
+            Notification.objects.create(user=buyer, title="Hello", message="Hi")
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        for url, expected in self.CHANGELISTS.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)  # fills the filter cache
+                with self.assertNumQueries(expected):
+                    self.client.get(url)
+
+        self.add_rows(8)
+        for url, expected in self.CHANGELISTS.items():
+            with self.subTest(url=url, rows=self.rows):
+                cache.clear()
+                self.client.get(url)
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url)
+                changelist = response.context["cl"]
+                self.assertEqual(len(changelist.result_list), changelist.model._default_manager.count())
+
+    @override_settings(ADMIN_CHANGELISTS={"ESTIMATE_ABOVE": 5})
+    def test_unfiltered_list_uses_table_statistics(self):
+        self.add_rows(10)
+        with mock.patch("regive.admin_changelists.estimated_rows", return_value=1000) as estimated_rows:
+            response = self.client.get("/admin/orders/order/")
+            self.assertEqual(response.context["cl"].result_count, 1000)
+            response = self.client.get("/admin/orders/order/", {"status": "PENDING"})
+            self.assertEqual(response.context["cl"].result_count, 10)
+        self.assertEqual(estimated_rows.call_count, 1)
+
+
+class NotificationStreamTests(TestCase):
+    def test_each_user_is_read_from_own_cursor(self):
+        busy = CustomUser.objects.create_user(email="busy@example.com", full_name="Busy", password="x")
+        quiet = CustomUser.objects.create_user(email="quiet@example.com", full_name="Quiet", password="x")
+        quiet_cursor = stream.latest_id(quiet.pk)
+        # more rows than a batch, all already sent to busy's stream
+        Notification.objects.bulk_create(Notification(user=busy, title="Old", message="") for _ in range(5))
+        busy_cursor = stream.latest_id(busy.pk)
+
+        fresh = [
+            Notification.objects.create(user=quiet, title="New", message=""),
+            Notification.objects.create(user=busy, title="New", message=""),
+        ]
+        cursors = {quiet.pk: quiet_cursor, busy.pk: busy_cursor}
+        rows = stream.fetch_since(cursors, limit=3)
+        self.assertEqual([row["id"] for row in rows], [row.pk for row in fresh])
+        with mock.patch.object(stream, "USERS_PER_QUERY", 1):
+            self.assertEqual(stream.fetch_since(cursors, limit=3), rows)
+
+    def test_coalesced_notification_reaches_open_streams(self):
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            first = inbox.notify(seller, "New Order", "Lamp", kind=Notification.Kinds.NEW_ORDER)
+        cursor = stream.latest_id(seller.pk)
+        self.assertEqual(inbox.unread_count(seller.pk), 1)
+
+        with mock.patch.object(stream.broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                merged = inbox.notify(seller, "New Order", "Chair", kind=Notification.Kinds.NEW_ORDER)
+
+        self.assertGreater(merged.pk, first.pk)
+        self.assertEqual(list(Notification.objects.values_list("pk", "count")), [(merged.pk, 2)])
+        self.assertEqual(publish.call_args.args[0]["id"], merged.pk)
+        self.assertEqual([row["id"] for row in stream.fetch_since({seller.pk: cursor})], [merged.pk])
+        self.assertIsNone(cache.get(inbox.unread_cache_key(seller.pk)))
+
+    def test_stream_ticket_is_single_use(self):
+        user = CustomUser.objects.create_user(email="reader@example.com", full_name="Reader", password="x")
+        client = APIClient()
+        client.force_authenticate(user)
+        ticket = client.post("/api/notifications/stream-ticket/").data["ticket"]
+
+        def open_stream():
+            request = AsyncRequestFactory().get("/api/notifications/stream/", {"ticket": ticket})
+            return async_to_sync(stream_user)(request)
+
+        self.assertEqual(open_stream(), user)
+        self.assertIsNone(open_stream())
+
+    def test_poll_recycles_connections_and_backs_off_after_failures(self):
+        with mock.patch.object(stream, "close_old_connections") as close, \
+                mock.patch.object(stream, "fetch_since", return_value=[]):
+            stream.poll({1: 0})
+        self.assertEqual(close.call_count, 2)
+
+        broker, delays = stream.NotificationBroker(), []
+
+        async def sleep(delay):
+            if len(delays) == 5:
+                raise StopAsyncIteration
+            delays.append(delay)
+
+        async def run():
+            broker._subscribers[1].add(stream.Subscriber(1, 0, asyncio.get_running_loop()))
+            await broker.poll_forever()
+
+        with mock.patch.object(stream.asyncio, "sleep", sleep), \
+                mock.patch.object(stream, "poll", side_effect=[DatabaseError, DatabaseError, [], [], []]), \
+                self.assertLogs(stream.logger, "WARNING") as logs, self.assertRaises(StopAsyncIteration):
+            async_to_sync(run)()
+        interval = stream.POLL_INTERVAL
+        self.assertEqual(delays, [interval, interval * 2, interval * 4, interval, interval])
+        self.assertEqual(len(logs.records), 2)
+
+
+@override_settings(LOGIN_RATE_LIMITS={"IP": {"CAPACITY": 100, "RATE": 1}, "EMAIL": {"CAPACITY": 5, "RATE": 0.01}})
+class LoginRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_malformed_bodies_are_rejected_before_rate_limiting(self):
+        for body in ([], ["a"], {"email": 5, "password": "x"}, {"email": ["a"], "password": "x"}, {"email": None}):
+            with self.subTest(body=body):
+                response = self.client.post("/api/auth/login/", body, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+
+
+# catalog reads go to a replica when there is one; these rows are on the primary
+@override_settings(DATABASE_REPLICAS=[])
+class GeoSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        for name, lat, is_free in (("Paid 1", 6.500, False), ("Paid 2", 6.501, False), ("Free", 6.510, True)):
+            Item.objects.create(
+                seller=seller, name=name, price=Decimal(0 if is_free else 5), is_free=is_free,
+                latitude=lat, longitude=3.3, status="PUBLISHED",
+            )
+
+    @override_settings(GEO_SEARCH={"MAX_RESULTS": 2})
+    def test_result_cap_applies_after_other_filters(self):
+        response = APIClient().get("/api/public-items/", {"near": "6.5,3.3", "radius_km": 5, "is_free": "true"})
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Free"])
+
+        response = APIClient().get("/api/public-items/", {"near": "6.5,3.3", "radius_km": 5})
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Paid 1", "Paid 2"])
+
+    def test_facets_count_the_radius_search(self):
+        params = {"near": "6.5,3.3", "radius_km": 1}
+        listed = APIClient().get("/api/public-items/", params).data["results"]
+        self.assertEqual([row["name"] for row in listed], ["Paid 1", "Paid 2"])
+
+        facets = APIClient().get("/api/public-items/facets/", params).data
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual([(row["value"], row["count"]) for row in facets["is_free"]], [(False, 2)])
+
+        # the facet's own selection narrows the list, not its own counts
+        facets = APIClient().get("/api/public-items/facets/", {"near": "6.5,3.3", "radius_km": 5, "is_free": "true"}).data
+        self.assertEqual(facets["total"], 1)
+        self.assertEqual([(row["value"], row["count"]) for row in facets["is_free"]], [(True, 1), (False, 2)])
+
+
+@override_settings(DATABASE_REPLICAS=[])  # as GeoSearchTests
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.items = [
+            Item.objects.create(seller=seller, name=f"Item {n}", price=Decimal(5), status="PUBLISHED") for n in range(3)
+        ]
+        TrendingItem.objects.bulk_create(
+            TrendingItem(category_id=None, rank=rank, item=item, score=10 - rank)
+            for rank, item in enumerate(reversed(self.items), start=1)
+        )
+
+    def test_items_in_rank_order(self):
+        response = APIClient().get("/api/public-items/trending/", {"limit": 2})
+        self.assertEqual([row["name"] for row in response.data], ["Item 2", "Item 1"])
+        self.assertEqual(len(APIClient().get("/api/public-items/trending/").data), 3)
+
+    def test_limit_must_be_positive(self):
+        for limit in ("-1", "0", "x"):
+            with self.subTest(limit=limit):
+                response = APIClient().get("/api/public-items/trending/", {"limit": limit})
+                self.assertEqual(response.status_code, 400)
+
+
+class RelatedItemsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @skipUnless(related.numpy is not None, "numpy is not installed")
+    def test_numpy_and_python_neighbours_match(self):
+        rng = random.Random(45)
+        # basket rows for two sources, grouped by basket; some baskets exceed MAX_BASKET
+        rows = {
+            source: tuple(zip(*sorted(
+                (basket, item)
+                for basket in range(40)
+                for item in rng.sample(range(1, 30), rng.randint(1, 8))
+            )))
+            for source in ("order", "cart")
+        }
+        rows = {source: (array("q", baskets), array("q", items)) for source, (baskets, items) in rows.items()}
+        weights = {"order": 3.0, "cart": 2.0}
+        options = {**related.related_settings(), "TOP_N": 4, "MAX_BASKET": 5, "MIN_COOCCURRENCE": 4.0}
+        combined = related.combine(rows, ("order", "cart"), weights)
+
+        expected = related.neighbours_python(*combined, options)
+        self.assertTrue(expected)
+        self.assertEqual(related.neighbours_numpy(*combined, options), expected)
+
+    def test_limit_must_be_positive(self):
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        item = Item.objects.create(seller=seller, name="Lamp", price=Decimal(5), status="PUBLISHED")
+        for limit in ("-1", "0", "x"):
+            with self.subTest(limit=limit):
+                response = APIClient().get(f"/api/public-items/{item.pk}/related/", {"limit": limit})
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(VIEW_COUNTS={"FLUSH_INTERVAL": 10, "MAX_PENDING": 2, "MAX_BUFFERED": 3, "MAX_BACKOFF": 300})
+class ViewBufferTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(viewcounts.threading, "Thread")
+        self.thread = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = viewcounts.ViewBuffer()
+
+    def test_add_never_writes(self):
+        with mock.patch.object(viewcounts, "write") as write:
+            for item_id in (1, 2, 3):
+                self.buffer.add(item_id)
+        write.assert_not_called()
+        self.assertTrue(self.buffer.wake.is_set())
+        self.thread.assert_called_once()
+
+    def test_full_buffer_drops_new_items(self):
+        for item_id in (1, 2, 3, 4, 1):
+            self.buffer.add(item_id)
+        self.assertEqual(sum(self.buffer.pending.values()), 4)
+        self.assertEqual(self.buffer.dropped, 1)
+
+    def test_failed_flush_keeps_views_and_backs_off(self):
+        self.buffer.add(1)
+        with mock.patch.object(viewcounts, "write", side_effect=RuntimeError), self.assertLogs(viewcounts.logger):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.failures, 1)
+        self.buffer.add(2)
+        self.assertFalse(self.buffer.wake.is_set())  # no early flush while backing off
+
+        waits = []
+
+        def wait(delay):
+            if len(waits) == 4:
+                raise StopIteration
+            waits.append(delay)
+
+        self.buffer.wake.wait = wait
+        with mock.patch.object(viewcounts, "close_old_connections"), mock.patch.object(viewcounts, "write") as write:
+            write.side_effect = [RuntimeError, RuntimeError, None]
+            with self.assertLogs(viewcounts.logger), self.assertRaises(StopIteration):
+                self.buffer.run()
+        self.assertEqual(waits, [20, 40, 80, 10])
+        self.assertEqual(write.call_args_list[2].args[0], {(1, timezone.localdate()): 1, (2, timezone.localdate()): 1})
+        self.assertEqual(self.buffer.failures, 0)
+
+
+@override_settings(DATABASE_REPLICAS=[])  # as GeoSearchTests
+class ViewCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.item = Item.objects.create(seller=self.seller, name="Lamp", price=Decimal(50), stock=3, status="PUBLISHED")
+
+    def test_item_saves_keep_views_flushed_meanwhile(self):
+        today = timezone.localdate()
+        loaded = Item.objects.get(pk=self.item.pk)
+        viewcounts.write({(self.item.pk, today): 3})
+
+        loaded.stock = 2
+        loaded.save()
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        self.assertEqual(client.patch(f"/api/items/{self.item.pk}/", {"price": "45.00"}, format="json").status_code, 200)
+
+        self.assertEqual(ItemStats.objects.get(pk=self.item.pk).view_count, 3)
+        with mock.patch.object(viewcounts, "record"):
+            self.assertEqual(APIClient().get(f"/api/public-items/{self.item.pk}/").data["view_count"], 3)
+        self.assertEqual(ItemDailyViews.objects.get(item=self.item, day=today).views, 3)
+
+    def test_flush_creates_missing_stats_rows_and_skips_deleted_items(self):
+        today = timezone.localdate()
+        bulk = Item.objects.bulk_create([Item(seller=self.seller, name="Bulk", slug="bulk", price=Decimal(5))])[0]
+        self.assertFalse(ItemStats.objects.filter(pk=bulk.pk).exists())
+
+        viewcounts.write({(bulk.pk, today): 2, (self.item.pk, today): 1, (10**9, today): 4})
+        viewcounts.write({(bulk.pk, today): 1})
+        self.assertEqual(
+            dict(ItemStats.objects.values_list("item_id", "view_count")), {bulk.pk: 3, self.item.pk: 1}
+        )
+        self.assertFalse(ItemDailyViews.objects.filter(item_id=10**9).exists())
+
+
+@override_settings(WISHLIST_ALERTS={"QUIET_SECONDS": 300, "COOLDOWN_HOURS": 24, "BATCH_SIZE": 2})
+class WishlistAlertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.item = Item.objects.create(seller=seller, name="Lamp", price=Decimal(50), stock=3, status="PUBLISHED")
+        self.users = [
+            CustomUser.objects.create_user(email=f"buyer{n}@example.com", full_name="Buyer", password="x", role="BUYER")
+            for n in range(5)
+        ]
+        Wishlist.objects.bulk_create(Wishlist(user=user, item=self.item) for user in self.users)
+
+    def set_price(self, price):
+        self.item.price = Decimal(price)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+
+    def notified(self):
+        return sorted(Notification.objects.filter(title="Price drop").values_list("user_id", flat=True))
+
+    def test_one_read_of_the_stored_row_per_save(self):
+        self.item.price = Decimal(40)
+        with CaptureQueriesContext(connections["default"]) as queries:
+            self.item.save()
+        reads = [query["sql"] for query in queries if query["sql"].startswith("SELECT") and '"stock"' in query["sql"]]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('"status"', reads[0])
+
+    def test_debounced_interrupted_send_notifies_each_wishlister_once(self):
+        for price in (45, 40, 35):
+            self.set_price(price)
+        alert = WishlistAlert.objects.get()
+        self.assertEqual(alert.previous_price, 50)
+
+        self.assertEqual(alerts.send_due(), (0, 0))  # still changing
+        later = timezone.now() + timedelta(seconds=301)
+
+        real_insert, calls = alerts.insert_notifications, []
+
+        def fail_second_batch(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("worker died")
+            real_insert(*args)
+
+        with mock.patch.object(alerts, "insert_notifications", fail_second_batch), self.assertRaises(RuntimeError):
+            alerts.send_due(later)
+        self.assertEqual(len(self.notified()), 2)
+        self.assertTrue(WishlistAlert.objects.get().pending)
+
+        self.assertEqual(alerts.send_due(later), (1, 3))
+        self.assertEqual(self.notified(), sorted(user.pk for user in self.users))
+        alert = WishlistAlert.objects.get()
+        self.assertEqual((alert.pending, alert.cursor), (False, 0))
+
+        self.assertEqual(alerts.send_due(later + timedelta(hours=1)), (0, 0))  # nothing new
+        self.set_price(30)
+        self.assertEqual(alerts.send_due(later + timedelta(hours=2)), (0, 0))  # cooling down
+        self.assertEqual(len(self.notified()), 5)
+
+
+@override_settings(DATABASE_REPLICAS=[])  # as GeoSearchTests
+class MarketplaceDashboardQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.reviewer = CustomUser.objects.create_user(email="buyer@example.com", full_name="Buyer", password="x", role="BUYER")
+        self.category = Category.objects.create(name="Lamps")
+
+    def add_items(self, count):
+        for n in range(count):
+            item = Item.objects.create(
+                seller=self.seller, category=self.category, name=f"Item {n}", price=Decimal(5), status="PUBLISHED"
+            )
+            ItemReview.objects.create(item=item, reviewer=self.reviewer, rating=4)
+            TrendingItem.objects.create(category_id=None, rank=Item.objects.count(), item=item, score=1)
+
+    def test_query_count_does_not_grow_with_items(self):
+        for count in (2, 10):
+            with self.subTest(items=count):
+                self.add_items(count - Item.objects.count())
+                cache.clear()
+                with self.assertNumQueries(4):
+                    response = APIClient().get("/api/dashboard/marketplace/")
+                self.assertEqual(len(response.data["latest_items"]), count)
+                self.assertEqual(len(response.data["trending_items"]), count)
+                self.assertEqual(response.data["latest_items"][0]["reviews_count"], 1)
+
+    def test_category_items_query_count_does_not_grow_with_items(self):
+        for count in (2, 10):
+            with self.subTest(items=count):
+                self.add_items(count - Item.objects.count())
+                with self.assertNumQueries(2):
+                    response = APIClient().get(f"/api/categories/{self.category.slug}/items/")
+                self.assertEqual(len(response.data), count)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.buyer = CustomUser.objects.create_user(email="buyer@example.com", full_name="Buyer", password="x", role="BUYER")
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        other = CustomUser.objects.create_user(email="other@example.com", full_name="Other", password="x", role="SELLER")
+        lamp = Item.objects.create(seller=self.seller, name="Lamp", price=Decimal(5))
+        chair = Item.objects.create(seller=other, name="Chair", price=Decimal(7))
+        self.paid = Order.objects.create(buyer=self.buyer, total_amount=Decimal(12), status="PAID")
+        self.pending = Order.objects.create(buyer=self.buyer, total_amount=Decimal(5))
+        OrderItem.objects.create(order=self.paid, item=lamp, quantity=1, price=Decimal(5))
+        OrderItem.objects.create(order=self.paid, item=chair, quantity=1, price=Decimal(7))
+        OrderItem.objects.create(order=self.pending, item=lamp, quantity=1, price=Decimal(5))
+
+    def get(self, user, url, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url, params)
+        body = b"".join(response.streaming_content).decode() if response.streaming else None
+        return response, body
+
+    def test_order_export_headers_and_rows(self):
+        response, body = self.get(self.buyer, "/api/orders/export/", status="paid")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertRegex(response["Content-Disposition"], r'^attachment; filename="orders-\d{8}-\d{6}\.csv"$')
+        self.assertEqual(response["Cache-Control"], "no-store")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row["order_id"], row["buyer_email"], row["total_amount"]) for row in rows],
+                         [(str(self.paid.pk), "buyer@example.com", "12.00")])
+
+    def test_seller_export_lists_own_lines_of_filtered_orders(self):
+        response, body = self.get(self.seller, "/api/orders/seller-export/", fmt="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row["order_id"], row["item_name"]) for row in rows], [(self.paid.pk, "Lamp"), (self.pending.pk, "Lamp")])
+
+        _, body = self.get(self.seller, "/api/orders/seller-export/", status="PENDING", fmt="ndjson")
+        self.assertEqual([json.loads(line)["order_id"] for line in body.splitlines()], [self.pending.pk])
+
+    def test_unknown_format_is_rejected(self):
+        response, _ = self.get(self.buyer, "/api/orders/export/", fmt="xml")
+        self.assertEqual(response.status_code, 400)
+
+    def test_asgi_export_streams_asynchronously(self):
+        request = AsyncRequestFactory().get("/api/orders/export/")
+        force_authenticate(request, self.buyer)
+        response = OrderViewSet.as_view({"get": "export"})(request)
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+        rows = list(csv.DictReader(io.StringIO(async_to_sync(read)())))
+        self.assertEqual(sorted(row["order_id"] for row in rows), sorted([str(self.paid.pk), str(self.pending.pk)]))
+
+
+class PruneNotificationsTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="reader@example.com", full_name="Reader", password="x")
+        now = timezone.now()
+        # (is_read, age in days) -> deleted with the default 30/180 day retention?
+        self.rows = {}
+        for is_read, days, expired in [
+            (True, 40, True), (False, 40, False), (True, 10, False), (False, 200, True), (True, 31, True),
+        ]:
+            notification = Notification.objects.create(user=self.user, title=f"{is_read} {days}", message="", is_read=is_read)
+            Notification.objects.filter(pk=notification.pk).update(created_at=now - timedelta(days=days))
+            self.rows[notification.pk] = expired
+        archive = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive, ignore_errors=True)
+        self.archive = archive
+
+    def prune(self, *args):
+        out = io.StringIO()
+        call_command("prune_notifications", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_only_counts(self):
+        self.assertIn("3 notification(s) would be deleted", self.prune("--dry-run"))
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_expired_rows_are_deleted_in_id_windows_and_archived(self):
+        output = self.prune("--batch-size", "2", "--archive-dir", self.archive, "--verbosity", "2")
+        kept = sorted(pk for pk, expired in self.rows.items() if not expired)
+        self.assertEqual(sorted(Notification.objects.values_list("pk", flat=True)), kept)
+
+        # windows of two ids, from the oldest candidate row to the newest
+        low = min(self.rows)
+        self.assertIn(f"ids [{low}, {low + 2})", output)
+        self.assertIn(f"ids [{low + 2}, {low + 4})", output)
+
+        [name] = os.listdir(self.archive)
+        with gzip.open(os.path.join(self.archive, name), "rt") as archive:
+            archived = [json.loads(line) for line in archive]
+        self.assertEqual([row["id"] for row in archived], sorted(pk for pk, expired in self.rows.items() if expired))
+        self.assertEqual(set(archived[0]), {"id", "user_id", "title", "message", "is_read", "created_at", "kind", "count"})
+
+    def test_retention_follows_options(self):
+        self.prune("--read-days", "5", "--unread-days", "300")
+        self.assertEqual(sorted(Notification.objects.values_list("is_read", flat=True)), [False, False])
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.local_users.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(user_cache.local_users.clear)
+        self.user = CustomUser.objects.create_user(email="cached@example.com", full_name="Old", password="x")
+
+    def test_hits_need_no_queries(self):
+        self.assertEqual(user_cache.get_cached_user(self.user.pk).full_name, "Old")
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cache.get_cached_user(self.user.pk).profile.user_id, self.user.pk)
+        user_cache.local_users.clear()
+        with self.assertNumQueries(0):  # from the shared tier
+            self.assertEqual(user_cache.get_cached_user(self.user.pk).full_name, "Old")
+
+    def test_saves_invalidate_user_and_profile(self):
+        user_cache.get_cached_user(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.full_name = "New"
+            self.user.save()
+        self.assertEqual(user_cache.get_cached_user(self.user.pk).full_name, "New")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.bio = "Hello"
+            self.user.profile.save()
+        self.assertEqual(user_cache.get_cached_user(self.user.pk).profile.bio, "Hello")
+
+    def test_row_reloaded_before_commit_is_not_served_after_it(self):
+        user_cache.get_cached_user(self.user.pk)
+        stale = CustomUser.objects.select_related("profile").get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.full_name = "New"
+            self.user.save()
+            # another request, not seeing the write yet, reloads and caches the old row
+            version = cache.get(user_cache.version_key(self.user.pk), 0)
+            cache.set(user_cache.user_key(str(self.user.pk), version), stale)
+        self.assertEqual(user_cache.get_cached_user(self.user.pk).full_name, "New")
+
+    def test_local_copy_follows_version_bumped_elsewhere(self):
+        user_cache.get_cached_user(self.user.pk)
+        CustomUser.objects.filter(pk=self.user.pk).update(full_name="New")
+        cache.set(user_cache.version_key(str(self.user.pk)), 5, None)  # another process invalidated
+        self.assertEqual(user_cache.get_cached_user(self.user.pk).full_name, "New")
+
+    @override_settings(SIMPLE_JWT={**settings.SIMPLE_JWT, "USER_ID_FIELD": "email"})
+    def test_users_are_keyed_by_user_id_field(self):
+        self.assertEqual(user_cache.get_cached_user("cached@example.com"), self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.bio = "Hello"
+            self.user.profile.save()
+        self.assertEqual(user_cache.get_cached_user("cached@example.com").profile.bio, "Hello")
+
+
+class ProfileWriteTests(TestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(email="member@example.com", full_name="Member", password="x")
+        self.user = CustomUser.objects.select_related("profile").get(email="member@example.com")
+        self.table = Profile._meta.db_table
+
+    def profile_writes(self, save):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            save()
+        return [query["sql"] for query in queries if query["sql"].startswith("UPDATE") and self.table in query["sql"]]
+
+    def test_unchanged_profile_is_not_written(self):
+        self.assertEqual(self.profile_writes(self.user.save), [])
+        self.assertEqual(self.profile_writes(lambda: self.user.save(update_fields=["last_login"])), [])
+
+    def test_only_changed_fields_are_written(self):
+        self.user.profile.bio = "Hello"
+        [update] = self.profile_writes(self.user.save)
+        self.assertIn('"bio"', update)
+        self.assertNotIn('"phone_number"', update)
+        self.assertEqual(self.profile_writes(self.user.save), [])  # saved values are the new baseline
+
+        self.user.profile.phone_number = "+234 (801) 234-5678"
+        self.user.save()
+        self.assertEqual(Profile.objects.get(user=self.user).phone_number, "2348012345678")
+
+
+class BulkCreateUsersTests(TestCase):
+    def test_users_and_profiles_in_two_inserts(self):
+        users = [
+            CustomUser(email=f"member{n}@EXAMPLE.com", full_name=f"Member {n}", password=make_password("x"))
+            for n in range(3)
+        ]
+        users.append(CustomUser(email="root@example.com", full_name="Root", password=make_password("x"), is_superuser=True))
+        with CaptureQueriesContext(connections["default"]) as queries:
+            created = CustomUser.objects.bulk_create_users(users)
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("INSERT")]), 2)
+
+        self.assertTrue(all(user.pk for user in created))
+        stored = {user.email: user for user in CustomUser.objects.select_related("profile")}
+        self.assertEqual(set(stored), {"member0@example.com", "member1@example.com", "member2@example.com", "root@example.com"})
+        self.assertTrue(stored["member0@example.com"].check_password("x"))
+        self.assertEqual(stored["member0@example.com"].role, CustomUser.Roles.BUYER)
+        self.assertEqual((stored["root@example.com"].role, stored["root@example.com"].is_verified), (CustomUser.Roles.ADMIN, True))
+        self.assertEqual(Profile.objects.count(), 4)
+        self.assertTrue(all(user.profile.pk for user in stored.values()))
+
+
+class SchemaViewTests(SimpleTestCase):
+    YAML = b"openapi: 3.0.3\n" * 100
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(OPENAPI_SCHEMA_DIR=directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.directory = directory
+
+        patcher = mock.patch.object(schema, "render_schema", side_effect=lambda: {"yaml": self.YAML, "json": b'{"openapi":"3.0.3"}'})
+        self.render = patcher.start()
+        self.addCleanup(patcher.stop)
+        schema.store.reset()
+        self.addCleanup(schema.store.reset)
+
+    def get(self, **headers):
+        return SchemaView.as_view()(RequestFactory().get("/api/schema/", **headers))
+
+    def test_etag_and_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.YAML)
+        self.assertEqual(response["Content-Type"], schema.FORMATS["yaml"])
+
+        not_modified = self.get(HTTP_IF_NONE_MATCH=f'"other", {response["ETag"]}')
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_precompressed_variant_is_chosen_by_accept_encoding(self):
+        plain = self.get()
+        packed = self.get(HTTP_ACCEPT_ENCODING="gzip;q=1, identity;q=0.5")
+        self.assertEqual(packed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(packed.content), self.YAML)
+        self.assertNotEqual(packed["ETag"], plain["ETag"])
+        self.assertIn("Accept-Encoding", packed["Vary"])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=plain["ETag"], HTTP_ACCEPT_ENCODING="gzip").status_code, 200)
+
+        self.assertEqual(self.get(HTTP_ACCEPT="application/json").content, b'{"openapi":"3.0.3"}')
+        self.render.assert_called_once()
+
+    def test_build_is_served_without_rendering(self):
+        schema.SchemaArtifact.build("source").write(Path(self.directory))
+        self.render.reset_mock()
+        self.assertEqual(self.get().content, self.YAML)
+        self.render.assert_not_called()
+
+    @override_settings(DEBUG=True)
+    def test_sources_are_only_watched_with_auto_rebuild(self):
+        with mock.patch.object(schema, "source_fingerprint") as fingerprint:
+            self.get()
+            self.get()
+        fingerprint.assert_not_called()
+
+        schema.store.reset()
+        with override_settings(OPENAPI_SCHEMA_AUTO_REBUILD=True), mock.patch.object(schema, "SOURCE_CHECK_INTERVAL", 0), \
+                mock.patch.object(schema, "source_fingerprint", side_effect=["a", "a", "b"]):
+            first = self.get()["ETag"]
+            self.assertEqual(self.get()["ETag"], first)
+            self.YAML = b"openapi: 3.1.0\n" * 100
+            self.assertNotEqual(self.get()["ETag"], first)
+        manifest = json.loads((Path(self.directory) / "manifest.json").read_text())
+        self.assertEqual(manifest["source"], "b")
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_matches_drf(self):
+        data = {
+            "price": Decimal("12.50"),
+            "created": timezone.now(),
+            "day": timezone.now().date(),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "label": gettext_lazy("Lamp"),
+            "text": "caf\u00e9\u2028line\u2029",
+            1: [None, True, 0.5, 2 ** 70],
+        }
+        for value in (data, [data], {"nested": data}):
+            self.assertEqual(FastJSONRenderer().render(value), JSONRenderer().render(value))
+
+    def test_parser_matches_drf(self):
+        body = b'{"name": "caf\\u00e9", "count": 12345678901234567890123, "price": 1.5, "tags": []}'
+        parsed = FastJSONParser().parse(io.BytesIO(body))
+        self.assertEqual(parsed, JSONParser().parse(io.BytesIO(body)))
+        self.assertEqual(parsed["count"], 12345678901234567890123)
+
+    def test_malformed_body_is_rejected(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": '))
+
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(email="buyer@example.com", full_name="Buyer", password="x"))
+        response = client.post("/api/addresses/", b'{"city": "Lagos",', content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["detail"])
+
+
+class CompressionTests(SimpleTestCase):
+    BODY = b'{"name": "lamp"}' * 100
+
+    def respond(self, accept_encoding=None, body=BODY, **headers):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding) if accept_encoding else RequestFactory().get("/")
+        response = HttpResponse(body, content_type=headers.pop("content_type", "application/json"))
+        for name, value in headers.items():
+            response[name] = value
+        return compression.compress_response(request, response)
+
+    def test_negotiation(self):
+        offered = ("br", "gzip")
+        self.assertEqual(compression.negotiate_encoding("gzip, br", offered), "br")
+        self.assertEqual(compression.negotiate_encoding("br;q=0, gzip;q=0.5", offered), "gzip")
+        self.assertEqual(compression.negotiate_encoding("*", offered), "br")
+        self.assertEqual(compression.negotiate_encoding("*;q=0, gzip", offered), "gzip")
+        self.assertIsNone(compression.negotiate_encoding("identity", offered))
+        self.assertIsNone(compression.negotiate_encoding("gzip;q=0", offered))
+        self.assertIsNone(compression.negotiate_encoding("", offered))
+
+    @mock.patch.object(compression, "brotli", None)
+    def test_gzip_body_and_vary(self):
+        response = self.respond("br, gzip", ETag='"v1"')
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], 'W/"v1"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        plain = self.respond()
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(plain.content, self.BODY)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+    def test_skipped_responses(self):
+        small = self.respond("gzip", body=b"{}")
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(small.has_header("Vary"))
+
+        encoded = self.respond("gzip", body=b"already", **{"Content-Encoding": "br"})
+        self.assertEqual((encoded["Content-Encoding"], encoded.content), ("br", b"already"))
+
+        for headers in ({"content_type": "text/html"}, {"content_type": "image/png"}, {"Cache-Control": "no-transform"}):
+            response = self.respond("gzip", **headers)
+            self.assertFalse(response.has_header("Content-Encoding"), headers)
+            self.assertEqual(response.content, self.BODY)
+
+        with override_settings(COMPRESSION={"ENABLED": False}):
+            self.assertFalse(self.respond("gzip").has_header("Content-Encoding"))
+
+    def test_streaming_response_is_compressed_per_chunk(self):
+        response = StreamingHttpResponse(iter([b"a,b\n", b"c,d\n"]), content_type="text/csv")
+        response = compression.compress_response(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip"), response)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"a,b\nc,d\n")
+
+
+@override_settings(DATABASE_REPLICAS=[])  # as GeoSearchTests
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        for n in range(10):
+            Item.objects.create(seller=seller, name=f"Item {n}", description="x" * 50, price=Decimal(5), status="PUBLISHED")
+
+    def test_cached_variant_follows_accept_encoding(self):
+        client = APIClient()
+        packed = client.get("/api/public-items/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(packed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", packed["Vary"])
+        self.assertEqual(len(json.loads(gzip.decompress(packed.content))["results"]), 10)
+
+        # the cached gzip body isn't handed to a client that didn't ask for it
+        plain = client.get("/api/public-items/")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(len(json.loads(plain.content)["results"]), 10)
+
+        with CaptureQueriesContext(connections["default"]) as queries:
+            self.assertEqual(client.get("/api/public-items/").content, plain.content)
+            self.assertEqual(client.get("/api/public-items/", HTTP_ACCEPT_ENCODING="gzip").content, packed.content)
+        self.assertEqual(len(queries), 0)
+
+
+@override_settings(DATABASE_REPLICAS=[])  # as GeoSearchTests
+class ShapingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.category = Category.objects.create(name="Lamps", slug="lamps")
+        now = timezone.now()
+        for n, name in enumerate(("Old", "Middle", "New")):
+            item = Item.objects.create(
+                seller=self.seller, category=self.category, name=name, description="Bright", price=Decimal(5), status="PUBLISHED",
+            )
+            Item.objects.filter(pk=item.pk).update(created_at=now + timedelta(minutes=n))
+        ItemReview.objects.create(item=item, reviewer=self.seller, rating=4)
+
+    def results(self, **params):
+        response = APIClient().get("/api/public-items/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_annotated_lists_keep_model_ordering(self):
+        queryset = shape_queryset(Item.objects.all(), ItemSerializer())
+        self.assertTrue(queryset.ordered)
+        self.assertEqual([item.name for item in queryset], ["New", "Middle", "Old"])
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", UnorderedObjectListWarning)
+            rows = self.results()
+        self.assertEqual([row["name"] for row in rows], ["New", "Middle", "Old"])
+        self.assertEqual((rows[0]["reviews_count"], rows[0]["average_rating"]), (1, 4))
+
+        # an explicit ordering is left alone
+        self.assertEqual(
+            [item.name for item in shape_queryset(Item.objects.order_by("name"), ItemSerializer())], ["Middle", "New", "Old"]
+        )
+
+    def test_fields_narrow_response_and_columns(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            rows = self.results(fields="id,name,seller.full_name")
+        self.assertEqual(rows[0], {"id": rows[0]["id"], "name": "New", "seller": {"full_name": "Seller"}})
+        item_query = next(query["sql"] for query in queries if '"items_item"."name"' in query["sql"] and "LIMIT" in query["sql"])
+        self.assertNotIn('"items_item"."description"', item_query)
+
+    def test_omit(self):
+        row = self.results(omit="description,seller.profile,reviews_count")[0]
+        self.assertNotIn("description", row)
+        self.assertNotIn("reviews_count", row)
+        self.assertNotIn("profile", row["seller"])
+        self.assertEqual(row["seller"]["full_name"], "Seller")
+
+    def test_expand(self):
+        row = self.results()[0]
+        self.assertEqual((row["seller"]["id"], row["category"]), (self.seller.pk, self.category.pk))
+
+        row = self.results(expand="category")[0]
+        self.assertEqual(row["seller"], self.seller.pk)
+        self.assertEqual(row["category"], {"id": self.category.pk, "name": "Lamps", "slug": "lamps", "description": ""})
+
+        row = self.results(expand="")[0]
+        self.assertEqual((row["seller"], row["category"]), (self.seller.pk, self.category.pk))
+
+
+class FacetIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.books = Category.objects.create(name="Books", slug="books")
+        self.lamps = Category.objects.create(name="Lamps", slug="lamps")
+
+    def cells(self):
+        return {
+            row[:4]: row[4]
+            for row in CatalogFacetCount.objects.exclude(count=0).values_list("category_id", "condition", "is_free", "bucket", "count")
+        }
+
+    def rebuilt(self):
+        facets.rebuild_index()
+        return self.cells()
+
+    def test_counts_follow_category_status_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = Item.objects.create(seller=self.seller, category=self.books, name="Atlas", price=Decimal(30), status="PUBLISHED")
+            Item.objects.create(seller=self.seller, category=self.books, name="Draft", price=Decimal(30), status="DRAFT")
+        self.assertEqual(self.cells(), {(self.books.pk, "NEW", False, 2): 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.category = self.lamps
+            item.save()
+        self.assertEqual(self.cells(), {(self.lamps.pk, "NEW", False, 2): 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.price = Decimal(5)
+            item.save(update_fields=["price"])
+        self.assertEqual(self.cells(), {(self.lamps.pk, "NEW", False, 0): 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stale = Item.objects.only("pk").get(pk=item.pk)
+            stale.status = "SOLD"
+            stale.save(update_fields=["status"])
+        self.assertEqual(self.cells(), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.refresh_from_db()
+            item.status = "PUBLISHED"
+            item.save()
+        self.assertEqual(self.cells(), self.rebuilt())
+        self.assertEqual(self.cells(), {(self.lamps.pk, "NEW", False, 0): 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self.cells(), {})
+
+    def test_moves_wait_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = Item.objects.create(seller=self.seller, category=self.books, name="Atlas", price=Decimal(30), status="PUBLISHED")
+        generation = facets.generation()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            item.category = self.lamps
+            item.save()
+        self.assertEqual(self.cells(), {(self.books.pk, "NEW", False, 2): 1})
+        self.assertEqual(facets.generation(), generation)
+
+        for callback in callbacks:  # the transaction commits
+            callback()
+        self.assertEqual(self.cells(), {(self.lamps.pk, "NEW", False, 2): 1})
+        self.assertGreater(facets.generation(), generation)
+
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(autocomplete.reset_index)
+        self.seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+
+    def labels(self, index, query, limit=8):
+        return [entry[2] for entry in index.search(query, limit)]
+
+    def test_prefix_matching(self):
+        index = autocomplete.PrefixIndex([
+            ("item", 1, "Mountain Bike", "mountain-bike", 0),
+            ("item", 2, "Café Table", "cafe-table", 0),
+            ("item", 3, "Big red vintage lamp", "lamp", 0),
+            ("category", 1, "Bikes", "bikes", 0),
+        ])
+        self.assertEqual(self.labels(index, "mo"), ["Mountain Bike"])
+        self.assertEqual(self.labels(index, "BI"), ["Bikes", "Mountain Bike", "Big red vintage lamp"])
+        self.assertEqual(self.labels(index, "mountain b"), ["Mountain Bike"])
+        self.assertEqual(self.labels(index, "cafe"), ["Café Table"])
+        self.assertEqual(self.labels(index, "café, t"), ["Café Table"])
+        self.assertEqual(self.labels(index, "vintage"), ["Big red vintage lamp"])
+        # only the first MAX_WORDS words start a key
+        self.assertEqual(self.labels(index, "lamp"), [])
+        self.assertEqual(self.labels(index, "  "), [])
+
+    def test_ranking(self):
+        entries = [("item", n, f"Lamp {n}", f"lamp-{n}", n % 3) for n in range(1, 7)]
+        for scan_limit in (1000, 2):  # ranked per query, and from the cached top lists
+            with self.subTest(scan_limit=scan_limit):
+                index = autocomplete.PrefixIndex(entries, options={**autocomplete.autocomplete_settings(), "SCAN_LIMIT": scan_limit})
+                self.assertEqual(self.labels(index, "la", 3), ["Lamp 2", "Lamp 5", "Lamp 1"])
+
+                index.upsert("item", 1, "Lamp 1", "lamp-1", 9)
+                index.upsert("item", 7, "Lamp", "lamp", 2)
+                self.assertEqual(self.labels(index, "la", 3), ["Lamp 1", "Lamp", "Lamp 2"])
+                index.remove("item", 1)
+                self.assertEqual(self.labels(index, "la", 3), ["Lamp", "Lamp 2", "Lamp 5"])
+                # a rename keeps the entry's popularity (None); ties go to shorter labels
+                index.upsert("item", 7, "Floor lamp", "floor-lamp", None)
+                self.assertEqual(self.labels(index, "la", 3), ["Lamp 2", "Lamp 5", "Floor lamp"])
+                self.assertEqual(self.labels(index, "fl"), ["Floor lamp"])
+
+    def test_journal_replay_after_edits_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp = Item.objects.create(seller=self.seller, name="Desk lamp", price=Decimal(5), status="PUBLISHED")
+            chair = Item.objects.create(seller=self.seller, name="Chair", price=Decimal(5), status="PUBLISHED")
+            Item.objects.create(seller=self.seller, name="Desk", price=Decimal(5), status="DRAFT")
+        other = autocomplete.build_index()  # another process's copy
+        autocomplete.reset_index(autocomplete.build_index())
+        self.assertEqual(self.labels(other, "desk"), ["Desk lamp"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp.name = "Reading lamp"
+            lamp.save()
+            chair.delete()
+            Category.objects.create(name="Desks", slug="desks")
+        # this process applied its own changes at once
+        self.assertEqual(self.labels(autocomplete.get_index(), "desk"), ["Desks"])
+
+        seq, _ = autocomplete.journal_position()
+        self.assertTrue(autocomplete.replay(other, seq))
+        self.assertEqual(self.labels(other, "desk"), ["Desks"])
+        self.assertEqual(self.labels(other, "read"), ["Reading lamp"])
+        self.assertEqual(self.labels(other, "chair"), [])
+        self.assertEqual(
+            sorted(other.entries()), sorted(autocomplete.build_index().entries())
+        )
+
+        # a process that missed changes the journal no longer holds rebuilds
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp.delete()
+        cache.delete(autocomplete.change_key(seq + 1))
+        self.assertFalse(autocomplete.replay(other, seq + 1))
+        other.synced_at = 0
+        with mock.patch.object(autocomplete, "rebuild_in_background") as rebuild:
+            autocomplete.sync(other)
+        rebuild.assert_called_once()
+
+    def test_cold_start_does_not_wait_for_a_build(self):
+        Item.objects.create(seller=self.seller, name="Desk lamp", price=Decimal(5), status="PUBLISHED")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        snapshot = Path(directory) / "autocomplete.json"
+        with override_settings(AUTOCOMPLETE={"SNAPSHOT": snapshot}):
+            autocomplete.reset_index()
+            with mock.patch.object(autocomplete, "rebuild_in_background") as rebuild, self.assertNumQueries(0):
+                self.assertEqual(autocomplete.search("desk"), [])
+            rebuild.assert_called_once()
+
+            autocomplete.write_snapshot(autocomplete.build_index())
+            autocomplete.reset_index()
+            with self.assertNumQueries(0):
+                self.assertEqual([entry[2] for entry in autocomplete.search("desk")], ["Desk lamp"])
+
+    def test_endpoint(self):
+        autocomplete.reset_index(autocomplete.PrefixIndex([
+            ("item", 1, "Desk lamp", "desk-lamp", 5),
+            ("category", 2, "Desks", "desks", 1),
+        ]))
+        response = APIClient().get("/api/autocomplete/", {"q": "des", "limit": 1})
+        self.assertEqual(response.json(), {"results": [{"type": "item", "id": 1, "label": "Desk lamp", "slug": "desk-lamp"}]})
+        self.assertEqual(len(APIClient().get("/api/autocomplete/", {"q": "des"}).json()["results"]), 2)
+        for limit in ("0", "-2", "x"):
+            response = APIClient().get("/api/autocomplete/", {"q": "des", "limit": limit})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("limit", response.json())
+
+
+class WishlistBulkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.buyer = CustomUser.objects.create_user(email="buyer@example.com", full_name="Buyer", password="x", role="BUYER")
+        self.items = [Item.objects.create(seller=seller, name=f"Item {n}", price=Decimal(5), status="PUBLISHED") for n in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def post(self, action, item_ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/wishlist/{action}/", {"item_ids": item_ids}, format="json")
+
+    def counts(self):
+        return [ItemStats.objects.get(pk=item.pk).wishlist_count for item in self.items]
+
+    def test_bulk_add_counts_only_new_rows(self):
+        first, second, third, _ = (item.pk for item in self.items)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/wishlist/add/", {"item_id": first}, format="json")
+
+        with mock.patch.object(wishlist_bulk, "lock_wishlist", wraps=wishlist_bulk.lock_wishlist) as lock:
+            response = self.post("bulk-add", [third, first, second, third, 10**9])
+        lock.assert_called_once_with(self.buyer)
+        self.assertEqual(response.data, {"added": [second, third]})
+        self.assertEqual(self.counts(), [1, 1, 1, 0])
+        self.assertEqual(self.post("bulk-add", [first, second]).data, {"added": []})
+        self.assertEqual(self.counts(), [1, 1, 1, 0])
+        self.assertEqual(sorted(Wishlist.objects.filter(user=self.buyer).values_list("item_id", flat=True)), [first, second, third])
+
+        for item_ids in ([], ["x"], list(range(wishlist_bulk.MAX_ITEMS + 1))):
+            self.assertEqual(self.post("bulk-add", item_ids).status_code, 400)
+
+    def test_bulk_remove(self):
+        first, second, third, _ = (item.pk for item in self.items)
+        self.post("bulk-add", [first, second, third])
+        self.assertEqual(self.post("bulk-remove", [first, third, 10**9]).data, {"removed": 2})
+        self.assertEqual(self.counts(), [0, 1, 0, 0])
+        self.assertEqual(self.post("bulk-remove", [first]).data, {"removed": 0})
+        self.assertEqual(self.counts(), [0, 1, 0, 0])
+        self.assertEqual(list(Wishlist.objects.values_list("item_id", flat=True)), [second])
+
+    def test_compact_endpoints(self):
+        first, second, third, fourth = (item.pk for item in self.items)
+        now = timezone.now()
+        for minutes, item_id in enumerate((second, fourth, first)):
+            Wishlist.objects.filter(pk=Wishlist.objects.create(user=self.buyer, item_id=item_id).pk).update(
+                added_at=now + timedelta(minutes=minutes)
+            )
+        Wishlist.objects.create(user=CustomUser.objects.create_user(email="other@example.com", full_name="Other", password="x"), item_id=third)
+
+        self.assertEqual(self.client.get("/api/wishlist/ids/").data, {"item_ids": [first, fourth, second]})
+        response = self.client.get("/api/wishlist/contains/", {"item_ids": f"{fourth},{third}, {first},{10**9}"})
+        self.assertEqual(response.data, {"item_ids": [first, fourth]})
+
+        self.assertEqual(self.client.get("/api/wishlist/contains/", {"item_ids": "1,x"}).status_code, 400)
+        too_many = ",".join(str(n) for n in range(wishlist_bulk.MAX_ITEMS + 1))
+        self.assertEqual(self.client.get("/api/wishlist/contains/", {"item_ids": too_many}).status_code, 400)
+        self.assertEqual(APIClient().get("/api/wishlist/ids/").status_code, 401)
+
+
+class ItemStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = CustomUser.objects.create_user(email="seller@example.com", full_name="Seller", password="x", role="SELLER")
+        self.buyer = CustomUser.objects.create_user(email="buyer@example.com", full_name="Buyer", password="x", role="BUYER")
+        self.lamp = Item.objects.create(seller=seller, name="Lamp", price=Decimal(5), stock=10, status="PUBLISHED")
+        self.chair = Item.objects.create(seller=seller, name="Chair", price=Decimal(7), stock=10, status="PUBLISHED")
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def counters(self, item):
+        row = ItemStats.objects.get(pk=item.pk)
+        return row.wishlist_count, row.cart_count, row.sold_count
+
+    def post(self, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, data, format="json")
+
+    def test_wishlist_and_cart(self):
+        self.post("/api/wishlist/add/", {"item_id": self.lamp.pk})
+        self.post("/api/wishlist/add/", {"item_id": self.lamp.pk})  # already there
+        self.post("/api/wishlist/bulk-add/", {"item_ids": [self.lamp.pk, self.chair.pk]})
+        self.assertEqual((self.counters(self.lamp), self.counters(self.chair)), ((1, 0, 0), (1, 0, 0)))
+
+        cart = Cart.objects.create(buyer=self.buyer)
+        self.post(f"/api/carts/{cart.pk}/add_item/", {"item": self.lamp.pk, "quantity": 2})
+        self.post(f"/api/carts/{cart.pk}/add_item/", {"item": self.lamp.pk})  # more of the same
+        self.assertEqual(self.counters(self.lamp), (1, 1, 0))
+
+        self.post("/api/wishlist/remove/", {"item_id": self.lamp.pk})
+        self.post(f"/api/carts/{cart.pk}/remove_item/", {"item": self.lamp.pk})
+        self.assertEqual(self.counters(self.lamp), (0, 0, 0))
+
+    def test_orders_cancel_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(buyer=self.buyer, total_amount=Decimal(17), status="PAID")
+            OrderItem.objects.create(order=order, item=self.lamp, quantity=2, price=Decimal(10))
+            OrderItem.objects.create(order=order, item=self.chair, quantity=1, price=Decimal(7))
+        self.assertEqual((self.counters(self.lamp)[2], self.counters(self.chair)[2]), (2, 1))
+
+        for status, sold in (("CANCELLED", (0, 0)), ("PAID", (2, 1)), ("SHIPPED", (2, 1))):
+            with self.captureOnCommitCallbacks(execute=True):
+                order.status = status
+                order.save()
+            self.assertEqual((self.counters(self.lamp)[2], self.counters(self.chair)[2]), sold, status)
+
+        # deleting items reads no order status: the order is loaded or being deleted
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connections["default"]) as queries:
+            order.items.filter(item=self.chair).delete()
+        self.assertFalse([query for query in queries if query["sql"].startswith("SELECT") and '"orders_order"' in query["sql"]])
+        self.assertEqual(self.counters(self.chair)[2], 0)
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connections["default"]) as queries:
+            order.delete()
+        self.assertFalse([query for query in queries if query["sql"].startswith("SELECT") and '"orders_order"' in query["sql"]])
+        self.assertEqual(self.counters(self.lamp)[2], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelled = Order.objects.create(buyer=self.buyer, total_amount=Decimal(5), status="CANCELLED")
+            OrderItem.objects.create(order=cancelled, item=self.lamp, quantity=1, price=Decimal(5))
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem.objects.filter(order=cancelled).delete()
+        self.assertEqual(self.counters(self.lamp)[2], 0)
+
+    def test_reconcile_fixes_drift_and_creates_missing_rows(self):
+        Wishlist.objects.create(user=self.buyer, item=self.lamp)
+        cart = Cart.objects.create(buyer=self.buyer)
+        CartItem.objects.create(cart=cart, item=self.lamp, quantity=3)
+        paid = Order.objects.create(buyer=self.buyer, total_amount=Decimal(5), status="PAID")
+        OrderItem.objects.create(order=paid, item=self.lamp, quantity=4, price=Decimal(5))
+        # writes that send no signals
+        cancelled = Order.objects.create(buyer=self.buyer, total_amount=Decimal(5), status="PAID")
+        OrderItem.objects.create(order=cancelled, item=self.chair, quantity=2, price=Decimal(5))
+        Order.objects.filter(pk=cancelled.pk).update(status="CANCELLED")
+        ItemStats.objects.filter(pk=self.lamp.pk).update(wishlist_count=7, cart_count=-1, sold_count=0)
+        ItemStats.objects.filter(pk=self.chair.pk).delete()
+        bulk = Item.objects.bulk_create([Item(seller=self.lamp.seller, name="Bulk", slug="bulk", price=Decimal(5))])[0]
+        Wishlist.objects.bulk_create([Wishlist(user=self.buyer, item=bulk)])
+
+        out = io.StringIO()
+        call_command("reconcile_item_stats", batch_size=2, stdout=out)
+        self.assertIn("Checked 3 item(s): fixed 1, created 2 stats row(s)", out.getvalue())
+        self.assertEqual(self.counters(self.lamp), (1, 1, 4))
+        self.assertEqual(self.counters(self.chair), (0, 0, 0))
+        self.assertEqual(self.counters(bulk), (1, 0, 0))
+
+        out = io.StringIO()
+        call_command("reconcile_item_stats", stdout=out)
+        self.assertIn("fixed 0, created 0", out.getvalue())
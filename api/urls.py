@@ -20,6 +20,10 @@ from api.views import (
     PaymentViewSet,
     NotificationViewSet,
     ItemStatsView,
+    AutocompleteView,
+    VideoUploadView,
+    DatabasePoolStatsView,
+    notification_stream,
 )
 
 router = DefaultRouter()
@@ -44,5 +48,9 @@ urlpatterns = [
     path("dashboard/buyer/", BuyerDashboardView.as_view(), name="buyer-dashboard"),
     path("dashboard/marketplace/", MarketplaceDashboardView.as_view(), name="marketplace-dashboard"),
     path("items/<int:pk>/stats/", ItemStatsView.as_view(), name="item-stats"),
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
+    path("notifications/stream/", notification_stream, name="notification-stream"),
+    path("health/db-pool/", DatabasePoolStatsView.as_view(), name="db-pool-stats"),
+    path("video-uploads/<uuid:pk>/", VideoUploadView.as_view(), name="video-upload"),
     path("", include(router.urls)),
 ]
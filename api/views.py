@@ -1,23 +1,49 @@
-from django.db.models import Count, Avg
+import base64
+import binascii
+import math
+from collections.abc import Mapping
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Count, Avg, Sum
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.cache import cache_page
 
 from rest_framework import viewsets, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.generics import GenericAPIView
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.throttling import BaseThrottle
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
 
+from django_filters import utils as filter_utils
 from django_filters.rest_framework import DjangoFilterBackend
 
 from users.models import CustomUser, Address
-from items.models import Item, ItemReview, Category
+from users.authentication import CachedJWTAuthentication
+from users.ratelimit import check_login_rate
+from items.models import Item, ItemDailyViews, ItemReview, Category, VideoUpload
+from items import autocomplete, trending, uploads, viewcounts
+from items import related as related_items
+from items.facets import FACET_FIELDS, cached_facets
 from orders.models import Order, OrderItem
 from payments.models import Payment
 from notifications.models import Notification
+from notifications import inbox
+from notifications.stream import TICKET_TTL, event_stream, issue_ticket, redeem_ticket
 from wishlist.models import Wishlist
+from wishlist import bulk as wishlist_bulk
 from cart.models import Cart, CartItem
 
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 
 from api.serializers import (
     CustomLoginSerializer,
@@ -27,6 +53,7 @@ from api.serializers import (
     CategorySerializer,
     ItemSerializer,
     ItemReviewSerializer,
+    VideoUploadSerializer,
     OrderSerializer,
     PaymentSerializer,
     NotificationSerializer,
@@ -39,7 +66,19 @@ from api.serializers import (
     MarketplaceDashboardSerializer,
 )
 
-from api.filters import ItemFilter
+from api.filters import ItemFilter, OrderFilter, filter_signature
+from regive.compression import compressed
+from regive.db_router import replica_reads
+from regive.db_pool import pool_stats
+from api.shaping import SHAPE_PARAMETERS, ShapedQuerysetMixin, shape_queryset
+from api.exports import (
+    EXPORT_FORMATS,
+    ORDER_COLUMNS,
+    SELLER_ORDER_COLUMNS,
+    PAYMENT_COLUMNS,
+    ITEM_COLUMNS,
+    export_response,
+)
 from api.permissions import IsBuyer, IsSeller, IsOwnerOrReadOnly, IsApprovedAdmin
 from dj_rest_auth.views import LoginView
 
@@ -49,11 +88,54 @@ class DefaultPagination(PageNumberPagination):
     max_page_size = 200
 
 
+class ReplicaReadMixin:
+    """
+    Serve safe-method requests from a read replica (DATABASE_REPLICAS).
+    Any write during the request pins the rest of it to the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in permissions.SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class CatalogCacheMixin:
+    """
+    Cache GET responses of public catalog views for CATALOG_CACHE_TIMEOUT
+    seconds. Responses are compressed before they are cached, so each
+    encoding is stored once and hits are served without recompressing.
+    Only for views whose output doesn't depend on the requesting user.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        view = compressed(super().dispatch)
+        if request.method in ("GET", "HEAD"):
+            view = cache_page(settings.CATALOG_CACHE_TIMEOUT, key_prefix="catalog")(view)
+        return view(request, *args, **kwargs)
+
 
 class WishlistAddInputSerializer(serializers.Serializer):
     item_id = serializers.IntegerField()
 
 
+class WishlistBulkInputSerializer(serializers.Serializer):
+    item_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=wishlist_bulk.MAX_ITEMS)
+
+
+class WishlistBulkAddResultSerializer(serializers.Serializer):
+    added = serializers.ListField(child=serializers.IntegerField())
+
+
+class WishlistBulkRemoveResultSerializer(serializers.Serializer):
+    removed = serializers.IntegerField()
+
+
+class WishlistItemIdsSerializer(serializers.Serializer):
+    item_ids = serializers.ListField(child=serializers.IntegerField())
+
+
 class CheckoutInputSerializer(serializers.Serializer):
     shipping_address = serializers.IntegerField()
 
@@ -64,11 +146,142 @@ class ItemStatsSerializer(serializers.Serializer):
     total_reviews = serializers.IntegerField()
 
 
+class FacetValueSerializer(serializers.Serializer):
+    value = serializers.CharField()
+    label = serializers.CharField(required=False)
+    min = serializers.IntegerField(required=False)
+    max = serializers.IntegerField(required=False, allow_null=True)
+    count = serializers.IntegerField()
+
+
+class CatalogFacetsSerializer(serializers.Serializer):
+    total = serializers.IntegerField()
+    category = FacetValueSerializer(many=True)
+    condition = FacetValueSerializer(many=True)
+    is_free = FacetValueSerializer(many=True)
+    price = FacetValueSerializer(many=True)
+
+
+class AutocompleteSuggestionSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=[autocomplete.ITEM, autocomplete.CATEGORY])
+    id = serializers.IntegerField()
+    label = serializers.CharField()
+    slug = serializers.CharField()
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    results = AutocompleteSuggestionSerializer(many=True)
+
+
+class UnreadCountSerializer(serializers.Serializer):
+    unread_count = serializers.IntegerField()
+
+
+class StreamTicketSerializer(serializers.Serializer):
+    ticket = serializers.CharField()
+    expires_in = serializers.IntegerField()
+
+
+class MarkReadInputSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    up_to = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if "ids" not in attrs and "up_to" not in attrs:
+            raise serializers.ValidationError("Provide ids and/or up_to.")
+        return attrs
+
+
+class MarkReadResultSerializer(serializers.Serializer):
+    updated = serializers.IntegerField()
+    unread_count = serializers.IntegerField()
+
+
+class DatabasePoolSerializer(serializers.Serializer):
+    alias = serializers.CharField()
+    max_size = serializers.IntegerField()
+    in_use = serializers.IntegerField()
+    idle = serializers.IntegerField()
+    open = serializers.IntegerField()
+    created = serializers.IntegerField()
+    waits = serializers.IntegerField()
+    timeouts = serializers.IntegerField()
+
+
+TUS_VERSION = "1.0.0"
+
+
+def parse_upload_metadata(header):
+    """
+    Parse a tus `Upload-Metadata` header: comma-separated "key base64value" pairs.
+    """
+    metadata = {}
+    for pair in filter(None, (p.strip() for p in (header or "").split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value).decode() if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            continue
+    return metadata
+
+
+EXPORT_PARAMETERS = [
+    OpenApiParameter("fmt", str, enum=list(EXPORT_FORMATS), description="Export format (default csv)"),
+]
+
+
+def streamed_export(request, queryset, columns, basename):
+    """Stream `queryset` in the format requested via ?fmt= (csv by default)."""
+    fmt = request.query_params.get("fmt", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return Response({"error": f"fmt must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+    return export_response(queryset, columns, basename, fmt, asynchronous=isinstance(request._request, ASGIRequest))
+
+
+def limit_param(request, default=None):
+    """?limit= as a positive integer; `default` when it is absent."""
+    value = request.query_params.get("limit")
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise serializers.ValidationError({"limit": ["Must be a positive integer."]})
+    return limit
+
+
+def upload_headers(upload):
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.length),
+        "Cache-Control": "no-store",
+    }
+
+
 
 @extend_schema(tags=["Auth"], summary="Custom login (dj-rest-auth override)")
 class CustomLoginView(LoginView):
     serializer_class = CustomLoginSerializer
 
+    def post(self, request, *args, **kwargs):
+        # not validated yet: the body may be any JSON value; the serializer rejects bad ones with a 400
+        email = request.data.get("email") if isinstance(request.data, Mapping) else None
+        retry_after = check_login_rate(self.get_ident(request), email if isinstance(email, str) else None)
+        if retry_after:
+            return Response(
+                {"error": "Too many login attempts, try again later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        return super().post(request, *args, **kwargs)
+
+    def get_ident(self, request):
+        # client IP, honouring REST_FRAMEWORK["NUM_PROXIES"] like DRF throttles
+        return BaseThrottle().get_ident(request)
+
 
 @extend_schema(tags=["Auth"], request=CustomRegisterSerializer, responses=UserSerializer)
 class RegisterUserView(GenericAPIView):
@@ -118,8 +331,22 @@ class SellerDashboardView(GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         items = Item.objects.filter(seller=request.user)
+        since = timezone.localdate() - timedelta(days=29)
+        totals = items.aggregate(
+            total_views=Sum("stats__view_count"),
+            wishlist_count=Sum("stats__wishlist_count"),
+            cart_count=Sum("stats__cart_count"),
+            sold_count=Sum("stats__sold_count"),
+        )
         data = {
             "items_count": items.count(),
+            **{name: total or 0 for name, total in totals.items()},
+            "daily_views": list(
+                ItemDailyViews.objects.filter(item__seller=request.user, day__gte=since)
+                .values("day")
+                .annotate(views=Sum("views"))
+                .order_by("day")
+            ),
             "category_stats": list(items.values("category__name").annotate(total=Count("id"))),
             "average_rating": round(
                 ItemReview.objects.filter(item__seller=request.user).aggregate(avg=Avg("rating"))["avg"] or 0, 2
@@ -147,7 +374,7 @@ class BuyerDashboardView(GenericAPIView):
 
 @extend_schema_view(get=extend_schema(responses=MarketplaceDashboardSerializer))
 @extend_schema(tags=["Dashboard"])
-class MarketplaceDashboardView(GenericAPIView):
+class MarketplaceDashboardView(ReplicaReadMixin, GenericAPIView):
     permission_classes = [permissions.AllowAny]
     serializer_class = MarketplaceDashboardSerializer
 
@@ -155,16 +382,36 @@ class MarketplaceDashboardView(GenericAPIView):
         top_categories = list(
             Category.objects.annotate(total=Count("items")).order_by("-total")[:5].values("name", "total")
         )
-        latest_items = Item.objects.filter(status="PUBLISHED").order_by("-created_at")[:10]
+        fields = self.get_serializer().fields
+        published = Item.objects.filter(status="PUBLISHED")
+        latest_items = shape_queryset(published, fields["latest_items"].child).order_by("-created_at")[:10]
+        trending_ids = trending.top_items(limit=10)
+        trending_items = shape_queryset(published, fields["trending_items"].child).in_bulk(trending_ids)
         # MarketplaceDashboardSerializer is expected to accept a dict with keys used inside it
         serializer = self.get_serializer(
-            {"top_categories": top_categories, "latest_items": latest_items}
+            {
+                "top_categories": top_categories,
+                "latest_items": latest_items,
+                "trending_items": [trending_items[pk] for pk in trending_ids if pk in trending_items],
+            }
         )
         return Response(serializer.data)
 
 
+@extend_schema(tags=["Health"], responses=DatabasePoolSerializer(many=True))
+class DatabasePoolStatsView(GenericAPIView):
+    """Connection pool metrics for this worker process (ASGI workers only)."""
+    permission_classes = [permissions.IsAuthenticated, IsApprovedAdmin]
+    serializer_class = DatabasePoolSerializer
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(pool_stats(), many=True).data)
+
+
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Address"])
-class AddressViewSet(viewsets.ModelViewSet):
+class AddressViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None
@@ -177,8 +424,9 @@ class AddressViewSet(viewsets.ModelViewSet):
 
 
 
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Categories"])
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = "slug"
@@ -190,12 +438,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["get"])
     def items(self, request, slug=None):
         category = get_object_or_404(Category, slug=slug)
-        items = Item.objects.filter(category=category, status="PUBLISHED")
+        items = shape_queryset(Item.objects.filter(category=category, status="PUBLISHED"), ItemSerializer())
         return Response(ItemSerializer(items, many=True).data)
 
 
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Marketplace"])
-class PublicItemViewSet(viewsets.ReadOnlyModelViewSet):
+class PublicItemViewSet(CatalogCacheMixin, ReplicaReadMixin, ShapedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ItemSerializer
     permission_classes = [permissions.AllowAny]
     queryset = Item.objects.filter(status="PUBLISHED")
@@ -203,9 +452,110 @@ class PublicItemViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = ItemFilter
     pagination_class = DefaultPagination
 
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        # counted here, outside the page cache, so cached item pages count too
+        if request.method == "GET" and response.status_code == 200 and self.action_map.get("get") == "retrieve":
+            viewcounts.record(kwargs["pk"])
+        return response
 
+    @action(detail=False, methods=["get"])
+    @extend_schema(
+        responses=CatalogFacetsSerializer,
+        description=(
+            "Item counts per category, condition, is_free and price bucket for the "
+            "same filters as the list. Each facet ignores its own selection."
+        ),
+    )
+    def facets(self, request):
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise filter_utils.translate_validation(filterset.errors)
+
+        cleaned = filterset.form.cleaned_data
+        selected = {name: cleaned[name] for name in FACET_FIELDS if cleaned.get(name) not in (None, "")}
+        narrowing = any(value not in (None, "") for name, value in cleaned.items() if name not in FACET_FIELDS)
+
+        # only facet selections: the whole catalog, counted from the facet index;
+        # otherwise the list's own filtering (radius search included) minus the facets
+        queryset = None
+        if narrowing:
+            params = request.query_params.copy()
+            for name in FACET_FIELDS:
+                params.pop(name, None)
+            queryset = self.filterset_class(params, queryset=self.get_queryset(), request=request).qs
+
+        return Response(cached_facets(filter_signature(filterset), selected, queryset))
+
+    @action(detail=False, methods=["get"])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("category", str, description="Category slug; omit for the whole catalog."),
+            OpenApiParameter("limit", int, description="Items to return (at most TRENDING['TOP_K'])."),
+            *SHAPE_PARAMETERS,
+        ],
+        responses=ItemSerializer(many=True),
+        description=(
+            "Most popular items right now (orders, wishlist and cart adds, reviews; "
+            "older activity counts for less), as last computed by refresh_trending."
+        ),
+    )
+    def trending(self, request):
+        category_id = None
+        if request.query_params.get("category"):
+            category_id = (
+                Category.objects.filter(slug__iexact=request.query_params["category"]).values_list("pk", flat=True).first()
+            )
+            if category_id is None:
+                return Response([])
+        ids = trending.top_items(category_id, limit_param(request))
+        items = shape_queryset(self.get_queryset(), self.get_serializer()).in_bulk(ids)
+        return Response(self.get_serializer([items[pk] for pk in ids if pk in items], many=True).data)
+
+    @action(detail=True, methods=["get"])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "kind", str, enum=["related", "bought"],
+                description="related: shared orders, carts and wishlists (default); bought: shared orders only.",
+            ),
+            OpenApiParameter("limit", int, description="Items to return (at most RELATED_ITEMS['TOP_N'])."),
+            *SHAPE_PARAMETERS,
+        ],
+        responses=ItemSerializer(many=True),
+        description=(
+            "Items related to this one, as last computed by build_related_items, "
+            "topped up with trending and then newest items from the same category."
+        ),
+    )
+    def related(self, request, pk=None):
+        kind = request.query_params.get("kind", "related")
+        if kind not in ("related", "bought"):
+            raise serializers.ValidationError({"kind": ["Must be 'related' or 'bought'."]})
+        top_n = related_items.related_settings()["TOP_N"]
+        limit = min(limit_param(request, top_n), top_n)
+
+        item = get_object_or_404(
+            self.get_queryset().select_related("relations").only("pk", "category_id", f"relations__{kind}"), pk=pk
+        )
+        ids = list(getattr(getattr(item, "relations", None), kind, []))[:limit]
+        if len(ids) < limit and item.category_id:
+            same_category = [
+                candidate for candidate in trending.top_items(item.category_id) if candidate not in (item.pk, *ids)
+            ]
+            ids += same_category[: limit - len(ids)]
+            if len(ids) < limit:
+                ids += self.get_queryset().filter(category_id=item.category_id).exclude(
+                    pk__in=[item.pk, *ids]
+                ).order_by("-created_at").values_list("pk", flat=True)[: limit - len(ids)]
+
+        items = shape_queryset(self.get_queryset(), self.get_serializer()).in_bulk(ids)
+        return Response(self.get_serializer([items[pk] for pk in ids if pk in items], many=True).data)
+
+
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Reviews"])
-class ItemReviewViewSet(viewsets.ModelViewSet):
+class ItemReviewViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = ItemReviewSerializer
     permission_classes = [permissions.IsAuthenticated, IsBuyer]
     pagination_class = DefaultPagination
@@ -218,8 +568,9 @@ class ItemReviewViewSet(viewsets.ModelViewSet):
 
 
 
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Wishlist"])
-class WishlistViewSet(viewsets.ModelViewSet):
+class WishlistViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = WishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = DefaultPagination
@@ -238,7 +589,9 @@ class WishlistViewSet(viewsets.ModelViewSet):
         input_ser.is_valid(raise_exception=True)
         item_id = input_ser.validated_data["item_id"]
         item = get_object_or_404(Item, id=item_id)
-        obj, created = Wishlist.objects.get_or_create(user=request.user, item=item)
+        with transaction.atomic():
+            wishlist_bulk.lock_wishlist(request.user)  # see wishlist.bulk
+            obj, created = Wishlist.objects.get_or_create(user=request.user, item=item)
         if not created:
             return Response({"message": "Item already in wishlist"})
         return Response(WishlistSerializer(obj).data, status=201)
@@ -249,9 +602,60 @@ class WishlistViewSet(viewsets.ModelViewSet):
         Wishlist.objects.filter(user=request.user, item_id=item_id).delete()
         return Response({"message": "Item removed"})
 
+    @action(detail=False, methods=["post"], url_path="bulk-add")
+    @extend_schema(
+        request=WishlistBulkInputSerializer,
+        responses=WishlistBulkAddResultSerializer,
+        description="Add items in one INSERT. Provide {\"item_ids\": [...]}; returns the ids that were not already wishlisted."
+    )
+    def bulk_add(self, request):
+        input_ser = WishlistBulkInputSerializer(data=request.data)
+        input_ser.is_valid(raise_exception=True)
+        return Response({"added": wishlist_bulk.add(request.user, input_ser.validated_data["item_ids"])})
+
+    @action(detail=False, methods=["post"], url_path="bulk-remove")
+    @extend_schema(
+        request=WishlistBulkInputSerializer,
+        responses=WishlistBulkRemoveResultSerializer,
+        description="Remove items in one DELETE. Provide {\"item_ids\": [...]}."
+    )
+    def bulk_remove(self, request):
+        input_ser = WishlistBulkInputSerializer(data=request.data)
+        input_ser.is_valid(raise_exception=True)
+        return Response({"removed": wishlist_bulk.remove(request.user, input_ser.validated_data["item_ids"])})
+
+    @action(detail=False, methods=["get"])
+    @extend_schema(
+        responses=WishlistItemIdsSerializer,
+        description="Ids of every wishlisted item, most recent first, without item details.",
+    )
+    def ids(self, request):
+        return Response({"item_ids": wishlist_bulk.item_ids(request.user)})
+
+    @action(detail=False, methods=["get"])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "item_ids", str, required=True,
+                description=f"Comma-separated item ids, at most {wishlist_bulk.MAX_ITEMS} (e.g. a catalog page)",
+            ),
+        ],
+        responses=WishlistItemIdsSerializer,
+        description="Which of the given items are on the wishlist, in one query.",
+    )
+    def contains(self, request):
+        try:
+            item_ids = [int(part) for part in request.query_params.get("item_ids", "").split(",") if part.strip()]
+        except ValueError:
+            return Response({"error": "item_ids must be comma-separated integers"}, status=400)
+        if len(item_ids) > wishlist_bulk.MAX_ITEMS:
+            return Response({"error": f"At most {wishlist_bulk.MAX_ITEMS} item_ids"}, status=400)
+        return Response({"item_ids": wishlist_bulk.wishlisted(request.user, item_ids)})
+
 
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Cart"])
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated, IsBuyer]
     pagination_class = DefaultPagination
@@ -337,11 +741,13 @@ class CartViewSet(viewsets.ModelViewSet):
 
 
 
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Orders"])
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated, IsBuyer]
     pagination_class = DefaultPagination
+    filterset_class = OrderFilter
 
     def get_queryset(self):
         return Order.objects.filter(buyer=self.request.user)
@@ -357,9 +763,30 @@ class OrderViewSet(viewsets.ModelViewSet):
         orders = Order.objects.filter(items__item__seller=request.user).distinct()
         return Response(OrderSerializer(orders, many=True).data)
 
+    @action(detail=False, methods=["get"])
+    @extend_schema(parameters=EXPORT_PARAMETERS, responses={(200, "text/csv"): str})
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return streamed_export(request, queryset, ORDER_COLUMNS, "orders")
+
+    # one row per order line containing the seller's items
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="seller-export",
+        permission_classes=[permissions.IsAuthenticated, IsSeller],
+    )
+    @extend_schema(parameters=EXPORT_PARAMETERS, responses={(200, "text/csv"): str})
+    def seller_export(self, request):
+        # OrderFilter params select the orders; the export lists their lines
+        orders = self.filter_queryset(Order.objects.filter(items__item__seller=request.user))
+        lines = OrderItem.objects.filter(item__seller=request.user, order__in=orders.values("pk")).order_by("order_id", "id")
+        return streamed_export(request, lines, SELLER_ORDER_COLUMNS, "seller-orders")
 
+
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Payments"])
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = DefaultPagination
@@ -368,6 +795,12 @@ class PaymentViewSet(viewsets.ModelViewSet):
         # FIX: add ordering to remove pagination warnings
         return Payment.objects.filter(user=self.request.user).order_by("-created_at")
 
+    @action(detail=False, methods=["get"])
+    @extend_schema(parameters=EXPORT_PARAMETERS, responses={(200, "text/csv"): str})
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return streamed_export(request, queryset, PAYMENT_COLUMNS, "payments")
+
     @extend_schema(
         summary="Record a payment after successful Paystack verification",
         request=PaymentSerializer,
@@ -387,27 +820,30 @@ class PaymentViewSet(viewsets.ModelViewSet):
         order.status = "PAID"
         order.save(update_fields=["status"])
 
-        # Notify each seller in the order
-        for oi in order.items.all():
-            Notification.objects.create(
-                user=oi.item.seller,
+        # Notify each seller in the order (coalesced per seller, see NOTIFICATION_COALESCE_WINDOWS)
+        for oi in order.items.select_related("item__seller"):
+            inbox.notify(
+                oi.item.seller,
                 title="New Order",
-                message=f"{order.buyer.full_name} ordered {oi.item.name} (qty {oi.quantity})."
+                message=f"{order.buyer.full_name} ordered {oi.item.name} (qty {oi.quantity}).",
+                kind=Notification.Kinds.NEW_ORDER,
             )
 
         # Notify buyer
-        Notification.objects.create(
-            user=order.buyer,
+        inbox.notify(
+            order.buyer,
             title="Payment Received",
-            message=f"Payment for order #{order.id} received."
+            message=f"Payment for order #{order.id} received.",
+            kind=Notification.Kinds.PAYMENT,
         )
 
         return payment
 
 
 
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Notifications"])
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(ShapedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = DefaultPagination
@@ -423,10 +859,96 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         n.save(update_fields=["is_read"])
         return Response(NotificationSerializer(n).data)
 
+    @action(detail=False, methods=["get"], url_path="unread-count")
+    @extend_schema(responses=UnreadCountSerializer)
+    def unread_count(self, request):
+        return Response({"unread_count": inbox.unread_count(request.user.pk)})
+
+    @action(detail=False, methods=["post"], url_path="mark-read")
+    @extend_schema(
+        request=MarkReadInputSerializer,
+        responses=MarkReadResultSerializer,
+        description="Mark notifications read in one UPDATE. Provide {\"ids\": [...]} and/or {\"up_to\": <id>}."
+    )
+    def mark_read(self, request):
+        input_ser = MarkReadInputSerializer(data=request.data)
+        input_ser.is_valid(raise_exception=True)
+        updated = inbox.mark_read(
+            request.user,
+            ids=input_ser.validated_data.get("ids"),
+            up_to=input_ser.validated_data.get("up_to"),
+        )
+        return Response({"updated": updated, "unread_count": inbox.unread_count(request.user.pk)})
+
+    @action(detail=False, methods=["post"], url_path="stream-ticket")
+    @extend_schema(
+        request=None,
+        responses=StreamTicketSerializer,
+        description="Single-use ticket for opening /api/notifications/stream/?ticket=<ticket> from an EventSource.",
+    )
+    def stream_ticket(self, request):
+        ticket = issue_ticket(request.user.pk)
+        return Response({"ticket": ticket, "expires_in": TICKET_TTL})
+
+
+async def stream_user(request):
+    """
+    Resolve the user for an EventSource connection. Browsers cannot set an
+    Authorization header on EventSource, so the JWT may also come from the
+    auth cookie, or the client passes a `ticket` from
+    POST /api/notifications/stream-ticket/ (never the JWT itself: URLs end
+    up in access logs). Session login works too.
+    """
+    ticket = request.GET.get("ticket")
+    if ticket:
+        user_id = await sync_to_async(redeem_ticket)(ticket)
+        if user_id is None:
+            return None
+        return await CustomUser.objects.filter(pk=user_id, is_active=True).afirst()
+
+    header = request.headers.get("Authorization", "")
+    token = header[len("Bearer "):] if header.startswith("Bearer ") else None
+    token = token or request.COOKIES.get(settings.REST_AUTH["JWT_AUTH_COOKIE"])
+
+    if token:
+        authenticator = CachedJWTAuthentication()
+        try:
+            validated = authenticator.get_validated_token(token)
+            return await sync_to_async(authenticator.get_user)(validated)
+        except (InvalidToken, AuthenticationFailed):
+            return None
+
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def notification_stream(request):
+    """
+    GET /api/notifications/stream/ -- Server-Sent Events feed of new
+    notifications. Send `Last-Event-ID` (or ?last_event_id=) to resume.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "The notification stream requires an ASGI server"}, status=501)
+
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(event_stream(user.pk, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
 
 
 @extend_schema(tags=["Items"], responses=ItemStatsSerializer)
-class ItemStatsView(GenericAPIView):
+class ItemStatsView(ReplicaReadMixin, GenericAPIView):
     permission_classes = [permissions.AllowAny]
     serializer_class = ItemStatsSerializer
 
@@ -441,8 +963,39 @@ class ItemStatsView(GenericAPIView):
         return Response(self.get_serializer(data).data)
 
 
+@extend_schema(
+    tags=["Items"],
+    parameters=[
+        OpenApiParameter("q", str, description="What has been typed so far; matched against the start of any word."),
+        OpenApiParameter("limit", int, description="Suggestions to return (default and maximum in AUTOCOMPLETE)."),
+    ],
+    responses=AutocompleteSerializer,
+)
+class AutocompleteView(GenericAPIView):
+    """
+    Typeahead suggestions (published items and categories), most popular
+    first, from the in-memory index in items.autocomplete. No database
+    access, so no authentication either.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    serializer_class = AutocompleteSerializer
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        limit = limit_param(request)
+        # plain dicts: serializing a handful of suggestions per keystroke
+        # through AutocompleteSerializer would cost more than the lookup
+        results = [
+            {"type": kind, "id": pk, "label": label, "slug": slug}
+            for kind, pk, label, slug, _ in autocomplete.search(request.query_params.get("q", ""), limit)
+        ]
+        return Response({"results": results})
+
+
+@extend_schema_view(list=extend_schema(parameters=SHAPE_PARAMETERS), retrieve=extend_schema(parameters=SHAPE_PARAMETERS))
 @extend_schema(tags=["Items"])
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(ShapedQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = ItemSerializer
     queryset = Item.objects.all()
     filter_backends = [DjangoFilterBackend]
@@ -467,3 +1020,110 @@ class ItemViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
+
+    @action(detail=False, methods=["get"])
+    @extend_schema(parameters=EXPORT_PARAMETERS, responses={(200, "text/csv"): str})
+    def export(self, request):
+        # same visibility and ItemFilter params as the list endpoint
+        queryset = self.filter_queryset(self.get_queryset())
+        return streamed_export(request, queryset, ITEM_COLUMNS, "items")
+
+    @action(detail=True, methods=["post"], url_path="video-uploads")
+    @extend_schema(
+        request=None,
+        responses=VideoUploadSerializer,
+        description=(
+            "Start a resumable video upload. Send `Upload-Length: <bytes>` and optionally "
+            "`Upload-Metadata: filename <base64>`, then PATCH chunks to the returned Location."
+        )
+    )
+    def video_uploads(self, request, pk=None):
+        item = self.get_object()
+
+        try:
+            length = int(request.headers.get("Upload-Length", ""))
+        except ValueError:
+            return Response({"error": "Upload-Length header is required"}, status=400)
+        if length <= 0:
+            return Response({"error": "Upload-Length must be a positive integer"}, status=400)
+        if length > uploads.max_size():
+            return Response({"error": f"Upload-Length must be at most {uploads.max_size()}"}, status=413)
+
+        metadata = parse_upload_metadata(request.headers.get("Upload-Metadata"))
+        filename = metadata.get("filename") or f"{item.slug or item.pk}.mp4"
+
+        upload = uploads.start_upload(item, request.user, filename, length)
+        location = request.build_absolute_uri(reverse("video-upload", kwargs={"pk": upload.pk}))
+        headers = {**upload_headers(upload), "Location": location}
+        return Response(VideoUploadSerializer(upload).data, status=201, headers=headers)
+
+
+@extend_schema(tags=["Items"])
+class VideoUploadView(GenericAPIView):
+    """
+    tus-style chunk endpoint for an upload started via
+    POST /api/items/<id>/video-uploads/.
+
+    HEAD   -> current Upload-Offset (resume point)
+    PATCH  -> append bytes at Upload-Offset (Content-Type: application/offset+octet-stream)
+    DELETE -> abort and discard the partial upload
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = VideoUploadSerializer
+
+    def get_upload(self, request, pk):
+        return get_object_or_404(VideoUpload, pk=pk, uploader=request.user)
+
+    @extend_schema(responses=VideoUploadSerializer)
+    def get(self, request, pk):
+        upload = self.get_upload(request, pk)
+        return Response(VideoUploadSerializer(upload).data, headers=upload_headers(upload))
+
+    def head(self, request, pk):
+        upload = self.get_upload(request, pk)
+        return Response(status=200, headers=upload_headers(upload))
+
+    @extend_schema(request=None, responses=None)
+    def patch(self, request, pk):
+        upload = self.get_upload(request, pk)
+
+        if request.content_type != "application/offset+octet-stream":
+            return Response({"error": "Content-Type must be application/offset+octet-stream"}, status=415)
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return Response({"error": "Upload-Offset header is required"}, status=400)
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            return Response({"error": "Content-Length must be a non-negative integer"}, status=400)
+
+        # the row lock is held while the chunk is written, until the offset commits
+        with transaction.atomic():
+            if not uploads.lock(upload):
+                return Response({"error": "Concurrent upload detected"}, status=409, headers=upload_headers(upload))
+            if upload.is_complete:
+                return Response({"error": "Upload already complete"}, status=409, headers=upload_headers(upload))
+            if offset != upload.offset:
+                # Client is out of sync; it should HEAD and resume from our offset.
+                return Response({"error": "Upload-Offset mismatch"}, status=409, headers=upload_headers(upload))
+            if offset + content_length > upload.length:
+                return Response({"error": "Chunk exceeds Upload-Length"}, status=413, headers=upload_headers(upload))
+
+            # Read the raw stream; never touch request.data/body, which would buffer the chunk.
+            new_offset = uploads.write_chunk(upload, request.stream, content_length) if content_length else offset
+            if not uploads.commit_offset(upload, new_offset):
+                upload.refresh_from_db()
+                return Response({"error": "Concurrent upload detected"}, status=409, headers=upload_headers(upload))
+
+            if upload.offset == upload.length:
+                uploads.finalize(upload)
+
+        return Response(status=204, headers=upload_headers(upload))
+
+    def delete(self, request, pk):
+        upload = self.get_upload(request, pk)
+        uploads.discard(upload)
+        return Response(status=204, headers={"Tus-Resumable": TUS_VERSION})
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Cart, CartItem
+from regive.admin_changelists import CachedRelatedOnlyFieldListFilter, LargeChangelistMixin
 
 
 @admin.register(Cart)
@@ -9,10 +10,11 @@ class CartAdmin(admin.ModelAdmin):
 
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(LargeChangelistMixin, admin.ModelAdmin):
     list_display = ["id", "cart", "item", "quantity"]  
+    list_select_related = ["cart__buyer", "item"]
     search_fields = ["cart__id", "item__name"]
-    list_filter = ["cart"]  
+    list_filter = [("cart", CachedRelatedOnlyFieldListFilter)]  
     ordering = ["id"]  
     readonly_fields = []  
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Item, Category
+from .models import Item, ItemReview, Category
+from api.exports import ITEM_COLUMNS, make_export_action
+from regive.admin_changelists import CachedRelatedOnlyFieldListFilter, LargeChangelistMixin
 
 
 @admin.register(Category)
@@ -10,7 +12,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(LargeChangelistMixin, admin.ModelAdmin):
     list_display = (
         "name",
         "seller",
@@ -23,13 +25,14 @@ class ItemAdmin(admin.ModelAdmin):
         "location",
         "created_at",
     )
+    list_select_related = ("seller", "category")
 
     list_filter = (
         "condition",
         "status",
         "is_free",
         "category",
-        ("seller", admin.RelatedOnlyFieldListFilter),
+        ("seller", CachedRelatedOnlyFieldListFilter),
         "created_at",
     )
 
@@ -43,3 +46,18 @@ class ItemAdmin(admin.ModelAdmin):
 
     ordering = ("-created_at",)
     list_per_page = 25
+
+    actions = [
+        make_export_action(ITEM_COLUMNS, "items", "csv"),
+        make_export_action(ITEM_COLUMNS, "items", "ndjson"),
+    ]
+
+
+@admin.register(ItemReview)
+class ItemReviewAdmin(LargeChangelistMixin, admin.ModelAdmin):
+    list_display = ("id", "item", "reviewer", "rating", "created_at")
+    list_select_related = ("item", "reviewer")
+    list_filter = ("rating", "created_at")
+    search_fields = ("item__name", "reviewer__email", "comment")
+    raw_id_fields = ("item", "reviewer")
+    ordering = ("-created_at",)
@@ -0,0 +1,428 @@
+"""
+In-memory typeahead index for published item names and category names,
+served by /api/autocomplete/ without touching the database.
+
+Names are normalized (lowercase, accents and punctuation stripped) and
+indexed under every word start, up to AUTOCOMPLETE["MAX_WORDS"] words in,
+so "mountain bike" matches "bi" as well as "mo". The keys live in one
+sorted list: a query is two bisects for the range of keys it prefixes,
+and the range's entries are ranked by popularity (wishlists plus units
+ordered for items, published items for categories). Short prefixes cover
+too many keys to rank per request, so their top results are cached and
+kept current as entries change.
+
+Each process holds its own copy, loaded from the snapshot written by
+`manage.py build_autocomplete_index`. The WSGI/ASGI entry points start
+loading it as the server starts (warm()); without a usable snapshot it is
+built from the database in a background thread, and queries get no
+suggestions rather than wait for the build. items.signals publishes
+every change to a journal in the shared cache; processes replay it at most
+every AUTOCOMPLETE["SYNC_INTERVAL"] seconds, and rebuild in a background
+thread when the journal no longer holds the changes they missed (cache
+flushed or entries expired). Popularity is fixed between builds: rebuild
+the snapshot periodically.
+
+Memory is roughly 200 bytes per index key, entries included; 1M items with 2-4 word names
+make about 2.7M keys at MAX_WORDS=3. MAX_WORDS=1 (whole-name prefixes
+only) keeps one key per entry.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+
+from items.models import Category, Item
+from orders.models import OrderItem
+from wishlist.models import Wishlist
+
+
+ITEM, CATEGORY = "item", "category"
+SNAPSHOT_VERSION = 1
+
+SEQ_KEY = "autocomplete:journal:seq"
+EPOCH_KEY = "autocomplete:journal:epoch"
+
+# past every character a normalized key can contain
+KEY_END = "\U0010ffff"
+
+_punctuation = re.compile(r"[\W_]+")
+
+
+def autocomplete_settings():
+    return {
+        "SNAPSHOT": Path(settings.BASE_DIR) / "build" / "autocomplete.json",
+        "MAX_WORDS": 3,
+        "KEY_LENGTH": 40,
+        "LIMIT": 8,
+        "MAX_LIMIT": 20,
+        "SCAN_LIMIT": 1000,
+        "SYNC_INTERVAL": 1.0,
+        "JOURNAL_TIMEOUT": 24 * 60 * 60,
+        "WARM_ON_START": True,
+        **getattr(settings, "AUTOCOMPLETE", {}),
+    }
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_punctuation.sub(" ", text.lower()).split())
+
+
+def index_keys(label, max_words, key_length):
+    words = normalize(label).split()
+    return {" ".join(words[start:])[:key_length] for start in range(min(len(words), max_words))}
+
+
+class PrefixIndex:
+    """
+    Entries are (kind, id, label, slug, popularity) tuples kept in slots;
+    `keys` is the sorted list of index keys and `refs` the slot of each.
+    Every method holds the lock: a key and its ref are separate inserts.
+    """
+
+    def __init__(self, entries=(), seq=0, epoch=None, options=None):
+        self.options = options or autocomplete_settings()
+        self.seq = seq
+        self.epoch = epoch
+        self.synced_at = time.monotonic()
+        self.lock = threading.RLock()
+        self.slots = []
+        self.slot_of = {}
+        self.free = []
+        self.top = {}  # prefix -> ranked slots, for prefixes over SCAN_LIMIT keys
+
+        pairs = []
+        for entry in entries:
+            slot = self._allocate(tuple(entry))
+            pairs.extend((key, slot) for key in self._keys(entry))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.refs = array("q", [slot for _, slot in pairs])
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def _keys(self, entry):
+        return index_keys(entry[2], self.options["MAX_WORDS"], self.options["KEY_LENGTH"])
+
+    def _allocate(self, entry):
+        if self.free:
+            slot = self.free.pop()
+            self.slots[slot] = entry
+        else:
+            slot = len(self.slots)
+            self.slots.append(entry)
+        self.slot_of[entry[:2]] = slot
+        return slot
+
+    def _rank(self, slot):
+        _, _, label, _, popularity = self.slots[slot]
+        return (-popularity, len(label), label)
+
+    def _ranked(self, lo, hi, limit):
+        return sorted(set(self.refs[lo:hi]), key=self._rank)[:limit]
+
+    def _range(self, prefix):
+        return bisect.bisect_left(self.keys, prefix), bisect.bisect_left(self.keys, prefix + KEY_END)
+
+    def _cached_prefixes(self, keys):
+        return {key[:length] for key in keys for length in range(1, len(key) + 1)} & self.top.keys()
+
+    # -- queries ----------------------------------------------------------------
+
+    def search(self, query, limit):
+        prefix = normalize(query)[: self.options["KEY_LENGTH"]]
+        if not prefix:
+            return []
+        with self.lock:
+            ranked = self.top.get(prefix)
+            if ranked is None:
+                lo, hi = self._range(prefix)
+                if hi - lo <= self.options["SCAN_LIMIT"]:
+                    return [self.slots[slot] for slot in self._ranked(lo, hi, limit)]
+                ranked = self.top[prefix] = self._ranked(lo, hi, self.options["MAX_LIMIT"])
+            return [self.slots[slot] for slot in ranked[:limit]]
+
+    def entries(self):
+        with self.lock:
+            return [self.slots[slot] for slot in self.slot_of.values()]
+
+    # -- changes -----------------------------------------------------------------
+
+    def upsert(self, kind, pk, label, slug, popularity=None):
+        """Add or replace an entry; popularity None keeps the current one (0 if new)."""
+        with self.lock:
+            slot = self.slot_of.get((kind, pk))
+            if slot is not None:
+                current = self.slots[slot]
+                popularity = current[4] if popularity is None else popularity
+                if current[2:] == (label, slug, popularity):
+                    return
+                self.remove(kind, pk)
+            entry = (kind, pk, label, slug, popularity or 0)
+            slot = self._allocate(entry)
+            keys = self._keys(entry)
+            for key in keys:
+                position = bisect.bisect_left(self.keys, key)
+                self.keys.insert(position, key)
+                self.refs.insert(position, slot)
+
+            # the new entry can only move into cached top lists; it can't push
+            # another entry out of reach, so the lists stay complete
+            rank = self._rank(slot)
+            for prefix in self._cached_prefixes(keys):
+                ranked = self.top[prefix]
+                if len(ranked) < self.options["MAX_LIMIT"] or rank < self._rank(ranked[-1]):
+                    ranked.append(slot)
+                    ranked.sort(key=self._rank)
+                    del ranked[self.options["MAX_LIMIT"]:]
+
+    def remove(self, kind, pk):
+        with self.lock:
+            slot = self.slot_of.pop((kind, pk), None)
+            if slot is None:
+                return
+            keys = self._keys(self.slots[slot])
+            for key in keys:
+                position = bisect.bisect_left(self.keys, key)
+                while self.refs[position] != slot:
+                    position += 1
+                del self.keys[position]
+                del self.refs[position]
+            # a list losing one of its entries is recomputed on its next query
+            for prefix in self._cached_prefixes(keys):
+                if slot in self.top[prefix]:
+                    del self.top[prefix]
+            self.slots[slot] = None
+            self.free.append(slot)
+
+    def apply(self, change):
+        operation, kind, pk, *rest = change
+        if operation == "upsert":
+            self.upsert(kind, pk, *rest)
+        else:
+            self.remove(kind, pk)
+
+
+# -- building and snapshots -------------------------------------------------------
+
+def item_popularity():
+    popularity = dict(
+        Wishlist.objects.order_by()
+        .values("item_id")
+        .annotate(count=Count("pk"))
+        .values_list("item_id", "count")
+    )
+    orders = (
+        OrderItem.objects.order_by()
+        .values("item_id")
+        .annotate(units=Sum("quantity"))
+        .values_list("item_id", "units")
+    )
+    for item_id, units in orders:
+        popularity[item_id] = popularity.get(item_id, 0) + (units or 0)
+    return popularity
+
+
+def load_entries():
+    """Every entry, read from the database."""
+    popularity = item_popularity()
+    items = Item.objects.filter(status="PUBLISHED").order_by().values_list("pk", "name", "slug")
+    category_counts = dict(
+        Item.objects.filter(status="PUBLISHED", category__isnull=False)
+        .order_by()
+        .values("category_id")
+        .annotate(count=Count("pk"))
+        .values_list("category_id", "count")
+    )
+    entries = [(ITEM, pk, name, slug, popularity.get(pk, 0)) for pk, name, slug in items.iterator(chunk_size=5000)]
+    entries += [
+        (CATEGORY, pk, name, slug, category_counts.get(pk, 0))
+        for pk, name, slug in Category.objects.order_by().values_list("pk", "name", "slug")
+    ]
+    return entries
+
+
+def build_index():
+    # journal position first: changes made while reading are replayed again,
+    # which is harmless
+    seq, epoch = journal_position()
+    return PrefixIndex(load_entries(), seq=seq, epoch=epoch)
+
+
+def write_snapshot(index, path=None):
+    path = Path(path or autocomplete_settings()["SNAPSHOT"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "seq": index.seq,
+        "epoch": index.epoch,
+        "entries": index.entries(),
+    }
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(snapshot, separators=(",", ":")))
+    os.replace(tmp, path)
+    return path
+
+
+def load_snapshot(path=None):
+    """
+    The snapshot at `path` brought up to date from the journal, or None if
+    there is none or the journal can't bring it up to date.
+    """
+    path = Path(path or autocomplete_settings()["SNAPSHOT"])
+    try:
+        snapshot = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    index = PrefixIndex(snapshot["entries"], seq=snapshot["seq"], epoch=snapshot["epoch"])
+    seq, epoch = journal_position()
+    if epoch != index.epoch or not replay(index, seq):
+        return None
+    return index
+
+
+# -- change journal -----------------------------------------------------------------
+
+def journal_position():
+    """(seq, epoch) of the journal; the epoch changes when the cache loses it."""
+    epoch = cache.get(EPOCH_KEY)
+    if epoch is None:
+        cache.add(EPOCH_KEY, uuid.uuid4().hex, None)
+        cache.add(SEQ_KEY, 0, None)
+        epoch = cache.get(EPOCH_KEY)
+    return cache.get(SEQ_KEY, 0), epoch
+
+
+def change_key(seq):
+    return f"autocomplete:journal:{seq}"
+
+
+def publish(change):
+    """Journal a change for every process and apply it to this one's index."""
+    journal_position()
+    try:
+        seq = cache.incr(SEQ_KEY)
+    except ValueError:  # evicted between the two calls
+        cache.add(SEQ_KEY, 0, None)
+        seq = cache.incr(SEQ_KEY)
+    cache.set(change_key(seq), change, autocomplete_settings()["JOURNAL_TIMEOUT"])
+    if _index is not None:
+        _index.apply(change)
+
+
+def publish_on_commit(change):
+    transaction.on_commit(lambda: publish(change))
+
+
+def replay(index, seq):
+    """Apply journal entries after index.seq up to `seq`; False if some are gone."""
+    if seq < index.seq:
+        return False
+    if seq == index.seq:
+        return True
+    changes = cache.get_many([change_key(number) for number in range(index.seq + 1, seq + 1)])
+    if len(changes) != seq - index.seq:
+        return False
+    for number in range(index.seq + 1, seq + 1):
+        index.apply(changes[change_key(number)])
+    index.seq = seq
+    return True
+
+
+def sync(index):
+    """
+    Catch up with other processes' changes, at most every SYNC_INTERVAL.
+    If the journal can't bring `index` up to date it keeps serving while a
+    fresh one is built in the background.
+    """
+    now = time.monotonic()
+    if now - index.synced_at < autocomplete_settings()["SYNC_INTERVAL"]:
+        return
+    index.synced_at = now
+    seq, epoch = journal_position()
+    if epoch != index.epoch or not replay(index, seq):
+        rebuild_in_background()
+
+
+# -- process-wide index -------------------------------------------------------------
+
+_index = None
+_index_lock = threading.Lock()
+_rebuild_thread = None
+
+
+def get_index():
+    global _index
+    building = False
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_snapshot()
+                if _index is None:
+                    # serve an empty index until the build is done rather
+                    # than hold this request (and every one queued behind
+                    # the lock) for a scan of the catalog
+                    _index = PrefixIndex()
+                    building = True
+    if building:
+        rebuild_in_background()
+    else:
+        sync(_index)
+    return _index
+
+
+def warm():
+    """Start loading this process's index so the first query finds it ready."""
+    if _index is None and autocomplete_settings()["WARM_ON_START"]:
+        threading.Thread(target=_warm, name="autocomplete-warm", daemon=True).start()
+
+
+def _warm():
+    try:
+        get_index()
+    finally:
+        connections.close_all()
+
+
+def rebuild_in_background():
+    global _rebuild_thread
+    with _index_lock:
+        if _rebuild_thread is not None and _rebuild_thread.is_alive():
+            return
+        _rebuild_thread = threading.Thread(target=_rebuild, name="autocomplete-rebuild", daemon=True)
+        _rebuild_thread.start()
+
+
+def _rebuild():
+    global _index
+    try:
+        _index = build_index()
+    finally:
+        connections.close_all()  # this thread's own connections
+
+
+def reset_index(index=None):
+    """Replace this process's index (None: load it again on next use)."""
+    global _index
+    _index = index
+
+
+def search(query, limit=None):
+    options = autocomplete_settings()
+    limit = min(limit or options["LIMIT"], options["MAX_LIMIT"])
+    return get_index().search(query, limit)
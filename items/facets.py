@@ -0,0 +1,274 @@
+"""
+Facet counts for the public catalog: items per category, condition,
+is_free and price bucket.
+
+Counts are summed in Python from "cube" rows, one per combination of
+(category, condition, is_free, price bucket) with its item count; a few
+hundred rows at most. The rows come from:
+
+- the facet index (CatalogFacetCount) when only facet filters are set,
+  which is most storefront traffic. items.signals adjusts it after each
+  item save or delete commits, with F() updates (move_on_commit), so
+  reading it costs no scan of the items table. Cells
+  of a deleted category linger until a rebuild but no longer match a
+  category, and its items (now uncategorised) still count elsewhere.
+- one GROUP BY over the filtered items otherwise (search, location, price
+  range, ...).
+
+Facets are disjunctive: the counts for one facet ignore that facet's own
+selection, so a sidebar with category=books still shows how many items
+every other category has.
+
+Results are cached per filter signature under a generation number that
+items.signals bumps whenever an item or category changes in a way that can
+move a count. CATALOG_FACET_CACHE_TIMEOUT bounds staleness for writes that
+bypass signals (QuerySet.update(), bulk_create()); run
+rebuild_catalog_facets after those.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from items.models import CatalogFacetCount, Category, Item
+
+
+# Filters counted as facets; every other filter narrows all facets alike.
+FACET_FIELDS = ("category", "condition", "is_free")
+
+# Item columns that place a published item in the facet index, and the
+# field names whose change (update_fields) can move it.
+INDEX_COLUMNS = ("status", "category_id", "condition", "is_free", "price")
+COUNTED_FIELDS = {"status", "category", "category_id", "condition", "is_free", "price"}
+
+GENERATION_KEY = "catalog:facets:generation"
+
+
+def price_buckets():
+    """Upper bounds of the price buckets; the last bucket is open-ended."""
+    return getattr(settings, "CATALOG_PRICE_BUCKETS", (10, 25, 50, 100, 250))
+
+
+def bucket_labels(bounds):
+    lower = [0, *bounds]
+    return [
+        {"value": f"{low}-{high}", "min": low, "max": high} for low, high in zip(lower, bounds)
+    ] + [{"value": f"{lower[-1]}+", "min": lower[-1], "max": None}]
+
+
+def price_bucket(price, bounds):
+    """Python twin of the CASE expression in facet_rows()."""
+    if price is None:
+        return None
+    for index, bound in enumerate(bounds):
+        if price < bound:
+            return index
+    return len(bounds)
+
+
+def generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def cache_key(signature):
+    return f"catalog:facets:{generation()}:{signature}"
+
+
+# -- cube rows: (category_id, condition, is_free, bucket, count) ------------
+
+def facet_rows(queryset, bounds):
+    """One GROUP BY over all facet dimensions of `queryset`."""
+    bucket = Case(
+        *[When(price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+        When(price__isnull=False, then=Value(len(bounds))),
+        default=Value(None),
+        output_field=IntegerField(),
+    )
+    rows = (
+        queryset.order_by()
+        .values("category_id", "condition", "is_free", bucket=bucket)
+        .annotate(count=Count("pk"))
+        .values_list("category_id", "condition", "is_free", "bucket", "count")
+    )
+    return list(rows)
+
+
+def index_rows():
+    return list(
+        CatalogFacetCount.objects.filter(count__gt=0).values_list(
+            "category_id", "condition", "is_free", "bucket", "count"
+        )
+    )
+
+
+# -- facet index maintenance --------------------------------------------------
+
+def current_values(item):
+    return {name: getattr(item, name) for name in INDEX_COLUMNS}
+
+
+def index_key(values):
+    """Facet index cell for an item's facet column values, or None if it isn't counted."""
+    if values is None or values["status"] != "PUBLISHED":
+        return None
+    return (
+        values["category_id"],
+        values["condition"],
+        bool(values["is_free"]),
+        price_bucket(values["price"], price_buckets()),
+    )
+
+
+def key_string(key):
+    return ":".join("" if part is None else str(int(part) if isinstance(part, bool) else part) for part in key)
+
+
+def adjust(key, delta):
+    """Add `delta` to one facet index cell, creating it if needed."""
+    if key is None:
+        return
+    cells = CatalogFacetCount.objects.filter(key=key_string(key))
+    if cells.update(count=F("count") + delta):
+        return
+    category_id, condition, is_free, bucket = key
+    try:
+        with transaction.atomic():
+            CatalogFacetCount.objects.create(
+                key=key_string(key),
+                category_id=category_id,
+                condition=condition,
+                is_free=is_free,
+                bucket=bucket,
+                count=delta,
+            )
+    except IntegrityError:  # created concurrently
+        cells.update(count=F("count") + delta)
+
+
+def move(old_key, new_key):
+    if old_key != new_key:
+        adjust(old_key, -1)
+        adjust(new_key, 1)
+
+
+def move_on_commit(old_key, new_key, using=None):
+    """
+    Move an item between index cells once its write commits, and start a
+    new cache generation. The cells take UPDATE ... SET count = count + 1
+    then, so a rolled-back save moves nothing and the hot cells aren't
+    locked for the rest of the item's transaction.
+    """
+    def apply():
+        move(old_key, new_key)
+        bump_generation()
+
+    transaction.on_commit(apply, using=using)
+
+
+def rebuild_index():
+    """Recount the facet index from the items table. Returns the number of cells."""
+    rows = facet_rows(Item.objects.filter(status="PUBLISHED"), price_buckets())
+    cells = [
+        CatalogFacetCount(
+            key=key_string((category_id, condition, is_free, bucket)),
+            category_id=category_id,
+            condition=condition,
+            is_free=is_free,
+            bucket=bucket,
+            count=count,
+        )
+        for category_id, condition, is_free, bucket, count in rows
+    ]
+    with transaction.atomic():
+        CatalogFacetCount.objects.all().delete()
+        CatalogFacetCount.objects.bulk_create(cells, batch_size=1000)
+    bump_generation()
+    return len(cells)
+
+
+# -- counting -------------------------------------------------------------------
+
+def count_facets(rows, selected):
+    """
+    Facet counts from cube rows, given the facet selections in `selected`
+    ({"category": slug, "condition": "USED", "is_free": True}; missing keys
+    are unselected).
+    """
+    bounds = price_buckets()
+    category_ids = {row[0] for row in rows if row[0] is not None}
+    categories = {
+        category["id"]: category
+        for category in Category.objects.filter(id__in=category_ids).values("id", "slug", "name")
+    }
+    wanted_slug = (selected.get("category") or "").lower() or None
+
+    def matches(row, skip=None):
+        category_id, condition, is_free = row[:3]
+        if skip != "category" and wanted_slug is not None:
+            category = categories.get(category_id)
+            if category is None or (category["slug"] or "").lower() != wanted_slug:
+                return False
+        if skip != "condition" and selected.get("condition") not in (None, condition):
+            return False
+        if skip != "is_free" and selected.get("is_free") not in (None, is_free):
+            return False
+        return True
+
+    def tally(position, skip=None):
+        counts = {}
+        for row in rows:
+            if row[position] is not None and matches(row, skip):
+                counts[row[position]] = counts.get(row[position], 0) + row[-1]
+        return counts
+
+    by_category = tally(0, skip="category")
+    by_condition = tally(1, skip="condition")
+    by_free = tally(2, skip="is_free")
+    by_bucket = tally(3)
+
+    return {
+        "total": sum(row[-1] for row in rows if matches(row)),
+        "category": sorted(
+            (
+                {"value": categories[pk]["slug"], "label": categories[pk]["name"], "count": count}
+                for pk, count in by_category.items()
+                if pk in categories
+            ),
+            key=lambda facet: (-facet["count"], facet["label"]),
+        ),
+        "condition": [
+            {"value": value, "label": str(label), "count": by_condition[value]}
+            for value, label in Item.CONDITION_CHOICES
+            if value in by_condition
+        ],
+        "is_free": [
+            {"value": value, "count": by_free[value]} for value in (True, False) if value in by_free
+        ],
+        "price": [
+            {**label, "count": by_bucket[index]}
+            for index, label in enumerate(bucket_labels(bounds))
+            if index in by_bucket
+        ],
+    }
+
+
+def cached_facets(signature, selected, queryset=None):
+    """
+    Facet counts for `queryset` (narrowed by every non-facet filter), or for
+    the whole published catalog from the facet index when it is None.
+    Cached under the filter signature for the current generation.
+    """
+    key = cache_key(signature)
+    facets = cache.get(key)
+    if facets is None:
+        rows = index_rows() if queryset is None else facet_rows(queryset, price_buckets())
+        facets = count_facets(rows, selected)
+        cache.set(key, facets, getattr(settings, "CATALOG_FACET_CACHE_TIMEOUT", 300))
+    return facets
@@ -0,0 +1,220 @@
+"""
+Geohash indexing and radius search for items.
+
+Items with a latitude/longitude carry their geohash (GEOHASH_PRECISION
+characters, about 5 m). A geohash prefix is a rectangular cell, and all
+hashes inside a cell sort together, so the cells covering a search circle
+translate into a few string ranges on the indexed (status, geohash)
+column:
+
+1. cover the circle's bounding box with cells at the finest precision that
+   needs at most GEO_SEARCH["MAX_CELLS"] of them, and merge neighbouring
+   cells into ranges;
+2. load (pk, lat, lon) of the items in those ranges;
+3. compute exact haversine distances for the whole batch (vectorised with
+   numpy when it is installed) and keep the ones inside the radius,
+   nearest first.
+
+Results are capped at the nearest GEO_SEARCH["MAX_RESULTS"].
+"""
+import math
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def geo_settings():
+    return {
+        "DEFAULT_RADIUS_KM": 10,
+        "MAX_RADIUS_KM": 500,
+        "MAX_CELLS": 32,
+        "MAX_RESULTS": 500,
+        **getattr(settings, "GEO_SEARCH", {}),
+    }
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        span = lon_range if even else lat_range
+        coordinate = lon if even else lat
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lon_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(lat, lon, radius_km):
+    """(south, north, [(west, east), ...]) split at the antimeridian."""
+    dlat = radius_km / KM_PER_DEGREE
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    dlon = 180.0 if cos_lat < 1e-9 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    if dlon >= 180.0:
+        return south, north, [(-180.0, 180.0)]
+    west, east = lon - dlon, lon + dlon
+    if west < -180.0:
+        return south, north, [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return south, north, [(west, 180.0), (-180.0, east - 360.0)]
+    return south, north, [(west, east)]
+
+
+def steps(low, high, size):
+    """Points from low to high, one per cell of `size`, always including high."""
+    count = int((high - low) // size) + 1
+    return [min(low + index * size, high) for index in range(count)] + [high]
+
+
+def covering_cells(lat, lon, radius_km, max_cells=None):
+    """The set of geohash cells (same precision) that covers the circle."""
+    max_cells = max_cells or geo_settings()["MAX_CELLS"]
+    south, north, spans = bounding_box(lat, lon, radius_km)
+
+    def needed(precision):
+        height, width = cell_size(precision)
+        rows = (north - south) / height + 1
+        return rows * sum((east - west) / width + 1 for west, east in spans)
+
+    precision = 1
+    while precision < GEOHASH_PRECISION and needed(precision + 1) <= max_cells:
+        precision += 1
+
+    height, width = cell_size(precision)
+    cells = set()
+    for point_lat in steps(south, north, height):
+        for west, east in spans:
+            for point_lon in steps(west, east, width):
+                cells.add(encode(min(point_lat, 90.0 - 1e-9), min(point_lon, 180.0 - 1e-9), precision))
+    return cells
+
+
+def successor(cell):
+    """The next geohash cell of the same precision, or None after the last one."""
+    chars = list(cell)
+    for index in range(len(chars) - 1, -1, -1):
+        position = BASE32.index(chars[index])
+        if position < len(BASE32) - 1:
+            chars[index] = BASE32[position + 1]
+            return "".join(chars)
+        chars[index] = BASE32[0]
+    return None
+
+
+def prefix_ranges(cells):
+    """Merge cells that are adjacent in geohash order into [(first, last)] ranges."""
+    ranges = []
+    for cell in sorted(cells):
+        if ranges and successor(ranges[-1][1]) == cell:
+            ranges[-1][1] = cell
+        else:
+            ranges.append([cell, cell])
+    return [tuple(pair) for pair in ranges]
+
+
+def ranges_q(ranges):
+    # "~" sorts after every base32 character, so it closes the last cell's range
+    query = Q()
+    for first, last in ranges:
+        query |= Q(geohash__gte=first, geohash__lt=last + "~")
+    return query
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Distances from (lat, lon) to every (lats[i], lons[i]), as a list."""
+    if numpy is not None:
+        lat1, lon1 = numpy.radians(lat), numpy.radians(lon)
+        lat2 = numpy.radians(numpy.asarray(lats, dtype=float))
+        lon2 = numpy.radians(numpy.asarray(lons, dtype=float))
+        a = numpy.sin((lat2 - lat1) / 2) ** 2 + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))).tolist()
+
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    cos_lat1 = math.cos(lat1)
+    sin, cos, radians = math.sin, math.cos, math.radians
+    distances = []
+    for lat2, lon2 in zip(lats, lons):
+        lat2, lon2 = radians(lat2), radians(lon2)
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))))
+    return distances
+
+
+def nearby(queryset, lat, lon, radius_km, limit=None):
+    """
+    [(pk, distance_km)] of the items in `queryset` within `radius_km` of
+    (lat, lon), nearest first, at most `limit` (GEO_SEARCH["MAX_RESULTS"]).
+
+    Smaller circles are searched first: once one holds `limit` items, those
+    are the nearest ones, and a large radius over a dense area never loads
+    every candidate.
+    """
+    limit = limit or geo_settings()["MAX_RESULTS"]
+    probes = [probe for probe in (radius_km / 16, radius_km / 4) if probe >= 1] + [radius_km]
+    for probe in probes:
+        hits = within(queryset, lat, lon, probe)
+        if len(hits) >= limit:
+            break
+    return [(pk, distance) for distance, pk in hits[:limit]]
+
+
+def within(queryset, lat, lon, radius_km):
+    """Sorted [(distance_km, pk)] of the items in `queryset` within `radius_km`."""
+    ranges = prefix_ranges(covering_cells(lat, lon, radius_km))
+    candidates = list(
+        queryset.filter(ranges_q(ranges), latitude__isnull=False)
+        .order_by()
+        .values_list("pk", "latitude", "longitude")
+    )
+    if not candidates:
+        return []
+    pks, lats, lons = zip(*candidates)
+    distances = haversine_km(lat, lon, lats, lons)
+    return sorted((distance, pk) for pk, distance in zip(pks, distances) if distance <= radius_km)
+
+
+def near(queryset, lat, lon, radius_km, limit=None):
+    """`queryset` narrowed to nearby(), annotated with distance_km and ordered by it."""
+    hits = nearby(queryset, lat, lon, radius_km, limit)
+    if not hits:
+        return queryset.none()
+    # CASE pk WHEN ... as raw SQL: hundreds of When() objects take longer to
+    # compile than the query takes to run
+    meta = queryset.model._meta
+    column = f"{connection.ops.quote_name(meta.db_table)}.{connection.ops.quote_name(meta.pk.column)}"
+    distance = RawSQL(
+        f"CASE {column} {' '.join(['WHEN %s THEN %s'] * len(hits))} END",
+        [value for pk, km in hits for value in (pk, round(km, 3))],
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=[pk for pk, _ in hits]).annotate(distance_km=distance).order_by("distance_km")
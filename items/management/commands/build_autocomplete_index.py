@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from items import autocomplete
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the autocomplete index from the database and write the snapshot "
+        "that processes load on startup (AUTOCOMPLETE['SNAPSHOT']). Run it "
+        "periodically: popularity is only recomputed here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Snapshot path (default: AUTOCOMPLETE['SNAPSHOT']).")
+
+    def handle(self, *args, **options):
+        index = autocomplete.build_index()
+        path = autocomplete.write_snapshot(index, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(index)} autocomplete entries to {path}."))
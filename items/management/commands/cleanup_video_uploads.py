@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from items import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned resumable video uploads and their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=None,
+            help="Remove uploads idle for longer than this (default: VIDEO_UPLOAD_EXPIRY).",
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(hours=options["hours"]) if options["hours"] is not None else None
+        removed, orphans = uploads.collect_stale(older_than)
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed} stale upload(s) and {orphans} orphaned partial file(s)."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from items import facets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the catalog facet index from the items table. Run after bulk item "
+        "writes that bypass signals or after changing CATALOG_PRICE_BUCKETS."
+    )
+
+    def handle(self, *args, **options):
+        cells = facets.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the facet index: {cells} cell(s)."))
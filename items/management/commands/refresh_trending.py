@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from items import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop decayed trending scores and rewrite the top items per category. "
+        "Run periodically (e.g. every 5 minutes from cron). --rebuild first "
+        "recomputes every score from order, wishlist, cart and review history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute scores from history (first run, or after changing TRENDING's EPOCH or half-life).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["rebuild"]:
+            scored = trending.rebuild_scores()
+            self.stdout.write(f"Rescored {scored} item(s) from history.")
+        result = trending.refresh()
+        if result is None:
+            self.stdout.write(self.style.WARNING("Another refresh is running; skipped."))
+            return
+        kept, written = result
+        self.stdout.write(self.style.SUCCESS(
+            f"Kept {kept} trending score(s), wrote {written} list row(s) in {time.perf_counter() - started:.2f}s."
+        ))
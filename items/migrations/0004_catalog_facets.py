@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_facet_index(apps, schema_editor):
+    # A frozen copy of items.facets.rebuild_index() as of this migration,
+    # run against the historical models
+    Item = apps.get_model("items", "Item")
+    CatalogFacetCount = apps.get_model("items", "CatalogFacetCount")
+    bounds = getattr(settings, "CATALOG_PRICE_BUCKETS", (10, 25, 50, 100, 250))
+    bucket = models.Case(
+        *[models.When(price__lt=bound, then=models.Value(index)) for index, bound in enumerate(bounds)],
+        models.When(price__isnull=False, then=models.Value(len(bounds))),
+        default=models.Value(None),
+        output_field=models.IntegerField(),
+    )
+    rows = (
+        Item.objects.filter(status="PUBLISHED")
+        .order_by()
+        .values("category_id", "condition", "is_free", bucket=bucket)
+        .annotate(count=models.Count("pk"))
+        .values_list("category_id", "condition", "is_free", "bucket", "count")
+    )
+
+    def key_string(key):
+        return ":".join("" if part is None else str(int(part) if isinstance(part, bool) else part) for part in key)
+
+    CatalogFacetCount.objects.all().delete()
+    CatalogFacetCount.objects.bulk_create(
+        [
+            CatalogFacetCount(
+                key=key_string((category_id, condition, is_free, bucket)),
+                category_id=category_id,
+                condition=condition,
+                is_free=is_free,
+                bucket=bucket,
+                count=count,
+            )
+            for category_id, condition, is_free, bucket, count in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0003_videoupload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('category_id', models.BigIntegerField(null=True)),
+                ('condition', models.CharField(max_length=20)),
+                ('is_free', models.BooleanField()),
+                ('bucket', models.SmallIntegerField(null=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Catalog Facet Count',
+                'verbose_name_plural': 'Catalog Facet Counts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['status', 'category', 'condition', 'is_free', 'price'], name='items_item_status_88f05c_idx'),
+        ),
+        migrations.RunPython(fill_facet_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0005_item_geo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemTrendScore',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend_score', serialize=False, to='items.item')),
+                ('score', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Item Trend Score',
+                'verbose_name_plural': 'Item Trend Scores',
+                'indexes': [models.Index(fields=['score'], name='items_itemt_score_93db5c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.BigIntegerField(null=True)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='items.item')),
+            ],
+            options={
+                'verbose_name': 'Trending Item',
+                'verbose_name_plural': 'Trending Items',
+                'ordering': ['category_id', 'rank'],
+                'indexes': [models.Index(fields=['category_id', 'rank'], name='items_trend_categor_2b6af1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0006_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemRelations',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='relations', serialize=False, to='items.item')),
+                ('related', models.JSONField(default=list)),
+                ('bought', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Item Relations',
+                'verbose_name_plural': 'Item Relations',
+            },
+        ),
+    ]
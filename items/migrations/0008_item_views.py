@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0007_item_relations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='view_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ItemDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='items.item')),
+            ],
+            options={
+                'verbose_name': 'Item Daily Views',
+                'verbose_name_plural': 'Item Daily Views',
+                'constraints': [models.UniqueConstraint(fields=('item', 'day'), name='unique_item_daily_views')],
+            },
+        ),
+    ]
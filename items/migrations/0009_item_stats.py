@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_item_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemStats',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='items.item')),
+                ('wishlist_count', models.IntegerField(default=0)),
+                ('cart_count', models.IntegerField(default=0)),
+                ('sold_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Item Stats',
+                'verbose_name_plural': 'Item Stats',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+def copy_view_counts(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Item = apps.get_model("items", "Item")
+    ItemStats = apps.get_model("items", "ItemStats")
+    viewed = Item.objects.using(db).filter(view_count__gt=0)
+    ItemStats.objects.using(db).bulk_create(
+        (ItemStats(item_id=pk) for pk in viewed.filter(stats__isnull=True).values_list("pk", flat=True).iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    ItemStats.objects.using(db).filter(item__view_count__gt=0).update(
+        view_count=models.Subquery(Item.objects.filter(pk=models.OuterRef("item_id")).values("view_count")[:1])
+    )
+
+
+def copy_view_counts_back(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Item = apps.get_model("items", "Item")
+    ItemStats = apps.get_model("items", "ItemStats")
+    Item.objects.using(db).filter(stats__view_count__gt=0).update(
+        view_count=models.Subquery(ItemStats.objects.filter(item_id=models.OuterRef("pk")).values("view_count")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0009_item_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemstats',
+            name='view_count',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(copy_view_counts, copy_view_counts_back),
+        migrations.RemoveField(
+            model_name='item',
+            name='view_count',
+        ),
+    ]
@@ -1,9 +1,13 @@
+import uuid
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
 
+from items import geo
 from users.models import CustomUser
 
 
@@ -80,6 +84,14 @@ class Item(models.Model):
     stock = models.PositiveIntegerField(default=1)
 
     location = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # derived from latitude/longitude in save(); indexed for radius search
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
 
     status = models.CharField(
         max_length=20,
@@ -107,10 +119,23 @@ class Item(models.Model):
         verbose_name = _("Item")
         verbose_name_plural = _("Items")
         ordering = ["-created_at"]
+        indexes = [
+            # covers the facet GROUP BY (items.facets) for the published catalog
+            models.Index(fields=["status", "category", "condition", "is_free", "price"]),
+            # geohash prefix ranges for ?near= (items.geo)
+            models.Index(fields=["status", "geohash"]),
+        ]
 
     def save(self, *args, **kwargs):
         if self.is_free:
             self.price = 0.00
+        if self.latitude is None or self.longitude is None:
+            self.geohash = ""
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -118,6 +143,132 @@ class Item(models.Model):
 
 
 
+class CatalogFacetCount(models.Model):
+    """
+    Published items per (category, condition, is_free, price bucket): the
+    precomputed facet index read by items.facets, kept current by
+    items.signals. Rebuild it with `manage.py rebuild_catalog_facets` after
+    bulk writes that bypass signals or a change to CATALOG_PRICE_BUCKETS.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    # a plain column, not a foreign key: rows outlive a deleted category until rebuilt
+    category_id = models.BigIntegerField(null=True)
+    condition = models.CharField(max_length=20)
+    is_free = models.BooleanField()
+    bucket = models.SmallIntegerField(null=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Catalog Facet Count")
+        verbose_name_plural = _("Catalog Facet Counts")
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
+
+
+
+class ItemTrendScore(models.Model):
+    """
+    An item's time-decayed popularity, kept by items.trending from order,
+    wishlist, cart and review events. Stored in "epoch units" (see
+    items.trending) so an event is a single addition.
+    """
+
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name="trend_score")
+    score = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = _("Item Trend Score")
+        verbose_name_plural = _("Item Trend Scores")
+        indexes = [models.Index(fields=["score"])]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.score}"
+
+
+class TrendingItem(models.Model):
+    """
+    The materialized top items per category (category_id NULL: the whole
+    catalog), rewritten by `manage.py refresh_trending`.
+    """
+
+    # a plain column, like CatalogFacetCount: the list is rebuilt wholesale
+    category_id = models.BigIntegerField(null=True)
+    rank = models.PositiveSmallIntegerField()
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = _("Trending Item")
+        verbose_name_plural = _("Trending Items")
+        ordering = ["category_id", "rank"]
+        indexes = [models.Index(fields=["category_id", "rank"])]
+
+    def __str__(self):
+        return f"{self.category_id or 'all'} #{self.rank}: {self.item_id}"
+
+
+class ItemRelations(models.Model):
+    """
+    An item's precomputed neighbours (item ids, best first), rewritten by
+    `manage.py build_related_items` (items.related): `related` from shared
+    orders, carts and wishlists, `bought` from shared orders only.
+    """
+
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name="relations")
+    related = models.JSONField(default=list)
+    bought = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = _("Item Relations")
+        verbose_name_plural = _("Item Relations")
+
+    def __str__(self):
+        return f"{self.item_id}: {len(self.related)} related, {len(self.bought)} bought"
+
+
+class ItemDailyViews(models.Model):
+    """Page views of an item on one day, added in batches by items.viewcounts."""
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="daily_views")
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Item Daily Views")
+        verbose_name_plural = _("Item Daily Views")
+        constraints = [models.UniqueConstraint(fields=["item", "day"], name="unique_item_daily_views")]
+
+    def __str__(self):
+        return f"{self.item_id} on {self.day}: {self.views}"
+
+
+class ItemStats(models.Model):
+    """
+    How many wishlists and carts hold an item, and how many units of it were
+    ordered, kept by items.stats, and its page views (items.viewcounts). A
+    table of its own, so the updates don't lock the Item row and saving an
+    Item never writes back a stale count; `manage.py reconcile_item_stats`
+    corrects any drift of the first three.
+    """
+
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    # signed: a counter that drifts below zero is corrected, not an error
+    wishlist_count = models.IntegerField(default=0)
+    cart_count = models.IntegerField(default=0)
+    sold_count = models.IntegerField(default=0)
+    # page views, added in batches; not recounted by reconcile_item_stats
+    view_count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Item Stats")
+        verbose_name_plural = _("Item Stats")
+
+    def __str__(self):
+        return f"{self.item_id}: {self.wishlist_count} wishlisted, {self.cart_count} in carts, {self.sold_count} sold"
+
+
 class ItemReview(models.Model):
     item = models.ForeignKey(
         Item,
@@ -143,6 +294,40 @@ class ItemReview(models.Model):
         return f"Review by {reviewer} on {self.item.name}"
 
 
+class VideoUpload(models.Model):
+    """
+    A resumable (tus-style) upload of an item's video.
+    Chunks are written straight into a partial file on disk; once `offset`
+    reaches `length` the file is moved into place as `Item.video`.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.CASCADE,
+        related_name="video_uploads"
+    )
+    uploader = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="video_uploads",
+    )
+    filename = models.CharField(max_length=255)
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    is_complete = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Video Upload")
+        verbose_name_plural = _("Video Uploads")
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["is_complete", "updated_at"])]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+
 @receiver(pre_save, sender=Category)
 def generate_category_slug(sender, instance, **kwargs):
     if not instance.slug:
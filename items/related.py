@@ -0,0 +1,193 @@
+"""
+"Related items" and "buyers also bought", computed offline by
+`manage.py build_related_items` from baskets: the items of one order, one
+cart, or one user's wishlist.
+
+Two items are related in proportion to how often they share a basket,
+weighted by RELATED_ITEMS["WEIGHTS"] per source, and normalized by how
+common each item is (cosine similarity), so best sellers don't become
+everything's neighbour:
+
+    score(a, b) = co(a, b) / sqrt(freq(a) * freq(b))
+
+Item ids are mapped to compact integers and baskets are capped at
+MAX_BASKET items, so the pair count stays linear in the number of basket
+rows. With numpy the pairs are counted with array operations (sort,
+unique, bincount); without it, with a dict keyed by packed integer pairs.
+
+The best TOP_N neighbours of each item are stored on ItemRelations, one
+row per item, so the endpoint reads them with the item itself.
+"""
+import heapq
+import math
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from cart.models import CartItem
+from items.models import ItemRelations
+from orders.models import OrderItem
+from wishlist.models import Wishlist
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def related_settings():
+    return {
+        "WEIGHTS": {"order": 3.0, "cart": 2.0, "wishlist": 1.0},
+        "TOP_N": 12,
+        "MAX_BASKET": 50,
+        "MIN_COOCCURRENCE": 1.0,
+        **getattr(settings, "RELATED_ITEMS", {}),
+    }
+
+
+def basket_rows():
+    """{source: (basket ids, item ids)}, rows grouped by basket."""
+    sources = {
+        "order": (OrderItem.objects.filter(item__isnull=False), "order_id"),
+        "cart": (CartItem.objects.all(), "cart_id"),
+        "wishlist": (Wishlist.objects.all(), "user_id"),
+    }
+    rows = {}
+    for source, (queryset, basket_field) in sources.items():
+        baskets, items = array("q"), array("q")
+        pairs = queryset.order_by(basket_field).values_list(basket_field, "item_id").distinct()
+        for basket, item in pairs.iterator(10000):
+            baskets.append(basket)
+            items.append(item)
+        rows[source] = (baskets, items)
+    return rows
+
+
+def combine(rows, sources, weights):
+    """
+    One (basket, item, weight) row set over several sources. Basket ids are
+    made distinct per source and stay grouped.
+    """
+    baskets, items, row_weights = array("q"), array("q"), array("d")
+    for number, source in enumerate(sources):
+        source_baskets, source_items = rows[source]
+        baskets.extend(basket * len(sources) + number for basket in source_baskets)
+        items.extend(source_items)
+        row_weights.extend([weights[source]] * len(source_items))
+    return baskets, items, row_weights
+
+
+# -- co-occurrence ----------------------------------------------------------------
+# Both return {item id: [neighbour ids, best first]} for grouped rows.
+
+def neighbours_numpy(baskets, items, weights, options):
+    if not len(items):
+        return {}
+    baskets = numpy.frombuffer(baskets, dtype=numpy.int64)
+    ids, items = numpy.unique(numpy.frombuffer(items, dtype=numpy.int64), return_inverse=True)
+    weights = numpy.frombuffer(weights, dtype=numpy.float64)
+    count = len(ids)
+
+    # position within the basket, to cap basket size
+    starts = numpy.r_[True, baskets[1:] != baskets[:-1]]
+    position = numpy.arange(len(baskets)) - numpy.maximum.accumulate(numpy.where(starts, numpy.arange(len(baskets)), 0))
+    keep = position < options["MAX_BASKET"]
+    baskets, items, weights = baskets[keep], items[keep], weights[keep]
+    frequency = numpy.bincount(items, weights=weights, minlength=count)
+
+    # rows `offset` apart in the same basket are a pair; baskets are capped,
+    # so offsets stop at MAX_BASKET
+    keys, pair_weights = [], []
+    for offset in range(1, options["MAX_BASKET"]):
+        same = baskets[offset:] == baskets[:-offset]
+        if not same.any():
+            break
+        left, right = items[:-offset][same], items[offset:][same]
+        weight = weights[offset:][same]
+        keys += [left * count + right, right * count + left]
+        pair_weights += [weight, weight]
+    if not keys:
+        return {}
+    pairs, inverse = numpy.unique(numpy.concatenate(keys), return_inverse=True)
+    together = numpy.bincount(inverse, weights=numpy.concatenate(pair_weights))
+    first, second = pairs // count, pairs % count
+
+    wanted = together >= options["MIN_COOCCURRENCE"]
+    first, second, together = first[wanted], second[wanted], together[wanted]
+    score = together / numpy.sqrt(frequency[first] * frequency[second])
+
+    # best TOP_N per item: sort by item, then score descending (ties: lower id)
+    order = numpy.lexsort((second, -score, first))
+    first, second = first[order], second[order]
+    group_start = numpy.r_[True, first[1:] != first[:-1]]
+    rank = numpy.arange(len(first)) - numpy.maximum.accumulate(numpy.where(group_start, numpy.arange(len(first)), 0))
+    top = rank < options["TOP_N"]
+    neighbours = defaultdict(list)
+    for item, neighbour in zip(ids[first[top]].tolist(), ids[second[top]].tolist()):
+        neighbours[item].append(neighbour)
+    return dict(neighbours)
+
+
+def neighbours_python(baskets, items, weights, options):
+    ids = sorted(set(items))
+    compact = {item: number for number, item in enumerate(ids)}
+    items = [compact[item] for item in items]
+    frequency = defaultdict(float)
+    together = defaultdict(float)
+
+    def add(basket_items, weight):
+        for item in basket_items:
+            frequency[item] += weight
+        for index, first in enumerate(basket_items):
+            for second in basket_items[index + 1 :]:
+                together[first << 32 | second] += weight
+                together[second << 32 | first] += weight
+
+    current, basket_items, weight = None, [], 0.0
+    for basket, item, row_weight in zip(baskets, items, weights):
+        if basket != current:
+            add(basket_items, weight)
+            current, basket_items, weight = basket, [], row_weight
+        if len(basket_items) < options["MAX_BASKET"]:
+            basket_items.append(item)
+    add(basket_items, weight)
+
+    candidates = defaultdict(list)
+    for key, count in together.items():
+        if count >= options["MIN_COOCCURRENCE"]:
+            first, second = key >> 32, key & 0xFFFFFFFF
+            candidates[first].append((count / math.sqrt(frequency[first] * frequency[second]), -second))
+    return {
+        ids[item]: [ids[-negated] for _, negated in heapq.nlargest(options["TOP_N"], scored)]
+        for item, scored in candidates.items()
+    }
+
+
+def neighbours(baskets, items, weights, options=None):
+    options = options or related_settings()
+    if numpy is not None:
+        return neighbours_numpy(baskets, items, weights, options)
+    return neighbours_python(baskets, items, weights, options)
+
+
+# -- the job ------------------------------------------------------------------------
+
+def build(options=None):
+    """Recompute every item's neighbours. Returns the number of ItemRelations rows."""
+    options = options or related_settings()
+    rows = basket_rows()
+    weights = options["WEIGHTS"]
+    related = neighbours(*combine(rows, ("order", "cart", "wishlist"), weights), options)
+    bought = neighbours(*combine(rows, ("order",), weights), options)
+    del rows
+
+    relations = (
+        ItemRelations(item_id=item_id, related=related.get(item_id, []), bought=bought.get(item_id, []))
+        for item_id in related.keys() | bought.keys()
+    )
+    with transaction.atomic():
+        ItemRelations.objects.all().delete()
+        ItemRelations.objects.bulk_create(relations, batch_size=2000)
+    return ItemRelations.objects.count()
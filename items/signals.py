@@ -1,8 +1,11 @@
-from django.db.models.signals import pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.text import slugify
 
-from items.models import Item, Category
+from items import autocomplete, facets, stats, trending
+from items.models import Item, ItemReview, ItemStats, Category
+from orders.models import Order, OrderItem
 
 
 # ✅ Generate unique slug for Category
@@ -41,3 +44,173 @@ def enforce_free_price(sender, instance, **kwargs):
     if instance.is_free:
         instance.price = 0
 
+
+# Receivers that compare a saved Item with its row as stored before the
+# write (the instance may have been loaded with .only() or be out of date)
+# register the columns they need and the saves they care about; one pre_save
+# query reads all of them, and stored_values() hands them out in post_save.
+# Inside a transaction the read locks the row, so two concurrent saves of
+# one item can't both start from the same stored values.
+STORED_COLUMNS = []
+
+
+def remember_columns(columns, wanted):
+    """Have pre_save read `columns` when wanted(update_fields) is true."""
+    STORED_COLUMNS.append((frozenset(columns), wanted))
+
+
+@receiver(pre_save, sender=Item)
+def remember_stored_values(sender, instance, update_fields=None, using=None, **kwargs):
+    columns = {column for names, wanted in STORED_COLUMNS if wanted(update_fields) for column in names}
+    instance._stored_values = None
+    if columns and instance.pk is not None:
+        stored = Item._base_manager.using(using).filter(pk=instance.pk)
+        if transaction.get_connection(using).in_atomic_block:
+            stored = stored.select_for_update()
+        instance._stored_values = stored.values(*columns).first()
+
+
+def stored_values(instance):
+    """The columns remembered before this save, or None for a new row."""
+    return instance.__dict__.get("_stored_values")
+
+
+# Keep the facet index current and start a new facet cache generation.
+def counts_towards_facets(update_fields):
+    return update_fields is None or bool(facets.COUNTED_FIELDS & set(update_fields))
+
+
+remember_columns(facets.INDEX_COLUMNS, counts_towards_facets)
+
+
+@receiver(post_save, sender=Item)
+def update_facets_on_save(sender, instance, update_fields=None, using=None, **kwargs):
+    if not counts_towards_facets(update_fields):
+        return
+    previous = stored_values(instance)
+    facets.move_on_commit(facets.index_key(previous), facets.index_key(facets.current_values(instance)), using)
+
+
+@receiver(post_delete, sender=Item)
+def update_facets_on_delete(sender, instance, using=None, **kwargs):
+    facets.move_on_commit(facets.index_key(facets.current_values(instance)), None, using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_facets(sender, instance, **kwargs):
+    facets.bump_generation()
+
+
+# Journal autocomplete changes once the transaction commits; every process
+# (this one included) applies them to its in-memory index.
+AUTOCOMPLETE_FIELDS = {"name", "slug", "status"}
+
+
+@receiver(post_save, sender=Item)
+def update_autocomplete_item(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTOCOMPLETE_FIELDS & set(update_fields):
+        return
+    if instance.status == "PUBLISHED":
+        change = ("upsert", autocomplete.ITEM, instance.pk, instance.name, instance.slug, None)
+    else:
+        change = ("remove", autocomplete.ITEM, instance.pk)
+    autocomplete.publish_on_commit(change)
+
+
+@receiver(post_delete, sender=Item)
+def remove_autocomplete_item(sender, instance, **kwargs):
+    autocomplete.publish_on_commit(("remove", autocomplete.ITEM, instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_autocomplete_category(sender, instance, **kwargs):
+    autocomplete.publish_on_commit(
+        ("upsert", autocomplete.CATEGORY, instance.pk, instance.name, instance.slug, None)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def remove_autocomplete_category(sender, instance, **kwargs):
+    autocomplete.publish_on_commit(("remove", autocomplete.CATEGORY, instance.pk))
+
+
+# Trending scores (items.trending): one weighted event per order line,
+# wishlist add, cart add and review, counted once the transaction commits.
+@receiver(post_save, sender="orders.OrderItem")
+def trend_on_order(sender, instance, created, **kwargs):
+    if created:
+        trending.record_on_commit(instance.item_id, trending.weight("order", instance.quantity))
+
+
+@receiver(post_save, sender="wishlist.Wishlist")
+def trend_on_wishlist(sender, instance, created, **kwargs):
+    if created:
+        trending.record_on_commit(instance.item_id, trending.weight("wishlist"))
+
+
+@receiver(post_save, sender="cart.CartItem")
+def trend_on_cart(sender, instance, created, **kwargs):
+    if created:
+        trending.record_on_commit(instance.item_id, trending.weight("cart"))
+
+
+@receiver(post_save, sender=ItemReview)
+def trend_on_review(sender, instance, created, **kwargs):
+    if created:
+        trending.record_on_commit(instance.item_id, trending.weight("review", instance.rating / 5))
+
+
+# Popularity counters (items.stats), adjusted once the transaction commits.
+@receiver(post_save, sender=Item)
+def create_item_stats(sender, instance, created, **kwargs):
+    if created:
+        ItemStats.objects.create(item=instance)
+
+
+@receiver(post_save, sender="wishlist.Wishlist")
+@receiver(post_save, sender="cart.CartItem")
+def count_on_add(sender, instance, created, **kwargs):
+    if created:
+        counter = "wishlist_count" if sender._meta.model_name == "wishlist" else "cart_count"
+        stats.adjust_on_commit([instance.item_id], counter, 1)
+
+
+@receiver(post_delete, sender="wishlist.Wishlist")
+@receiver(post_delete, sender="cart.CartItem")
+def count_on_remove(sender, instance, **kwargs):
+    counter = "wishlist_count" if sender._meta.model_name == "wishlist" else "cart_count"
+    stats.adjust_on_commit([instance.item_id], counter, -1)
+
+
+def order_status(order_item, origin=None):
+    """
+    Status of an OrderItem's order: the loaded order's, or that of the Order
+    whose delete() cascaded to it, without a query; else read.
+    """
+    if OrderItem.order.is_cached(order_item):
+        return order_item.order.status
+    if isinstance(origin, Order) and origin.pk == order_item.order_id:
+        return origin.status
+    return Order.objects.filter(pk=order_item.order_id).values_list("status", flat=True).first()
+
+
+# a cancelled order's units don't count, and were already taken off
+@receiver(post_save, sender="orders.OrderItem")
+def count_sold(sender, instance, created, **kwargs):
+    if created and order_status(instance) not in (None, stats.CANCELLED):
+        stats.adjust_on_commit([instance.item_id], "sold_count", instance.quantity)
+
+
+@receiver(post_delete, sender="orders.OrderItem")
+def uncount_sold(sender, instance, origin=None, **kwargs):
+    if order_status(instance, origin) not in (None, stats.CANCELLED):
+        stats.adjust_on_commit([instance.item_id], "sold_count", -instance.quantity)
+
+
+@receiver(post_save, sender="orders.Order")
+def count_sold_on_cancel(sender, instance, created, **kwargs):
+    old_status = getattr(instance, "_old_status", None)  # set by orders.signals
+    if created or old_status is None or (old_status == stats.CANCELLED) == (instance.status == stats.CANCELLED):
+        return
+    stats.adjust_sold_on_commit(instance.pk, -1 if instance.status == stats.CANCELLED else 1)
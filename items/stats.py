@@ -0,0 +1,113 @@
+"""
+Per-item popularity counters on ItemStats: wishlists holding the item,
+carts holding it, and units ordered (cancelled orders excluded).
+
+Wishlist, cart and order changes adjust the counters after commit with
+UPDATE ... SET n = n + delta (items.signals; wishlist.bulk for bulk
+writes), so reading them is a join on the item, never a COUNT. Rows are
+created with their item. A counter can drift: a crash between the commit
+and the adjustment, a raw or queryset-level write that sends no signals
+(e.g. cancelling orders with QuerySet.update()). `manage.py
+reconcile_item_stats` recounts from the source tables and fixes it; it
+also creates rows for items that have none, e.g. after bulk inserts.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from cart.models import CartItem
+from items.models import Item, ItemStats
+from orders.models import OrderItem
+from wishlist.models import Wishlist
+
+
+COUNTERS = ("wishlist_count", "cart_count", "sold_count")
+
+CANCELLED = "CANCELLED"
+
+
+def adjust(item_ids, counter, delta):
+    """Add `delta` to `counter` of each item (an id listed twice counts once)."""
+    item_ids = {item_id for item_id in item_ids if item_id is not None}
+    if not item_ids or not delta:
+        return
+    rows = ItemStats.objects.filter(item_id__in=item_ids)
+    if rows.update(**{counter: F(counter) + delta}) == len(item_ids):
+        return
+    # items without a row yet (bulk inserted); reconcile_item_stats catches
+    # anything a concurrent insert hides from this one
+    missing = item_ids - set(rows.values_list("item_id", flat=True))
+    missing &= set(Item.objects.filter(pk__in=missing).values_list("pk", flat=True))
+    ItemStats.objects.bulk_create(
+        [ItemStats(item_id=item_id, **{counter: delta}) for item_id in missing], ignore_conflicts=True
+    )
+
+
+def adjust_on_commit(item_ids, counter, delta):
+    item_ids = list(item_ids)
+    transaction.on_commit(lambda: adjust(item_ids, counter, delta))
+
+
+def adjust_sold_on_commit(order_id, sign):
+    """Add (sign=1) or remove (sign=-1) an order's units from sold_count."""
+    def apply():
+        by_quantity = defaultdict(list)
+        for item_id, quantity in OrderItem.objects.filter(order_id=order_id).values_list("item_id", "quantity"):
+            by_quantity[quantity].append(item_id)
+        for quantity, item_ids in by_quantity.items():
+            adjust(item_ids, "sold_count", sign * quantity)
+
+    transaction.on_commit(apply)
+
+
+# -- reconciliation -----------------------------------------------------------------
+
+def true_counts(first, last):
+    """{item_id: {counter: value}} recounted for items first <= id <= last."""
+    in_range = {"item_id__gte": first, "item_id__lte": last}
+    counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    sources = (
+        ("wishlist_count", Wishlist.objects.filter(**in_range), Count("id")),
+        ("cart_count", CartItem.objects.filter(**in_range), Count("id")),
+        ("sold_count", OrderItem.objects.filter(**in_range).exclude(order__status=CANCELLED), Sum("quantity")),
+    )
+    for counter, queryset, aggregate in sources:
+        for item_id, value in queryset.order_by().values("item_id").annotate(value=aggregate).values_list("item_id", "value"):
+            counts[item_id][counter] = value or 0
+    return counts
+
+
+def reconcile(batch_size=5000):
+    """
+    Recount every item, a batch of item ids at a time, and rewrite the rows
+    that differ. Adjustments committed while a batch is being recounted can
+    be overwritten; running it again settles them. Returns (items checked,
+    rows fixed, rows created).
+    """
+    checked = fixed = created = 0
+    last = 0
+    while True:
+        item_ids = list(Item.objects.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not item_ids:
+            return checked, fixed, created
+        first, last = item_ids[0], item_ids[-1]
+        counts = true_counts(first, last)
+        stored = ItemStats.objects.in_bulk(item_ids)
+
+        changed, new = [], []
+        for item_id in item_ids:
+            values = counts.get(item_id, dict.fromkeys(COUNTERS, 0))
+            row = stored.get(item_id)
+            if row is None:
+                new.append(ItemStats(item_id=item_id, **values))
+            elif any(getattr(row, counter) != values[counter] for counter in COUNTERS):
+                for counter in COUNTERS:
+                    setattr(row, counter, values[counter])
+                changed.append(row)
+        with transaction.atomic():
+            ItemStats.objects.bulk_update(changed, COUNTERS, batch_size=1000)
+            ItemStats.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        checked += len(item_ids)
+        fixed += len(changed)
+        created += len(new)
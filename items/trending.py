@@ -0,0 +1,191 @@
+"""
+Trending items: popularity from orders, wishlist adds, cart adds and
+reviews, decaying with a half-life of TRENDING["HALF_LIFE_HOURS"].
+
+An event of weight w at time t is worth w * 2 ** -((now - t) / half_life)
+now. Scores are stored multiplied by 2 ** ((now - EPOCH) / half_life), i.e.
+each event adds w * 2 ** ((t - EPOCH) / half_life) ("epoch units"): the
+stored values never need decaying, an event is one UPDATE ... score + x on
+ItemTrendScore, and the order between items is the order of their decayed
+scores at any moment. A double holds about 1000 half-lives past EPOCH
+(8 years at 72 hours); after changing EPOCH or the half-life, run
+`refresh_trending --rebuild` to recompute every score from history.
+
+`refresh_trending` (run every few minutes) drops scores that have decayed
+below MIN_SCORE and writes the top TOP_K published items per category and
+overall to TrendingItem, which /api/public-items/trending/ reads. Its work
+is bounded by the items with recent activity, not by the catalog size.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from cart.models import CartItem
+from items.models import ItemReview, ItemTrendScore, TrendingItem
+from orders.models import OrderItem
+from wishlist.models import Wishlist
+
+
+REFRESH_LOCK = "trending:refresh:lock"
+
+
+def trending_settings():
+    return {
+        "HALF_LIFE_HOURS": 72,
+        "EPOCH": "2026-01-01T00:00:00+00:00",
+        "WEIGHTS": {"order": 5.0, "wishlist": 2.0, "cart": 1.0, "review": 1.0},
+        "TOP_K": 50,
+        "MIN_SCORE": 0.01,
+        "LOOKBACK_HALF_LIVES": 10,
+        **getattr(settings, "TRENDING", {}),
+    }
+
+
+def epoch_units(when=None, options=None):
+    """2 ** ((when - EPOCH) / half_life): what a weight-1 event at `when` adds."""
+    options = options or trending_settings()
+    epoch = datetime.fromisoformat(options["EPOCH"])
+    hours = ((when or timezone.now()) - epoch).total_seconds() / 3600
+    return 2.0 ** (hours / options["HALF_LIFE_HOURS"])
+
+
+def weight(kind, amount=1):
+    return trending_settings()["WEIGHTS"].get(kind, 0) * amount
+
+
+def record(item_id, value, when=None):
+    """Add an event worth `value` (see weight()) to an item's score."""
+    if item_id is None or not value:
+        return
+    value *= epoch_units(when)
+    scores = ItemTrendScore.objects.filter(item_id=item_id)
+    if scores.update(score=F("score") + value):
+        return
+    try:
+        with transaction.atomic():
+            ItemTrendScore.objects.create(item_id=item_id, score=value)
+    except IntegrityError:  # created concurrently
+        scores.update(score=F("score") + value)
+
+
+def record_on_commit(item_id, value):
+    when = timezone.now()
+    transaction.on_commit(lambda: record(item_id, value, when))
+
+
+def record_many(item_ids, value, when=None):
+    """
+    record() for several items at once: one UPDATE, and one INSERT for the
+    items without a score. An event racing the INSERT for a new score is
+    dropped.
+    """
+    if not item_ids or not value:
+        return
+    value *= epoch_units(when)
+    scores = ItemTrendScore.objects.filter(item_id__in=item_ids)
+    scored = set(scores.values_list("item_id", flat=True))
+    scores.update(score=F("score") + value)
+    ItemTrendScore.objects.bulk_create(
+        [ItemTrendScore(item_id=item_id, score=value) for item_id in item_ids if item_id not in scored],
+        ignore_conflicts=True,
+    )
+
+
+def record_many_on_commit(item_ids, value):
+    when = timezone.now()
+    transaction.on_commit(lambda: record_many(item_ids, value, when))
+
+
+# -- materialized top lists ---------------------------------------------------------
+
+def ranked_rows(top_k):
+    """[(category_id, rank, item_id, stored score)] per category, then overall."""
+    published = ItemTrendScore.objects.filter(item__status="PUBLISHED")
+    per_category = (
+        published.filter(item__category__isnull=False)
+        .annotate(
+            category_id=F("item__category_id"),
+            rank=Window(RowNumber(), partition_by=F("item__category_id"), order_by=F("score").desc()),
+        )
+        .filter(rank__lte=top_k)
+        .values_list("category_id", "rank", "item_id", "score")
+    )
+    overall = published.order_by("-score").values_list("item_id", "score")[:top_k]
+    return [*per_category, *((None, rank, item_id, score) for rank, (item_id, score) in enumerate(overall, 1))]
+
+
+def refresh(now=None):
+    """
+    Prune decayed scores and rewrite TrendingItem. Returns (scores kept,
+    rows written), or None if another refresh is running.
+    """
+    options = trending_settings()
+    if not cache.add(REFRESH_LOCK, 1, 15 * 60):
+        return None
+    try:
+        scale = epoch_units(now, options)
+        ItemTrendScore.objects.filter(score__lt=options["MIN_SCORE"] * scale).delete()
+        rows = [
+            TrendingItem(category_id=category_id, rank=rank, item_id=item_id, score=round(score / scale, 4))
+            for category_id, rank, item_id, score in ranked_rows(options["TOP_K"])
+        ]
+        with transaction.atomic():
+            TrendingItem.objects.all().delete()
+            TrendingItem.objects.bulk_create(rows, batch_size=1000)
+        return ItemTrendScore.objects.count(), len(rows)
+    finally:
+        cache.delete(REFRESH_LOCK)
+
+
+def top_items(category_id=None, limit=None):
+    """Item ids of the materialized list for a category (None: overall), best first."""
+    top_k = trending_settings()["TOP_K"]
+    rows = TrendingItem.objects.filter(category_id=category_id).order_by("rank")  # None: IS NULL
+    return list(rows.values_list("item_id", flat=True)[: min(limit or top_k, top_k)])
+
+
+# -- rebuilding from history --------------------------------------------------------
+
+def history(since):
+    """(item_id, value, when) for every event since `since`."""
+    weights = trending_settings()["WEIGHTS"]
+    orders = OrderItem.objects.filter(order__created_at__gte=since, item__isnull=False)
+    for item_id, quantity, when in orders.values_list("item_id", "quantity", "order__created_at").iterator(5000):
+        yield item_id, weights["order"] * quantity, when
+    wishlists = Wishlist.objects.filter(added_at__gte=since)
+    for item_id, when in wishlists.values_list("item_id", "added_at").iterator(5000):
+        yield item_id, weights["wishlist"], when
+    # cart lines carry no timestamp of their own
+    carts = CartItem.objects.filter(cart__updated_at__gte=since)
+    for item_id, when in carts.values_list("item_id", "cart__updated_at").iterator(5000):
+        yield item_id, weights["cart"], when
+    reviews = ItemReview.objects.filter(created_at__gte=since)
+    for item_id, rating, when in reviews.values_list("item_id", "rating", "created_at").iterator(5000):
+        yield item_id, weights["review"] * rating / 5, when
+
+
+def rebuild_scores(now=None):
+    """
+    Recompute every score from the events of the last LOOKBACK_HALF_LIVES
+    half-lives (older ones are worth under 2 ** -LOOKBACK_HALF_LIVES).
+    Events recorded while this runs may be counted twice or not at all.
+    Returns the number of scored items.
+    """
+    options = trending_settings()
+    now = now or timezone.now()
+    since = now - timedelta(hours=options["HALF_LIFE_HOURS"] * options["LOOKBACK_HALF_LIVES"])
+    scores = defaultdict(float)
+    for item_id, value, when in history(since):
+        scores[item_id] += value * epoch_units(when, options)
+    with transaction.atomic():
+        ItemTrendScore.objects.all().delete()
+        ItemTrendScore.objects.bulk_create(
+            (ItemTrendScore(item_id=item_id, score=score) for item_id, score in scores.items()), batch_size=1000
+        )
+    return len(scores)
@@ -0,0 +1,200 @@
+"""
+Resumable, chunked uploads for Item.video.
+
+Each VideoUpload owns one partial file under VIDEO_UPLOAD_TEMP_DIR. Chunks are
+copied from the request stream straight into that file with os.pwrite at the
+upload's current offset, so a chunk is never held in memory as a whole. When
+the last byte arrives the partial file is renamed into the storage location of
+Item.video (no data copy when both live on the same filesystem).
+
+A PATCH holds the upload's row lock (lock()) from before it writes until it
+commits the new offset, so two requests at the same offset can't both write:
+the second is turned away without touching the file.
+"""
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, connection, transaction
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from items.models import VideoUpload
+
+
+# Size of each read from the request stream; bounds per-request memory.
+READ_SIZE = 64 * 1024
+
+
+def temp_dir():
+    path = getattr(settings, "VIDEO_UPLOAD_TEMP_DIR", os.path.join(settings.MEDIA_ROOT, "video_uploads"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def max_size():
+    return getattr(settings, "VIDEO_UPLOAD_MAX_SIZE", 2 * 1024 ** 3)
+
+
+def expiry():
+    return getattr(settings, "VIDEO_UPLOAD_EXPIRY", timedelta(hours=24))
+
+
+def partial_path(upload):
+    return os.path.join(temp_dir(), f"{upload.pk}.part")
+
+
+def start_upload(item, uploader, filename, length):
+    """Register a new upload and reserve its (empty) partial file."""
+    upload = VideoUpload.objects.create(
+        item=item,
+        uploader=uploader,
+        filename=os.path.basename(filename) or "video",
+        length=length,
+    )
+    # Create the file up front so HEAD/GC see a consistent state.
+    os.close(os.open(partial_path(upload), os.O_WRONLY | os.O_CREAT, 0o644))
+    return upload
+
+
+def lock(upload):
+    """
+    Lock the upload's row for the rest of the current transaction and reload
+    its offset. Returns False, without waiting, if another request holds it.
+    """
+    try:
+        with transaction.atomic():
+            state = (
+                VideoUpload.objects.select_for_update(nowait=connection.features.has_select_for_update_nowait)
+                .filter(pk=upload.pk)
+                .values("offset", "is_complete")
+                .first()
+            )
+    except DatabaseError:
+        return False
+    if state is None:
+        return False
+    upload.offset, upload.is_complete = state["offset"], state["is_complete"]
+    return True
+
+
+def write_chunk(upload, stream, content_length):
+    """
+    Copy up to `content_length` bytes from `stream` into the partial file,
+    starting at `upload.offset`. Call with the upload locked (lock()).
+
+    Returns the new offset. If the client drops mid-chunk, the bytes that did
+    arrive are kept so the next PATCH can resume from there.
+    """
+    remaining = min(content_length, upload.length - upload.offset)
+    offset = upload.offset
+
+    fd = os.open(partial_path(upload), os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        while remaining > 0:
+            try:
+                chunk = stream.read(min(READ_SIZE, remaining))
+            except (OSError, UnreadablePostError):
+                break
+            if not chunk:
+                break
+
+            view = memoryview(chunk)
+            while view:
+                written = os.pwrite(fd, view, offset)
+                offset += written
+                remaining -= written
+                view = view[written:]
+    finally:
+        os.close(fd)
+
+    return offset
+
+
+def commit_offset(upload, new_offset):
+    """
+    Persist `new_offset` only if nobody else advanced the upload meanwhile.
+    Returns False on a concurrent PATCH.
+    """
+    updated = VideoUpload.objects.filter(pk=upload.pk, offset=upload.offset, is_complete=False).update(
+        offset=new_offset,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        upload.offset = new_offset
+    return bool(updated)
+
+
+def finalize(upload):
+    """Move the finished partial file into place and attach it to the item."""
+    item = upload.item
+    field = item.video.field
+    storage = field.storage
+    name = storage.get_available_name(field.generate_filename(item, upload.filename))
+    source = partial_path(upload)
+
+    try:
+        destination = storage.path(name)
+    except NotImplementedError:
+        # Remote storage: no rename possible, stream the file across.
+        with open(source, "rb") as fh:
+            name = storage.save(name, File(fh, name=upload.filename))
+        os.remove(source)
+    else:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.replace(source, destination)
+        except OSError:
+            # Different filesystem (EXDEV): fall back to copy + unlink.
+            shutil.move(source, destination)
+
+    previous = item.video.name
+    item.video.name = name
+    item.save(update_fields=["video", "updated_at"])
+    if previous and previous != name:
+        # the replaced video is no longer referenced; drop it once the new one is saved
+        transaction.on_commit(lambda: storage.delete(previous))
+
+    upload.is_complete = True
+    upload.save(update_fields=["is_complete", "updated_at"])
+    return item
+
+
+def discard(upload):
+    """Delete an upload and whatever partial data it has on disk."""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def collect_stale(older_than=None):
+    """
+    Garbage-collect uploads untouched for longer than `older_than`
+    (VIDEO_UPLOAD_EXPIRY by default), plus orphaned partial files.
+    Returns (uploads_removed, orphans_removed).
+    """
+    cutoff = timezone.now() - (expiry() if older_than is None else older_than)
+    removed = 0
+    # both lookups use the (is_complete, updated_at) index
+    for upload in VideoUpload.objects.filter(is_complete=False, updated_at__lt=cutoff).iterator():
+        discard(upload)
+        removed += 1
+    # finished uploads have no partial file left, only the row
+    removed += VideoUpload.objects.filter(is_complete=True, updated_at__lt=cutoff).delete()[0]
+
+    known = {f"{pk}.part" for pk in VideoUpload.objects.values_list("pk", flat=True)}
+    orphans = 0
+    directory = temp_dir()
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".part") or entry.name in known:
+            continue
+        if entry.stat().st_mtime < cutoff.timestamp():
+            os.remove(entry.path)
+            orphans += 1
+
+    return removed, orphans
+
@@ -0,0 +1,213 @@
+"""
+Item page view counts, buffered per worker process.
+
+PublicItemViewSet.retrieve records a view in this process's buffer, a
+dict of (item, day) -> views. A background thread writes the buffer out
+every VIEW_COUNTS["FLUSH_INTERVAL"] seconds, sooner once it holds
+MAX_PENDING entries, and once more when the process exits. Requests only
+add to the dict; they never wait for a flush. One flush is a transaction
+of a few statements per CHUNK items, whatever the number of views:
+
+- INSERT the ItemStats rows that don't exist yet (bulk-inserted items),
+  ignoring conflicts with other workers;
+- UPDATE item_stats SET view_count = view_count + CASE ... for the chunk;
+- INSERT the (item, day) rollup rows that don't exist yet, the same way;
+- UPDATE those ItemDailyViews rows the same way.
+
+The total lives on ItemStats, not Item, so an Item loaded before a flush
+and saved after it can't write back the old count.
+
+The CASE groups items by their increment (WHEN id IN (...) THEN 3), so it
+has a handful of branches rather than one per item.
+
+What can go wrong:
+- a worker that dies without exiting cleanly (SIGKILL, OOM, crash) loses
+  the views it buffered since its last successful flush: FLUSH_INTERVAL
+  seconds' worth of its traffic while the database is up;
+- a failed flush rolls back and its counts go back into the buffer. The
+  thread then retries after FLUSH_INTERVAL * 2, * 4, ... up to
+  MAX_BACKOFF seconds, so an outage costs one logged failure per retry
+  rather than one per request, and a crash in that time loses
+  everything buffered since the outage began;
+- the buffer holds at most MAX_BUFFERED (item, day) entries: once it is
+  full, views of items not already in it are dropped (and counted in
+  `dropped`) until a flush succeeds;
+- nothing is counted twice unless the database commits and the
+  connection drops before it says so;
+- there are no lost updates between workers: every write is an
+  increment, never a read-modify-write of the total;
+- counts are approximate and not per user: reloading a page counts again.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from items.models import Item, ItemDailyViews, ItemStats
+
+
+logger = logging.getLogger(__name__)
+
+
+def view_count_settings():
+    return {
+        "FLUSH_INTERVAL": 10,
+        "MAX_PENDING": 2000,
+        "MAX_BUFFERED": 50000,
+        "MAX_BACKOFF": 300,
+        **getattr(settings, "VIEW_COUNTS", {}),
+    }
+
+
+# keys per statement: each appears twice (CASE and WHERE), within SQLite's
+# oldest 999-parameter limit
+CHUNK = 400
+
+
+def chunks(keys):
+    keys = list(keys)
+    for start in range(0, len(keys), CHUNK):
+        yield keys[start : start + CHUNK]
+
+
+def placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def select_existing(cursor, model, column, keys, day=None):
+    """The subset of `keys` present in model's `column` (and on `day`)."""
+    table, qn = model._meta.db_table, connection.ops.quote_name
+    where = f"{qn('day')} = %s AND " if day is not None else ""
+    cursor.execute(
+        f"SELECT {qn(column)} FROM {qn(table)} WHERE {where}{qn(column)} IN ({placeholders(keys)})",
+        [*([day] if day is not None else []), *keys],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def add_counts(cursor, model, column, counts, day=None):
+    """
+    UPDATE ... SET <count> = <count> + CASE ... for the rows keyed by
+    counts; the CASE has one branch per distinct increment.
+    """
+    table, qn = model._meta.db_table, connection.ops.quote_name
+    target = qn("views" if model is ItemDailyViews else "view_count")
+    groups = defaultdict(list)
+    for key, count in counts.items():
+        groups[count].append(key)
+    cases = " ".join(f"WHEN {qn(column)} IN ({placeholders(keys)}) THEN %s" for keys in groups.values())
+    where = f"{qn('day')} = %s AND " if day is not None else ""
+    cursor.execute(
+        f"UPDATE {qn(table)} SET {target} = {target} + CASE {cases} ELSE 0 END "
+        f"WHERE {where}{qn(column)} IN ({placeholders(counts)})",
+        [
+            *(value for count, keys in groups.items() for value in (*keys, count)),
+            *([day] if day is not None else []),
+            *counts,
+        ],
+    )
+
+
+def write(pending):
+    """Add {(item_id, day): views} to the totals and daily rollups."""
+    totals, by_day = Counter(), defaultdict(dict)
+    for (item_id, day), views in pending.items():
+        totals[item_id] += views
+        by_day[day][item_id] = views
+
+    # raw SQL: building these statements through the ORM (a lookup per IN
+    # value, a model instance per row) costs more than running them
+    with transaction.atomic(), connection.cursor() as cursor:
+        live = set()
+        for keys in chunks(totals):
+            # items deleted since they were viewed would break the inserts
+            existing = select_existing(cursor, Item, "id", keys)
+            live |= existing
+            missing = existing - select_existing(cursor, ItemStats, "item_id", list(existing)) if existing else set()
+            if missing:
+                ItemStats.objects.bulk_create([ItemStats(item_id=item_id) for item_id in missing], ignore_conflicts=True)
+            add_counts(cursor, ItemStats, "item_id", {key: totals[key] for key in keys})
+        for day, counts in by_day.items():
+            for keys in chunks(key for key in counts if key in live):
+                missing = set(keys) - select_existing(cursor, ItemDailyViews, "item_id", keys, day)
+                if missing:
+                    ItemDailyViews.objects.bulk_create(
+                        [ItemDailyViews(item_id=item_id, day=day, views=0) for item_id in missing],
+                        ignore_conflicts=True,  # created by another worker meanwhile
+                    )
+                add_counts(cursor, ItemDailyViews, "item_id", {key: counts[key] for key in keys}, day)
+
+
+class ViewBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.dropped = 0
+        self.failures = 0  # consecutive failed flushes
+        self.wake = threading.Event()
+        self.thread = None
+
+    def add(self, item_id, views=1, day=None):
+        options = view_count_settings()
+        key = (int(item_id), day or timezone.localdate())
+        with self.lock:
+            if key not in self.pending and len(self.pending) >= options["MAX_BUFFERED"]:
+                self.dropped += views
+                return
+            self.pending[key] += views
+            full = len(self.pending) >= options["MAX_PENDING"]
+            # not alive: never started, or started before the worker forked
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="item-view-counts", daemon=True)
+                self.thread.start()
+        if full and not self.failures:
+            self.wake.set()  # flush early; while backing off, wait it out
+
+    def run(self):
+        while True:
+            options = view_count_settings()
+            delay = options["FLUSH_INTERVAL"]
+            if self.failures:
+                delay = min(delay * 2 ** self.failures, options["MAX_BACKOFF"])
+            self.wake.wait(delay)
+            self.wake.clear()
+            # this thread's connection lives as long as the process; treat
+            # each flush like a request (CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write out the buffer. Returns the number of (item, day) entries written."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        if not pending:
+            return 0
+        try:
+            write(pending)
+        except Exception:
+            with self.lock:
+                self.failures += 1
+                self.pending.update(pending)
+            logger.warning(
+                "Could not flush %d item view count(s) (attempt %d); keeping them for the next flush",
+                len(pending), self.failures, exc_info=True,
+            )
+            return 0
+        with self.lock:
+            self.failures = 0
+        return len(pending)
+
+
+buffer = ViewBuffer()
+atexit.register(buffer.flush)
+
+
+def record(item_id):
+    buffer.add(item_id)
@@ -1,23 +1,36 @@
 from django.contrib import admin
 
 from notifications.models import Notification
+from notifications.inbox import invalidate_unread_count
+from api.exports import NOTIFICATION_COLUMNS, make_export_action
+from regive.admin_changelists import LargeChangelistMixin
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(LargeChangelistMixin, admin.ModelAdmin):
     list_display = ("user", "title", "is_read", "created_at")
+    list_select_related = ("user",)
     list_filter = ("is_read", "created_at")
     search_fields = ("user__email", "user__full_name", "title", "message")
     ordering = ("-created_at",)
 
-    actions = ["mark_as_read", "mark_as_unread"]
+    actions = [
+        "mark_as_read",
+        "mark_as_unread",
+        make_export_action(NOTIFICATION_COLUMNS, "notifications", "csv"),
+        make_export_action(NOTIFICATION_COLUMNS, "notifications", "ndjson"),
+    ]
 
     def mark_as_read(self, request, queryset):
+        user_ids = list(queryset.values_list("user_id", flat=True).distinct())
         updated = queryset.update(is_read=True)
+        invalidate_unread_count(*user_ids)
         self.message_user(request, f"{updated} notification(s) marked as read.")
     mark_as_read.short_description = "Mark selected notifications as READ"
 
     def mark_as_unread(self, request, queryset):
+        user_ids = list(queryset.values_list("user_id", flat=True).distinct())
         updated = queryset.update(is_read=False)
+        invalidate_unread_count(*user_ids)
         self.message_user(request, f"{updated} notification(s) marked as unread.")
     mark_as_unread.short_description = "Mark selected notifications as UNREAD"
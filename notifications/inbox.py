@@ -0,0 +1,156 @@
+"""
+Cheap inbox operations: cached unread counts, set-based mark-as-read, and
+coalescing of high-volume notification kinds.
+
+The unread count is cached per user and invalidated whenever a user's
+notifications are created, saved, deleted or bulk-marked read. The TTL only
+bounds staleness if an invalidation is missed (e.g. a raw UPDATE).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from notifications.models import Notification
+
+
+UNREAD_COUNT_TTL = 60
+
+
+def unread_cache_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user_id):
+    key = unread_cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(key, count, UNREAD_COUNT_TTL)
+    return count
+
+
+def invalidate_unread_count(*user_ids):
+    cache.delete_many([unread_cache_key(user_id) for user_id in set(user_ids)])
+
+
+def mark_read(user, ids=None, up_to=None):
+    """
+    Mark the user's unread notifications read in a single UPDATE, limited to
+    `ids` and/or everything with id <= `up_to`. Returns the number updated.
+    """
+    queryset = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    if up_to is not None:
+        queryset = queryset.filter(id__lte=up_to)
+
+    updated = queryset.update(is_read=True)
+    if updated:
+        invalidate_unread_count(user.pk)
+    return updated
+
+
+# Title / message used when several events are merged into one row.
+COALESCED_TEXT = {
+    Notification.Kinds.NEW_ORDER: ("New Orders", "{count} new orders. Latest: {latest}"),
+}
+
+
+def coalesce_window(kind):
+    windows = getattr(settings, "NOTIFICATION_COALESCE_WINDOWS", {})
+    return windows.get(kind)
+
+
+def notify(user, title, message, kind=Notification.Kinds.GENERAL):
+    """
+    Create a notification, or fold it into the user's unread notification of
+    the same kind created within that kind's coalescing window
+    (NOTIFICATION_COALESCE_WINDOWS). The merged notification replaces that
+    row under a new id, with `count` bumped and an aggregated message. Open
+    streams only forward ids above their cursor, and an update in place
+    would never reach them. The re-created row is also newer, so the
+    window counts from the latest merged event.
+    """
+    window = coalesce_window(kind)
+    if window is None:
+        return Notification.objects.create(user=user, kind=kind, title=title, message=message)
+
+    with transaction.atomic():
+        existing = (
+            Notification.objects.select_for_update()
+            .filter(user=user, kind=kind, is_read=False, created_at__gte=timezone.now() - window)
+            .order_by("-id")
+            .first()
+        )
+        if existing is None:
+            return Notification.objects.create(user=user, kind=kind, title=title, message=message)
+
+        count = existing.count + 1
+        title_template, message_template = COALESCED_TEXT.get(kind, (title, "{latest} (+{more} more)"))
+        # delete() and create() send the signals that refresh the unread
+        # count and publish the new row to the stream
+        existing.delete()
+        return Notification.objects.create(
+            user=user,
+            kind=kind,
+            count=count,
+            title=title_template,
+            message=message_template.format(count=count, more=count - 1, latest=message),
+        )
+
+
+def delete_ids(ids):
+    """
+    DELETE rows by primary key without loading them; QuerySet.delete() would
+    fetch and signal every row. Callers handle unread-count invalidation.
+    """
+    if not ids:
+        return
+    table = connection.ops.quote_name(Notification._meta.db_table)
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", list(ids))
+
+
+def build_digests(older_than=None):
+    """
+    Collapse each user's unread notifications of one kind that are older than
+    `older_than` (NOTIFICATION_DIGEST_AFTER by default) into a single digest
+    row. The newest row of the group is kept, so ids stay monotonic for the
+    notification stream. Returns (groups_collapsed, rows_removed).
+    """
+    if older_than is None:
+        older_than = getattr(settings, "NOTIFICATION_DIGEST_AFTER", timedelta(hours=24))
+    cutoff = timezone.now() - older_than
+    stale = Notification.objects.filter(is_read=False, created_at__lt=cutoff)
+
+    # materialised up front: the loop deletes from the table being aggregated
+    groups = list(
+        stale.values("user_id", "kind")
+        .annotate(rows=Count("id"), total=Sum("count"), keep_id=Max("id"))
+        .filter(rows__gt=1)
+        .order_by("user_id", "kind")
+    )
+
+    collapsed = removed = 0
+    for group in groups:
+        label = Notification.Kinds(group["kind"]).label
+        with transaction.atomic():
+            ids = list(
+                stale.filter(user_id=group["user_id"], kind=group["kind"], id__lt=group["keep_id"])
+                .values_list("id", flat=True)
+            )
+            delete_ids(ids)
+            Notification.objects.filter(pk=group["keep_id"]).update(
+                count=group["total"],
+                title=f"{label} digest",
+                message=f"You have {group['total']} unread {label.lower()} notifications.",
+            )
+        invalidate_unread_count(group["user_id"])
+        collapsed += 1
+        removed += len(ids)
+    return collapsed, removed
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from notifications.inbox import build_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Collapse each user's older unread notifications of the same kind into a "
+        "single digest row. Run periodically (e.g. hourly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=None,
+            help="Only collapse notifications older than this (default: NOTIFICATION_DIGEST_AFTER).",
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(hours=options["hours"]) if options["hours"] is not None else None
+        collapsed, removed = build_digests(older_than)
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {collapsed} digest(s), removing {removed} notification row(s)."
+        ))
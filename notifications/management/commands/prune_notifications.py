@@ -0,0 +1,131 @@
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from notifications.inbox import delete_ids, invalidate_unread_count
+from notifications.models import Notification
+
+
+ARCHIVE_FIELDS = ("id", "user_id", "title", "message", "is_read", "created_at", "kind", "count")
+
+
+def retention_setting(name, default):
+    return getattr(settings, "NOTIFICATION_RETENTION", {}).get(name, default)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete read notifications older than --read-days and unread ones older than "
+        "--unread-days, walking the table in primary-key windows so every DELETE "
+        "touches a bounded range. Optionally archive deleted rows to gzipped NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--read-days", type=int, default=retention_setting("READ_DAYS", 30))
+        parser.add_argument("--unread-days", type=int, default=retention_setting("UNREAD_DAYS", 180))
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=retention_setting("BATCH_SIZE", 5000),
+            help="Width of each primary-key window.",
+        )
+        parser.add_argument("--archive-dir", default=retention_setting("ARCHIVE_DIR", None),
+                            help="Write deleted rows to <dir>/notifications-<timestamp>.ndjson.gz first.")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Pause between batches (seconds).")
+        parser.add_argument("--dry-run", action="store_true", help="Count matching rows without deleting.")
+        parser.add_argument("--optimize", action="store_true",
+                            help="Run OPTIMIZE TABLE afterwards (MySQL) to reclaim space.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive")
+
+        now = timezone.now()
+        read_cutoff = now - timedelta(days=options["read_days"])
+        unread_cutoff = now - timedelta(days=options["unread_days"])
+        expired = Q(is_read=True, created_at__lt=read_cutoff) | Q(is_read=False, created_at__lt=unread_cutoff)
+
+        # ids grow with created_at, so nothing above the newest row older than
+        # the later cutoff can match; rows created out of order are caught next run.
+        bounds = Notification.objects.filter(created_at__lt=max(read_cutoff, unread_cutoff)).aggregate(
+            low=Min("id"), high=Max("id")
+        )
+        if bounds["low"] is None:
+            self.stdout.write("Nothing to prune.")
+            return
+
+        if options["dry_run"]:
+            count = Notification.objects.filter(expired, id__lte=bounds["high"]).count()
+            self.stdout.write(f"{count} notification(s) would be deleted.")
+            return
+
+        archive = self.open_archive(options["archive_dir"], now) if options["archive_dir"] else None
+        deleted = 0
+        started = time.perf_counter()
+        try:
+            for start in range(bounds["low"], bounds["high"] + 1, options["batch_size"]):
+                end = start + options["batch_size"]
+                deleted += self.prune_window(start, end, expired, archive)
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"  ids [{start}, {end}): {deleted} deleted so far")
+                if options["sleep"]:
+                    time.sleep(options["sleep"])
+        finally:
+            if archive is not None:
+                archive.close()
+
+        elapsed = time.perf_counter() - started
+        rate = deleted / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} notification(s) in {elapsed:.2f}s ({rate:,.0f} rows/s)."
+        ))
+        if archive is not None:
+            self.stdout.write(f"Archived to {archive.name}")
+
+        if options["optimize"]:
+            self.optimize()
+
+    def prune_window(self, start, end, expired, archive):
+        rows = list(
+            Notification.objects.filter(expired, id__gte=start, id__lt=end)
+            .order_by("id")
+            .values_list(*ARCHIVE_FIELDS)
+        )
+        if not rows:
+            return 0
+
+        if archive is not None:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(ARCHIVE_FIELDS, row)), cls=DjangoJSONEncoder).encode() + b"\n")
+            # Make the archived batch durable before its rows disappear.
+            archive.flush()
+            os.fsync(archive.fileobj.fileno())
+
+        ids = [row[0] for row in rows]
+        with transaction.atomic():
+            delete_ids(ids)
+
+        invalidate_unread_count(*(row[1] for row in rows if not row[4]))
+        return len(ids)
+
+    def open_archive(self, directory, now):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"notifications-{now:%Y%m%d-%H%M%S}.ndjson.gz")
+        return gzip.open(path, "ab", compresslevel=6)
+
+    def optimize(self):
+        if connection.vendor != "mysql":
+            self.stdout.write(f"--optimize is only supported on MySQL (using {connection.vendor}); skipped.")
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"OPTIMIZE TABLE {connection.ops.quote_name(Notification._meta.db_table)}")
+        self.stdout.write("Table optimized.")
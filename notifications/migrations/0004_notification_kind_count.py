@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('GENERAL', 'General'), ('NEW_ORDER', 'New order'), ('ORDER_CREATED', 'Order created'), ('ORDER_STATUS', 'Order status'), ('PAYMENT', 'Payment')], default='GENERAL', max_length=20),
+        ),
+    ]
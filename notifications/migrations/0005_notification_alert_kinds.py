@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_kind_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('GENERAL', 'General'), ('NEW_ORDER', 'New order'), ('ORDER_CREATED', 'Order created'), ('ORDER_STATUS', 'Order status'), ('PAYMENT', 'Payment'), ('PRICE_DROP', 'Price drop'), ('BACK_IN_STOCK', 'Back in stock')], default='GENERAL', max_length=20),
+        ),
+    ]
@@ -2,13 +2,32 @@ from django.db import models
 from django.conf import settings
 
 class Notification(models.Model):
+
+    class Kinds(models.TextChoices):
+        GENERAL = "GENERAL", "General"
+        NEW_ORDER = "NEW_ORDER", "New order"
+        ORDER_CREATED = "ORDER_CREATED", "Order created"
+        ORDER_STATUS = "ORDER_STATUS", "Order status"
+        PAYMENT = "PAYMENT", "Payment"
+        PRICE_DROP = "PRICE_DROP", "Price drop"
+        BACK_IN_STOCK = "BACK_IN_STOCK", "Back in stock"
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications")
+    kind = models.CharField(max_length=20, choices=Kinds.choices, default=Kinds.GENERAL)
     title = models.CharField(max_length=255)
     message = models.TextField()
+    # number of events merged into this row (see notifications.inbox.notify)
+    count = models.PositiveIntegerField(default=1)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Unread badge / mark-read. A plain index rather than a partial
+            # one on is_read=False: MySQL ignores index conditions.
+            models.Index(fields=["user", "is_read"], name="notif_user_is_read_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.email} - {self.title}"
 
-
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from notifications.inbox import invalidate_unread_count
 from notifications.models import Notification
+from notifications.stream import broker, event_from_instance
 
 
 #Placeholder for push notifications (FCM, OneSignal, etc.)
@@ -11,3 +14,15 @@ def send_push_notification(sender, instance, created, **kwargs):
         #integrate FCM / OneSignal here
         pass
 
+
+@receiver(post_save, sender=Notification)
+def publish_to_stream(sender, instance, created, **kwargs):
+    if created:
+        event = event_from_instance(instance)
+        transaction.on_commit(lambda: broker.publish(event))
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def refresh_unread_count(sender, instance, **kwargs):
+    invalidate_unread_count(instance.user_id)
@@ -0,0 +1,256 @@
+"""
+Server-Sent Events fan-out for notifications (ASGI only).
+
+Every open stream is a Subscriber: an asyncio queue plus a cursor (the last
+notification id confirmed from the database). No thread is held per
+connection, so a process can keep thousands of idle streams open.
+
+Two feeds fill the queues:
+
+- push: notifications.signals publishes each new Notification (after commit)
+  to the subscribers of that user in this process, for low latency.
+- poll: one task per process wakes up every POLL_INTERVAL seconds and loads
+  the new rows of *all* connected users, one query per USERS_PER_QUERY
+  users, each read from above its own cursor. This picks up
+  notifications created by other processes and anything a push missed.
+
+Every row reaches the client through the poll eventually; pushed ids are
+remembered so the poll does not send them twice. Event ids are notification
+ids, so a reconnecting EventSource resumes via Last-Event-ID.
+
+The poll task runs outside any request, so it recycles its database
+connection itself (close_old_connections) around every fetch. A failed fetch
+is logged and retried after POLL_INTERVAL * 2, * 4, ... up to
+POLL_MAX_BACKOFF seconds.
+
+EventSource can't send an Authorization header. Rather than a JWT in the
+URL, where access logs would keep it, a client can POST for a ticket
+(issue_ticket) and open the stream with ?ticket=: single use, and valid for
+TICKET_TTL seconds.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import threading
+from collections import defaultdict
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Q
+
+from notifications.models import Notification
+
+
+logger = logging.getLogger(__name__)
+
+def stream_setting(name, default):
+    return getattr(settings, "NOTIFICATION_STREAM", {}).get(name, default)
+
+
+POLL_INTERVAL = stream_setting("POLL_INTERVAL", 2.0)
+HEARTBEAT = stream_setting("HEARTBEAT", 20.0)
+QUEUE_SIZE = stream_setting("QUEUE_SIZE", 100)
+BATCH_SIZE = stream_setting("BATCH_SIZE", 1000)
+POLL_MAX_BACKOFF = stream_setting("POLL_MAX_BACKOFF", 60.0)
+TICKET_TTL = stream_setting("TICKET_TTL", 30)
+# users per poll query; keeps the OR of per-user cursors within SQLite's expression depth limit
+USERS_PER_QUERY = 400
+
+EVENT_FIELDS = ("id", "user_id", "kind", "title", "message", "count", "is_read", "created_at")
+
+
+def event_from_instance(notification):
+    return {field: getattr(notification, field) for field in EVENT_FIELDS}
+
+
+def format_event(event):
+    data = json.dumps(event, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+def latest_id(user_id):
+    return (
+        Notification.objects.filter(user_id=user_id).order_by("-id").values_list("id", flat=True).first()
+        or 0
+    )
+
+
+def fetch_since(cursors, limit=BATCH_SIZE):
+    """
+    The oldest `limit` new rows of the connected users, each user's read
+    from above that user's own cursor. (A single range above the smallest
+    cursor would let one user's older rows fill every batch and stall the
+    stream for good.) One query per USERS_PER_QUERY users.
+    """
+    users = list(cursors.items())
+    rows = []
+    for start in range(0, len(users), USERS_PER_QUERY):
+        condition = Q()
+        for user_id, cursor in users[start:start + USERS_PER_QUERY]:
+            condition |= Q(user_id=user_id, id__gt=cursor)
+        rows.extend(Notification.objects.filter(condition).order_by("id").values(*EVENT_FIELDS)[:limit])
+    rows.sort(key=itemgetter("id"))
+    return rows[:limit]
+
+
+def poll(cursors):
+    """fetch_since() for the poll task, on a connection checked like a request's."""
+    close_old_connections()
+    try:
+        return fetch_since(cursors)
+    finally:
+        close_old_connections()
+
+
+def ticket_key(ticket):
+    return f"notifications:stream-ticket:{ticket}"
+
+
+def issue_ticket(user_id):
+    """A single-use ticket that opens one stream for `user_id` within TICKET_TTL seconds."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(ticket_key(ticket), user_id, TICKET_TTL)
+    return ticket
+
+
+def redeem_ticket(ticket):
+    """The ticket's user id, or None; a ticket is only accepted once."""
+    user_id = cache.get(ticket_key(ticket))
+    if user_id is None or not cache.delete(ticket_key(ticket)):
+        return None
+    return user_id
+
+
+class Subscriber:
+    __slots__ = ("user_id", "cursor", "queue", "loop", "pushed")
+
+    def __init__(self, user_id, cursor, loop):
+        self.user_id = user_id
+        self.cursor = cursor
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.loop = loop
+        self.pushed = set()
+
+    def push(self, event):
+        """Deliver a just-created notification ahead of the next poll."""
+        if event["id"] <= self.cursor or event["id"] in self.pushed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return  # the poll will deliver it
+        self.pushed.add(event["id"])
+
+    def deliver(self, events):
+        """Deliver polled rows (ascending ids) and advance the cursor."""
+        for event in events:
+            if event["id"] <= self.cursor:
+                continue
+            if event["id"] not in self.pushed:
+                try:
+                    self.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    break  # slow client: resume from here next tick
+            self.cursor = event["id"]
+        self.pushed = {event_id for event_id in self.pushed if event_id > self.cursor}
+
+
+class NotificationBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def subscribe(self, user_id, cursor):
+        loop = asyncio.get_running_loop()
+        subscriber = Subscriber(user_id, cursor, loop)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+            if self._poller is None or self._poller.done():
+                self._poller = loop.create_task(self.poll_forever())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+
+    def publish(self, event):
+        """Thread-safe; called from the request thread that created the row."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event["user_id"], ()))
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.push, event)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def poll_forever(self):
+        failures = 0
+        while True:
+            await asyncio.sleep(min(POLL_INTERVAL * 2 ** failures, POLL_MAX_BACKOFF))
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+                snapshot = {user_id: list(subs) for user_id, subs in self._subscribers.items()}
+            # users whose every stream is backed up are skipped until a
+            # client drains its queue, so their rows don't crowd the batch
+            cursors = {
+                user_id: min(sub.cursor for sub in subs)
+                for user_id, subs in snapshot.items()
+                if not all(sub.queue.full() for sub in subs)
+            }
+            if not cursors:
+                continue
+
+            try:
+                rows = await sync_to_async(poll)(cursors)
+            except Exception:
+                failures += 1
+                logger.warning("Notification stream poll failed (%d in a row)", failures, exc_info=True)
+                continue
+            failures = 0
+
+            by_user = defaultdict(list)
+            for row in rows:
+                by_user[row["user_id"]].append(row)
+            for user_id, events in by_user.items():
+                for subscriber in snapshot[user_id]:
+                    subscriber.deliver(events)
+
+
+broker = NotificationBroker()
+
+
+async def event_stream(user_id, last_event_id=None):
+    """
+    Async iterator of SSE frames for one connection. With `last_event_id`,
+    replays what the client missed; otherwise starts at the newest row.
+    """
+    cursor = last_event_id if last_event_id is not None else await sync_to_async(latest_id)(user_id)
+    subscriber = broker.subscribe(user_id, cursor)
+    try:
+        yield f"retry: {int(POLL_INTERVAL * 1000) * 2}\n\n"
+        if last_event_id is not None:
+            backlog = await sync_to_async(fetch_since)({user_id: cursor}, QUEUE_SIZE)
+            subscriber.deliver(backlog)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
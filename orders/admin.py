@@ -3,6 +3,8 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 
 from orders.models import Order, OrderItem
+from api.exports import ORDER_COLUMNS, make_export_action
+from regive.admin_changelists import CachedRelatedOnlyFieldListFilter, LargeChangelistMixin
 
 
 class OrderItemInline(admin.TabularInline):
@@ -14,7 +16,7 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeChangelistMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "buyer",
@@ -22,10 +24,11 @@ class OrderAdmin(admin.ModelAdmin):
         "total_amount_display",
         "created_at",
     )
+    list_select_related = ("buyer",)
 
     list_filter = (
         "status",
-        ("buyer", admin.RelatedOnlyFieldListFilter),
+        ("buyer", CachedRelatedOnlyFieldListFilter),
         "created_at",
     )
 
@@ -89,6 +92,8 @@ class OrderAdmin(admin.ModelAdmin):
         "mark_shipped",
         "mark_delivered",
         "mark_cancelled",
+        make_export_action(ORDER_COLUMNS, "orders", "csv"),
+        make_export_action(ORDER_COLUMNS, "orders", "ndjson"),
     ]
 
     def mark_processing(self, request, queryset):
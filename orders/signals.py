@@ -3,6 +3,7 @@ from django.dispatch import receiver
 
 from orders.models import Order
 from notifications.models import Notification
+from notifications.inbox import notify
 
 
 
@@ -23,10 +24,11 @@ def notify_order_event(sender, instance, created, **kwargs):
 
     # 1️⃣ Order created
     if created:
-        Notification.objects.create(
-            user=instance.buyer,
+        notify(
+            instance.buyer,
             title="Order Created",
-            message=f"Your order #{instance.id} has been created and is now pending."
+            message=f"Your order #{instance.id} has been created and is now pending.",
+            kind=Notification.Kinds.ORDER_CREATED,
         )
         return
 
@@ -34,8 +36,9 @@ def notify_order_event(sender, instance, created, **kwargs):
     old_status = getattr(instance, "_old_status", None)
 
     if old_status and old_status != instance.status:
-        Notification.objects.create(
-            user=instance.buyer,
+        notify(
+            instance.buyer,
             title="Order Status Update",
-            message=f"Your order #{instance.id} status changed from {old_status} to {instance.status}."
+            message=f"Your order #{instance.id} status changed from {old_status} to {instance.status}.",
+            kind=Notification.Kinds.ORDER_STATUS,
         )
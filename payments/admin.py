@@ -1,11 +1,14 @@
 from django.contrib import admin
 
 from payments.models import Payment
+from regive.admin_changelists import LargeChangelistMixin
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeChangelistMixin, admin.ModelAdmin):
     list_display = ("id", "order", "amount", "provider", "status", "reference", "created_at")
+    # Order.__str__ reads the buyer
+    list_select_related = ("order__buyer",)
     list_filter = ("provider", "status", "created_at")
     search_fields = ("order__id", "reference", "order__buyer__email")
     readonly_fields = ("created_at",)
@@ -4,6 +4,7 @@ from django.dispatch import receiver
 from payments.models import Payment
 from orders.models import Order
 from notifications.models import Notification
+from notifications.inbox import notify
 
 
 #Update order status when payment is successful
@@ -17,9 +18,10 @@ def update_order_after_payment(sender, instance, created, **kwargs):
         order.status = "PAID"
         order.save(update_fields=["status"])
 
-        Notification.objects.create(
-            user=order.buyer,
+        notify(
+            order.buyer,
             title="Payment Successful",
-            message=f"Your payment for order #{order.id} was successful."
+            message=f"Your payment for order #{order.id} was successful.",
+            kind=Notification.Kinds.PAYMENT,
         )
 
@@ -0,0 +1,93 @@
+"""
+Admin changelists for tables too big to count or scan per page load.
+
+- EstimatedCountPaginator: an unfiltered changelist takes its row count
+  from the database's table statistics (MySQL information_schema,
+  PostgreSQL pg_class, SQLite sqlite_stat1 after ANALYZE) once the table
+  holds more than ADMIN_CHANGELISTS["ESTIMATE_ABOVE"] rows, instead of a
+  COUNT(*) over all of it. Filtered and searched lists count exactly. The
+  page count is approximate, so the last pages may be empty.
+- CachedRelatedOnlyFieldListFilter: RelatedOnlyFieldListFilter's choices
+  (the related objects actually referenced) come from a DISTINCT over the
+  whole table; this shares them through the cache for FILTER_CACHE_TIMEOUT
+  seconds, so new values show up in the sidebar that much later.
+- LargeChangelistMixin: both of the above for a ModelAdmin, plus
+  show_full_result_count = False, which drops the second, unfiltered
+  COUNT(*) Django runs for "N results (M total)".
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def changelist_settings():
+    return {
+        "ESTIMATE_ABOVE": 100000,
+        "FILTER_CACHE_TIMEOUT": 600,
+        **getattr(settings, "ADMIN_CHANGELISTS", {}),
+    }
+
+
+ESTIMATE_SQL = {
+    "mysql": "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+    "postgresql": "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+    # the first number of a table's stat row is its row count
+    "sqlite": "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+}
+
+
+def estimated_rows(model, using="default"):
+    """The table's row count according to the planner statistics, or None if there are none."""
+    connection = connections[using]
+    sql = ESTIMATE_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:  # never analyzed
+                return None
+        try:
+            cursor.execute(sql, [model._meta.db_table])
+        except DatabaseError:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None  # PostgreSQL: -1 before the first ANALYZE
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > changelist_settings()["ESTIMATE_ABOVE"]:
+                return estimate
+        return super().count
+
+
+class CachedRelatedOnlyFieldListFilter(admin.RelatedOnlyFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        key = f"admin:filter-choices:{model_admin.model._meta.label_lower}:{self.field_path}"
+        choices = cache.get(key)
+        if choices is None:
+            referenced = model_admin.get_queryset(request).order_by().values(f"{self.field_path}__pk").distinct()
+            related = field.remote_field.model._default_manager.filter(pk__in=referenced)
+            ordering = self.field_admin_ordering(field, request, model_admin)
+            # labels may read the related object's own foreign keys (Cart of <buyer>)
+            related = related.select_related().order_by(*(ordering or related.model._meta.ordering or ["pk"]))
+            choices = [(obj.pk, str(obj)) for obj in related]
+            cache.set(key, choices, changelist_settings()["FILTER_CACHE_TIMEOUT"])
+        return choices
+
+
+class LargeChangelistMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -2,6 +2,8 @@
 ASGI config for regive project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Long-lived endpoints such as /api/notifications/stream/ (Server-Sent Events)
+only work when served through this module, e.g. ``uvicorn regive.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -14,3 +16,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'regive.settings')
 
 application = get_asgi_application()
+
+# load the autocomplete index now rather than on the first keystroke
+from items import autocomplete  # noqa: E402 - needs the app registry
+
+autocomplete.warm()
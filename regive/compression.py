@@ -0,0 +1,206 @@
+"""
+Response compression: gzip, and brotli when the optional `brotli` package
+is installed.
+
+compress_response() applies the COMPRESSION policy (size threshold and
+per-content-type rules) to a response. CompressionMiddleware
+(regive.middleware) runs it for every response; views whose responses are
+cached call it *inside* the cache via the `compressed` decorator, so the
+cache stores the compressed bytes once per encoding and later hits skip
+compression (the middleware leaves responses with a Content-Encoding alone).
+Streaming responses are compressed chunk by chunk, flushing after each one
+so clients receive data as it is produced.
+"""
+import gzip
+import re
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+STRONG_ETAG = re.compile(r'^"[^"]*"$')
+
+
+def available_encodings():
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding, level=None):
+    """One-shot compression; `level` defaults to the maximum (build steps)."""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == "gzip":
+        # mtime=0 keeps the output (and anything hashed from it) deterministic
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def parse_accept_encoding(header):
+    """{coding: q} for an Accept-Encoding header, lower-cased."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(header, offered):
+    """
+    Pick the first of `offered` (in our order of preference) that the client
+    accepts with q > 0, or None for identity.
+    """
+    accepted = parse_accept_encoding(header)
+    for encoding in offered:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def compression_settings():
+    return {
+        "ENABLED": True,
+        "MIN_SIZE": 512,
+        "GZIP_LEVEL": 6,
+        "BROTLI_QUALITY": 5,
+        "CONTENT_TYPES": {},
+        **getattr(settings, "COMPRESSION", {}),
+    }
+
+
+def content_type_policy(content_type, config):
+    """
+    The CONTENT_TYPES rule for a media type: the entry for the exact type,
+    else for the longest matching prefix (e.g. "text/"). None means don't
+    compress; a dict may override MIN_SIZE.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    rules = config["CONTENT_TYPES"]
+    if media_type in rules:
+        policy = rules[media_type]
+    else:
+        prefixes = [prefix for prefix in rules if prefix.endswith("/") and media_type.startswith(prefix)]
+        policy = rules[max(prefixes, key=len)] if prefixes else None
+    return policy if policy is not False else None
+
+
+class StreamCompressor:
+    """Incremental compressor whose output is flushed after every chunk."""
+
+    def __init__(self, encoding, config):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=config["BROTLI_QUALITY"])
+        else:
+            # wbits=31: gzip container
+            self._compressor = zlib.compressobj(config["GZIP_LEVEL"], zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_iterator(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_iterator(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(request, response):
+    """
+    Compress `response` in place when the client accepts it and the policy
+    allows it. Returns the response.
+    """
+    config = compression_settings()
+    if (
+        not config["ENABLED"]
+        or response.has_header("Content-Encoding")
+        or response.status_code in (204, 206, 304)
+        or "no-transform" in response.get("Cache-Control", "")
+    ):
+        return response
+
+    policy = content_type_policy(response.get("Content-Type", ""), config)
+    if policy is None:
+        return response
+    min_size = policy.get("MIN_SIZE", config["MIN_SIZE"])
+    if not response.streaming and len(response.content) < min_size:
+        return response
+
+    # from here on the body depends on Accept-Encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"), available_encodings())
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        compressor = StreamCompressor(encoding, config)
+        if response.is_async:
+            response.streaming_content = compress_async_iterator(response.streaming_content, compressor)
+        else:
+            response.streaming_content = compress_iterator(response.streaming_content, compressor)
+        del response["Content-Length"]
+    else:
+        level = config["BROTLI_QUALITY"] if encoding == "br" else config["GZIP_LEVEL"]
+        compressed_content = compress(response.content, encoding, level)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response["Content-Length"] = str(len(compressed_content))
+
+    # the compressed body is a different representation: a strong ETag of
+    # the original no longer matches it byte for byte
+    etag = response.get("ETag")
+    if etag and STRONG_ETAG.match(etag):
+        response["ETag"] = "W/" + etag
+    response["Content-Encoding"] = encoding
+    return response
+
+
+def compressed(view):
+    """
+    Compress the view's response before anything wrapped around it (such as
+    cache_page) sees it. Renders template/DRF responses first.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render") and not response.is_rendered:
+            response.render()
+        return compress_response(request, response)
+
+    return wrapper
@@ -0,0 +1,166 @@
+"""
+Per-worker database connection pool for the ASGI path.
+
+Under WSGI each worker thread keeps its own persistent connection
+(CONN_MAX_AGE / CONN_HEALTH_CHECKS). Under ASGI, Django runs every sync view
+in a fresh executor thread, so thread-local connections are opened and torn
+down per request and CONN_MAX_AGE buys nothing. The pool keeps a bounded set
+of DatabaseWrapper objects per process and lends one to each request
+(see regive.middleware.PooledConnectionMiddleware).
+
+Lent connections still honour CONN_MAX_AGE and CONN_HEALTH_CHECKS: they are
+passed through close_if_unusable_or_obsolete() on checkout and return, the
+same hook Django's request signals use.
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+
+
+class PoolTimeout(Exception):
+    """No connection became available within DATABASE_POOL["TIMEOUT"]."""
+
+
+class ConnectionPool:
+    def __init__(self, alias, max_size=10, timeout=5.0):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self.in_use = 0
+        self.created = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def acquire(self):
+        with self._cond:
+            while not self._idle and self.in_use + len(self._idle) >= self.max_size:
+                self.waits += 1
+                if not self._cond.wait(self.timeout):
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No '{self.alias}' connection available after {self.timeout}s")
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = connections.create_connection(self.alias)
+                self.created += 1
+            self.in_use += 1
+
+        # Each wrapper serves one request at a time, but not always from the
+        # thread that opened it.
+        conn.inc_thread_sharing()
+        conn.close_if_unusable_or_obsolete()
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.connection is not None and not conn.get_autocommit():
+                conn.rollback()
+                conn.set_autocommit(True)
+            conn.close_if_unusable_or_obsolete()
+        except Exception:
+            conn.close()
+        finally:
+            conn.dec_thread_sharing()
+            with self._cond:
+                self.in_use -= 1
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def close_idle(self):
+        with self._cond:
+            while self._idle:
+                conn = self._idle.pop()
+                conn.inc_thread_sharing()
+                try:
+                    conn.close()
+                finally:
+                    conn.dec_thread_sharing()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "alias": self.alias,
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "open": sum(1 for conn in self._idle if conn.connection is not None),
+                "created": self.created,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+            }
+
+
+class LazyConnection:
+    """
+    Stands in for connections[alias] during an ASGI request and checks a
+    connection out of the pool the first time it is used, so a request holds
+    connections only for the databases it actually queries. Attribute reads
+    and writes go to the checked-out DatabaseWrapper, the same way
+    django.db.connection forwards to connections["default"].
+    """
+
+    def __init__(self, pool):
+        object.__setattr__(self, "_lease_pool", pool)
+        object.__setattr__(self, "_lease", None)
+
+    def checkout(self):
+        if self._lease is None:
+            object.__setattr__(self, "_lease", self._lease_pool.acquire())
+        return self._lease
+
+    def checkin(self):
+        wrapper = self._lease
+        if wrapper is not None:
+            object.__setattr__(self, "_lease", None)
+            self._lease_pool.release(wrapper)
+
+    def __getattr__(self, name):
+        return getattr(self.checkout(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.checkout(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self.checkout(), name)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_settings():
+    return {
+        "ENABLED": False,
+        "MAX_SIZE": 10,
+        "TIMEOUT": 5.0,
+        **getattr(settings, "DATABASE_POOL", {}),
+    }
+
+
+def get_pool(alias):
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                config = pool_settings()
+                pool = _pools[alias] = ConnectionPool(alias, config["MAX_SIZE"], config["TIMEOUT"])
+    return pool
+
+
+def pool_stats():
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def close_all():
+    """Close every idle pooled connection and drop the pools (worker shutdown, benchmarks)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
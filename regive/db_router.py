@@ -0,0 +1,127 @@
+"""
+Read-replica routing.
+
+Reads are sent to a replica only inside a `replica_reads()` block, which the
+API opens for safe-method requests on designated views (see
+api.views.ReplicaReadMixin). Everything else keeps using "default".
+
+- Read-your-writes: the first write inside a block pins the rest of that block
+  (i.e. the rest of the request) to the primary.
+- One replica per block: the first read picks a healthy replica and the rest
+  of the block stays on it, so a request never mixes rows from replicas with
+  different replication lag.
+- Health: each replica is pinged at most once per DATABASE_REPLICA_HEALTH_TTL
+  seconds; unhealthy replicas are skipped and reads fall back to the primary.
+
+State lives in a ContextVar, so it is per-request under both WSGI threads and
+ASGI tasks.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+class RouteState:
+    __slots__ = ("pinned", "replica")
+
+    def __init__(self):
+        self.pinned = False
+        self.replica = None
+
+
+_route = ContextVar("db_route", default=None)
+
+# alias -> (healthy, checked_at); per process.
+_health = {}
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def health_ttl():
+    return getattr(settings, "DATABASE_REPLICA_HEALTH_TTL", 5)
+
+
+def check_replica(alias):
+    """Return True if `alias` answers a trivial query."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except (DatabaseError, OSError):
+        connections[alias].close()
+        return False
+
+
+def replica_is_healthy(alias):
+    now = time.monotonic()
+    cached = _health.get(alias)
+    if cached is not None and now - cached[1] < health_ttl():
+        return cached[0]
+    healthy = check_replica(alias)
+    _health[alias] = (healthy, now)
+    return healthy
+
+
+def mark_unhealthy(alias):
+    """Take a replica out of rotation until the next health check."""
+    _health[alias] = (False, time.monotonic())
+
+
+def reset_health():
+    _health.clear()
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads in this block to go to a replica until the first write."""
+    token = _route.set(RouteState())
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def pin_to_primary():
+    """Send the remaining reads of the current block to the primary."""
+    state = _route.get()
+    if state is not None:
+        state.pinned = True
+
+
+class ReplicaRouter:
+    """
+    Database router for DATABASE_REPLICAS. Writes and migrations always
+    target the primary; reads target a healthy replica only when allowed
+    by the current replica_reads() block.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _route.get()
+        if state is None or state.pinned:
+            return DEFAULT_DB_ALIAS
+
+        if state.replica is None or not replica_is_healthy(state.replica):
+            healthy = [alias for alias in replicas() if replica_is_healthy(alias)]
+            state.replica = random.choice(healthy) if healthy else None
+        return state.replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return getattr(settings, "DATABASE_REPLICAS_MIGRATE", False)
+        return True
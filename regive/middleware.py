@@ -0,0 +1,101 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+
+from regive.compression import compress_response
+from regive.db_pool import LazyConnection, PoolTimeout, get_pool, pool_settings
+from regive.db_router import replicas
+
+
+class PooledConnectionMiddleware:
+    """
+    Lend each ASGI request pooled database connections. connections[alias]
+    is swapped for a LazyConnection for "default" and every replica, and a
+    connection is only checked out when that alias is first queried, so a
+    request that never reads from a replica holds no replica connection.
+    Must be the first (outermost) entry in MIDDLEWARE so it runs in the same
+    thread as the sync view. WSGI requests are left to Django's thread-local
+    persistent connections.
+
+    Connections go back once the response is ready. The one exception is a
+    synchronous streaming body: it is consumed later, in the same thread, so
+    it keeps its connections until it has been sent or the response is
+    closed. Asynchronous streams (the notification SSE feed, CSV/NDJSON
+    exports) can stay open for a long time. They give the connections back
+    at once and query through sync_to_async on Django's own connections.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = pool_settings()["ENABLED"]
+
+    def __call__(self, request):
+        if not self.enabled or not isinstance(request, ASGIRequest):
+            return self.get_response(request)
+
+        lent = [(alias, connections[alias], LazyConnection(get_pool(alias))) for alias in [DEFAULT_DB_ALIAS, *replicas()]]
+        for alias, _, lazy in lent:
+            connections[alias] = lazy
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.give_back(lent)
+            raise
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = GiveBackAfter(response.streaming_content, lambda: self.give_back(lent))
+        else:
+            self.give_back(lent)
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, PoolTimeout):
+            return JsonResponse(
+                {"error": "Database busy, retry shortly"},
+                status=503,
+                headers={"Retry-After": "1"},
+            )
+        return None
+
+    def give_back(self, lent):
+        for alias, original, lazy in lent:
+            connections[alias] = original
+            lazy.checkin()
+
+
+class GiveBackAfter:
+    """
+    A streaming body that calls `give_back` once it has been iterated to the
+    end, or when the response is closed without being fully sent (a client
+    that disconnects, or a body that was never started). The response's
+    streaming_content setter registers close() with the response's closers.
+    """
+
+    def __init__(self, content, give_back):
+        self.content = content
+        self.give_back = give_back
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        give_back, self.give_back = self.give_back, None
+        if give_back is not None:
+            give_back()
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli-compress responses according to settings.COMPRESSION (see
+    regive.compression). Responses that already carry a Content-Encoding,
+    such as cached catalog pages compressed before caching, pass through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return compress_response(request, self.get_response(request))
@@ -78,7 +78,21 @@ INSTALLED_APPS = [
 
 ]
 
+# API-only workers (API_ONLY=True) leave out apps that serve no API requests:
+# the admin and the OpenAPI schema/docs views, with their URLs (regive/urls.py).
+# allauth.socialaccount stays: dj_rest_auth.registration, which our register
+# serializer builds on, imports its models. Run one full worker (or a separate
+# deployment) for /admin/ and /api/docs/. `manage.py profile_startup
+# --api-only` and `manage.py bench_startup` show the difference.
+API_ONLY = os.getenv("API_ONLY", "False") == "True"
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in {"django.contrib.admin", "drf_spectacular"}]
+
 MIDDLEWARE = [
+    # Must stay first: lends pooled DB connections to ASGI requests.
+    'regive.middleware.PooledConnectionMiddleware',
+    # Above anything that reads or rewrites response bodies.
+    'regive.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,6 +135,44 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Keep connections open between requests instead of reconnecting each
+        # time; health checks drop connections the server has closed meanwhile.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+# Per-worker connection pool for ASGI workers (see regive/db_pool.py).
+DATABASE_POOL = {
+    "ENABLED": os.getenv("DB_POOL_ENABLED", "True") == "True",
+    "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    "TIMEOUT": 5.0,  # seconds to wait for a free connection before answering 503
+}
+
+# Read replicas: comma-separated replica hosts sharing the primary's credentials
+# (for SQLite, comma-separated database file paths). Safe-method requests on the
+# catalog views read from a healthy replica; see regive/db_router.py.
+DATABASE_REPLICAS = []
+for number, location in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1):
+    alias = f"replica{number}"
+    location_key = "NAME" if DATABASES["default"]["ENGINE"].endswith("sqlite3") else "HOST"
+    DATABASES[alias] = {**DATABASES["default"], location_key: location.strip()}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["regive.db_router.ReplicaRouter"]
+# Replicas take their schema from the primary through replication, so migrate
+# skips them. In tests each replica is a separate, empty database that does need
+# the tables: TEST_RUNNER turns this on while it creates the test databases.
+DATABASE_REPLICAS_MIGRATE = False
+TEST_RUNNER = "regive.test_runner.ReplicaTestRunner"
+DATABASE_REPLICA_HEALTH_TTL = 5  # seconds between replica health checks
+
+# Cache: per-process memory by default; point CACHE_BACKEND/CACHE_LOCATION at a
+# shared cache (Redis, Memcached) when running several workers.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
@@ -169,11 +221,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "users.CustomUser"
 
+# EmailBackend extends ModelBackend (permissions included). Listing
+# ModelBackend as well would run a second password hash on every failed login.
 AUTHENTICATION_BACKENDS = [
     'users.backends.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
  ]
 
+# The first hasher hashes new passwords; hashes made by the others (or with
+# other parameters) are upgraded on the next successful login.
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "1000000"))
+PASSWORD_HASHERS = [
+    "users.hashers.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+
+# Token buckets for /api/auth/login/ (users/ratelimit.py): up to CAPACITY
+# attempts in a burst, refilled at RATE per second.
+LOGIN_RATE_LIMITS = {
+    "IP": {"CAPACITY": 30, "RATE": 0.5},
+    "EMAIL": {"CAPACITY": 10, "RATE": 0.1},
+}
+
 
 from datetime import timedelta
 
@@ -181,7 +249,7 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
 
@@ -189,6 +257,17 @@ REST_FRAMEWORK = {
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
 
+    # orjson-backed JSON with DRF's exact output (api/renderers.py, api/parsers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+
     # Pagination
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
@@ -207,6 +286,13 @@ SPECTACULAR_SETTINGS = {
     
 }
 
+# Output of manage.py build_openapi_schema, served by api.schema.SchemaView.
+# With OPENAPI_SCHEMA_AUTO_REBUILD (local development only: it stats every .py
+# file, at most once a second, on the request path) the schema is rebuilt here
+# whenever a .py file changes.
+OPENAPI_SCHEMA_DIR = Path(os.getenv("OPENAPI_SCHEMA_DIR", BASE_DIR / "build" / "openapi"))
+OPENAPI_SCHEMA_AUTO_REBUILD = os.getenv("OPENAPI_SCHEMA_AUTO_REBUILD", "False") == "True"
+
 REST_AUTH = {
     "USE_JWT": True,
     "JWT_AUTH_COOKIE": "my-app-auth",
@@ -236,3 +322,149 @@ ACCOUNT_SIGNUP_FIELDS = {
 }
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+
+# Resumable (tus-style) uploads for Item.video
+VIDEO_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, "video_uploads")
+VIDEO_UPLOAD_MAX_SIZE = 2 * 1024 ** 3          # 2 GiB
+VIDEO_UPLOAD_EXPIRY = timedelta(hours=24)      # abandoned uploads are GC'd after this
+
+# Server-Sent Events notification stream (ASGI only, see notifications/stream.py)
+NOTIFICATION_STREAM = {
+    "POLL_INTERVAL": 2.0,   # seconds between batched DB polls
+    "HEARTBEAT": 20.0,      # seconds between keep-alive comments
+    "QUEUE_SIZE": 100,      # buffered events per connection
+    "BATCH_SIZE": 1000,     # max rows per poll
+    "POLL_MAX_BACKOFF": 60.0,  # longest wait between polls after failures
+    "TICKET_TTL": 30,       # seconds a stream ticket (?ticket=) stays valid
+}
+
+# Notification retention (manage.py prune_notifications)
+NOTIFICATION_RETENTION = {
+    "READ_DAYS": 30,       # delete read notifications older than this
+    "UNREAD_DAYS": 180,    # delete unread notifications older than this
+    "BATCH_SIZE": 5000,    # primary-key window per DELETE
+    "ARCHIVE_DIR": None,   # set to keep gzipped NDJSON copies of deleted rows
+}
+
+# Notification coalescing (notifications.inbox.notify): a notification of one of
+# these kinds is merged into the user's unread one of the same kind created
+# within the window; the merged row is re-created with a counter.
+NOTIFICATION_COALESCE_WINDOWS = {
+    "NEW_ORDER": timedelta(minutes=15),
+}
+# manage.py build_notification_digests collapses unread rows older than this.
+NOTIFICATION_DIGEST_AFTER = timedelta(hours=24)
+
+# Cached user lookups for JWT requests (users/cache.py)
+AUTH_USER_CACHE = {
+    "LOCAL_TTL": 10,       # seconds a per-process copy is kept (used while its version matches)
+    "LOCAL_SIZE": 10000,   # users kept in the per-process LRU
+    "SHARED_TTL": 300,     # seconds in the shared cache
+}
+
+# Response compression (regive/compression.py). CONTENT_TYPES maps a media
+# type, or a prefix ending in "/", to {} (compress), {"MIN_SIZE": n} or
+# False (never). Unlisted types are sent as-is.
+COMPRESSION = {
+    "ENABLED": os.getenv("COMPRESSION_ENABLED", "True") == "True",
+    "MIN_SIZE": 512,          # bytes; smaller bodies aren't worth a round of deflate
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,      # used only if the brotli package is installed
+    "CONTENT_TYPES": {
+        "application/json": {},
+        "application/x-ndjson": {},
+        "text/": {},
+        "text/csv": {},
+        # HTML pages carry CSRF tokens next to reflected input (BREACH)
+        "text/html": False,
+        # SSE frames must reach the client as written
+        "text/event-stream": False,
+    },
+}
+
+# Seconds public catalog pages stay in the cache, compressed (see
+# api.views.CatalogCacheMixin).
+CATALOG_CACHE_TIMEOUT = 30
+
+# Catalog facets (items.facets): upper bounds of the price buckets (the last
+# bucket is open-ended) and how long counts for one filter set are cached.
+# Item/category signals start a fresh cache generation on every change.
+CATALOG_PRICE_BUCKETS = (10, 25, 50, 100, 250)
+CATALOG_FACET_CACHE_TIMEOUT = 300
+
+# Radius search on items (?near=lat,lon&radius_km=, see items.geo). MAX_CELLS
+# bounds the geohash ranges per query; MAX_RESULTS keeps the nearest N.
+GEO_SEARCH = {
+    "DEFAULT_RADIUS_KM": 10,
+    "MAX_RADIUS_KM": 500,
+    "MAX_CELLS": 32,
+    "MAX_RESULTS": 500,
+}
+
+# Typeahead index for /api/autocomplete/ (items.autocomplete). Each process
+# loads SNAPSHOT (manage.py build_autocomplete_index) as the server starts
+# (WARM_ON_START) or, without one, builds the index from the database in the
+# background, then replays item/category changes from the shared cache
+# every SYNC_INTERVAL seconds. Keys start at each of the first MAX_WORDS
+# words of a name; prefixes matching more than SCAN_LIMIT keys get their top
+# results cached.
+AUTOCOMPLETE = {
+    "SNAPSHOT": Path(os.getenv("AUTOCOMPLETE_SNAPSHOT", BASE_DIR / "build" / "autocomplete.json")),
+    "MAX_WORDS": 3,
+    "LIMIT": 8,
+    "MAX_LIMIT": 20,
+    "SCAN_LIMIT": 1000,
+    "SYNC_INTERVAL": 1.0,
+    "WARM_ON_START": True,
+}
+
+# Trending items (items.trending): time-decayed popularity from orders,
+# wishlist adds, cart adds and reviews. Scores are stored relative to EPOCH;
+# after changing EPOCH or HALF_LIFE_HOURS run `refresh_trending --rebuild`.
+# `refresh_trending` (every few minutes) writes the TOP_K per category.
+TRENDING = {
+    "HALF_LIFE_HOURS": 72,
+    "EPOCH": "2026-01-01T00:00:00+00:00",
+    "WEIGHTS": {"order": 5.0, "wishlist": 2.0, "cart": 1.0, "review": 1.0},
+    "TOP_K": 50,
+    "MIN_SCORE": 0.01,
+}
+
+# Related items (items.related), rebuilt offline by build_related_items:
+# basket weights per source, neighbours kept per item, and the cap on items
+# per basket (a user's wishlist can be long; pairs grow with its square).
+RELATED_ITEMS = {
+    "WEIGHTS": {"order": 3.0, "cart": 2.0, "wishlist": 1.0},
+    "TOP_N": 12,
+    "MAX_BASKET": 50,
+}
+
+# Item page views (items.viewcounts) are buffered per worker and written by a
+# background thread every FLUSH_INTERVAL seconds, or sooner at MAX_PENDING
+# (item, day) entries. A worker killed without a clean exit loses what it
+# buffered since then. After a failed flush, retries back off up to
+# MAX_BACKOFF seconds; views of new items are dropped past MAX_BUFFERED entries.
+VIEW_COUNTS = {
+    "FLUSH_INTERVAL": 10,
+    "MAX_PENDING": 2000,
+    "MAX_BUFFERED": 50000,
+    "MAX_BACKOFF": 300,
+}
+
+# Wishlist price-drop / back-in-stock alerts (wishlist.alerts), sent by
+# manage.py send_wishlist_alerts once an item has gone QUIET_SECONDS without
+# another change, at most once per COOLDOWN_HOURS per item and kind.
+WISHLIST_ALERTS = {
+    "QUIET_SECONDS": 300,
+    "COOLDOWN_HOURS": 24,
+    "BATCH_SIZE": 2000,
+}
+
+# Admin changelists of big tables (regive/admin_changelists.py): unfiltered
+# lists use the table statistics' row estimate above ESTIMATE_ABOVE rows, and
+# related-object filter choices are cached for FILTER_CACHE_TIMEOUT seconds.
+ADMIN_CHANGELISTS = {
+    "ESTIMATE_ABOVE": 100000,
+    "FILTER_CACHE_TIMEOUT": 600,
+}
@@ -0,0 +1,15 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ReplicaTestRunner(DiscoverRunner):
+    """
+    Test runner that migrates the replicas' test databases too. In tests
+    each replica is a separate, empty database rather than a copy of the
+    primary, so it needs the tables that migrate otherwise leaves to
+    replication (DATABASE_REPLICAS_MIGRATE).
+    """
+
+    def setup_databases(self, **kwargs):
+        with override_settings(DATABASE_REPLICAS_MIGRATE=True):
+            return super().setup_databases(**kwargs)
@@ -1,19 +1,10 @@
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
 from django.views.generic import TemplateView
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
-
 urlpatterns = [
-    path("admin/", admin.site.urls),
-
     # API routes
     path("api/", include("api.urls")),
 
@@ -23,11 +14,6 @@ urlpatterns = [
     # dj-rest-auth registration (uses your custom serializer)
     path("api/auth/registration/", include("dj_rest_auth.registration.urls")),
 
-    # API schema + docs
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path("api/docs/swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
-    path("api/docs/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
-
     path(
         "",
         TemplateView.as_view(
@@ -38,6 +24,21 @@ urlpatterns = [
     ),
 ]
 
+# Admin and API docs; imported here so API-only workers never load them
+if not settings.API_ONLY:
+    from django.contrib import admin
+    from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
+
+    from api.schema import SchemaView
+
+    urlpatterns += [
+        path("admin/", admin.site.urls),
+        # API schema + docs (schema precomputed by manage.py build_openapi_schema)
+        path("api/schema/", SchemaView.as_view(), name="schema"),
+        path("api/docs/swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+        path("api/docs/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    ]
+
 # serve media
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
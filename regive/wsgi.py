@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'regive.settings')
 
 application = get_wsgi_application()
+
+# load the autocomplete index now rather than on the first keystroke
+from items import autocomplete  # noqa: E402 - needs the app registry
+
+autocomplete.warm()
@@ -19,8 +19,13 @@ class EmailBackend(ModelBackend):
         try:
             user = UserModel.objects.get(email__iexact=email)
         except UserModel.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            # and can't be told apart by timing.
+            UserModel().set_password(password)
             return None
 
+        # check_password re-hashes and saves the password if the configured
+        # hasher or its parameters changed since it was stored.
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
 
@@ -0,0 +1,141 @@
+"""
+Cached user lookups for token authentication.
+
+Two tiers:
+- the shared Django cache, keyed by a per-user version number;
+- a small per-process LRU of the users it returned, kept for up to LOCAL_TTL
+  seconds and used only while the shared version number still matches, so a
+  hit costs one cache GET and no unpickling.
+
+Saving or deleting a user or their profile bumps the version once the
+transaction commits (see users.signals), which orphans every cached copy in
+every process at once. Bumping any earlier would let a request that reloads
+the old, still committed row cache it under the new version. Users are keyed
+by SIMPLE_JWT's USER_ID_FIELD, the field their tokens name them by, and
+loaded together with their profile (select_related), so serializers that
+nest UserSerializer don't issue a second query.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt import settings as jwt_settings
+
+from users.models import CustomUser
+
+
+def user_cache_setting(name, default):
+    return getattr(settings, "AUTH_USER_CACHE", {}).get(name, default)
+
+
+LOCAL_TTL = user_cache_setting("LOCAL_TTL", 10)
+LOCAL_SIZE = user_cache_setting("LOCAL_SIZE", 10000)
+SHARED_TTL = user_cache_setting("SHARED_TTL", 300)
+
+
+class LocalUserCache:
+    """Thread-safe LRU of user_id -> (expires_at, version, user)."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def set(self, user_id, version, user):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + LOCAL_TTL, version, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_users = LocalUserCache(LOCAL_SIZE)
+
+
+def version_key(user_id):
+    return f"users:auth-version:{user_id}"
+
+
+def user_key(user_id, version):
+    return f"users:auth:{user_id}:{version}"
+
+
+def user_id_field():
+    # through the module: simplejwt replaces api_settings when SIMPLE_JWT changes
+    return jwt_settings.api_settings.USER_ID_FIELD
+
+
+def auth_id(user):
+    """The user's id as its tokens carry it (SIMPLE_JWT["USER_ID_FIELD"])."""
+    return getattr(user, user_id_field())
+
+
+def auth_id_of(pk):
+    """auth_id() of the user with primary key `pk`, or None if there is none."""
+    field = user_id_field()
+    if field in ("pk", CustomUser._meta.pk.name):
+        return pk  # no query in the usual setup
+    return CustomUser.objects.filter(pk=pk).values_list(field, flat=True).first()
+
+
+def get_cached_user(user_id):
+    """
+    Return the user (with profile loaded) or None if it does not exist.
+    `user_id` is the token's USER_ID_FIELD value. The returned instance (and
+    its profile) is a private copy, safe to modify.
+    """
+    user_id = str(user_id)  # token claims carry ids as strings
+    version = cache.get(version_key(user_id), 0)
+    entry = local_users.get(user_id)
+    if entry is not None and entry[1] == version:
+        return copy.deepcopy(entry[2])
+
+    user = cache.get(user_key(user_id, version))
+    if user is None:
+        lookup = {user_id_field(): user_id}
+        user = CustomUser.objects.select_related("profile").filter(**lookup).first()
+        if user is None:
+            return None
+        cache.set(user_key(user_id, version), user, SHARED_TTL)
+
+    local_users.set(user_id, version, user)
+    return copy.deepcopy(user)
+
+
+def invalidate_user_on_commit(user_id):
+    """invalidate_user() once the current transaction commits (at once outside one)."""
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+def invalidate_user(user_id):
+    """Drop every cached copy of the user, in this and all other processes."""
+    user_id = str(user_id)
+    local_users.discard(user_id)
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        # No version yet: start above the implicit 0 so old entries are orphaned.
+        cache.set(version_key(user_id), 1, None)
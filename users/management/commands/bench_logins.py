@@ -0,0 +1,113 @@
+import logging
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+
+
+def save_profile_always(sender, instance, **kwargs):
+    """The previous users.signals.save_profile, for comparison."""
+    instance.profile.save()
+
+
+# Hashing dominates a real login; a fast hasher leaves the database work visible.
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Log in repeatedly through /api/auth/login/ (single thread, so rates are "
+        "per core) and report queries per login and logins/second, with the old "
+        "always-save-profile signal and with the current dirty-tracking one, then "
+        "time failed logins for unknown emails and wrong passwords. Rate limits "
+        "are off during the run. Benchmark users are created with "
+        "bulk_create_users and removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=4, help="Logins per user per run.")
+        parser.add_argument("--failures", type=int, default=20, help="Failed logins timed per kind.")
+        parser.add_argument(
+            "--hasher",
+            choices=["fast", "configured"],
+            default="fast",
+            help="'fast' (MD5) isolates the database work; 'configured' uses PASSWORD_HASHERS.",
+        )
+
+    def handle(self, *args, **options):
+        password = "bench-login-password"
+        overrides = {"ALLOWED_HOSTS": ["testserver"], "LOGIN_RATE_LIMITS": {}}
+        if options["hasher"] == "fast":
+            overrides["PASSWORD_HASHERS"] = FAST_HASHERS
+        with override_settings(**overrides):
+            started = time.perf_counter()
+            hashed = make_password(password)
+            users = CustomUser.objects.bulk_create_users(
+                [
+                    CustomUser(email=f"bench-login-{n}@regive.local", full_name="Benchmark", password=hashed)
+                    for n in range(options["users"])
+                ]
+            )
+            created_in = time.perf_counter() - started
+            self.stdout.write(f"Created {len(users)} users + profiles in {created_in * 1000:.1f} ms")
+
+            try:
+                post_save.connect(save_profile_always, sender=CustomUser, dispatch_uid="bench_logins")
+                try:
+                    before = self.run(users, password, options["rounds"])
+                finally:
+                    post_save.disconnect(sender=CustomUser, dispatch_uid="bench_logins")
+                after = self.run(users, password, options["rounds"])
+                unknown_ms = self.time_failures("nobody-{n}@regive.local", password, options["failures"])
+                wrong_ms = self.time_failures(users[0].email, "not-the-password", options["failures"])
+            finally:
+                with transaction.atomic():
+                    CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.stdout.write(f"{len(users) * options['rounds']} logins per run ({connection.vendor}, {options['hasher']} hasher)")
+        for label, (rate, queries) in (("always save profile", before), ("dirty tracking", after)):
+            self.stdout.write(f"  {label:<20} {rate:8.1f} logins/s   {queries:5.1f} queries/login")
+        self.stdout.write(
+            self.style.SUCCESS(f"Saved {before[1] - after[1]:.1f} queries per login, {after[0] / before[0]:.2f}x throughput")
+        )
+        self.stdout.write(f"Failed logins: unknown email {unknown_ms:.2f} ms, wrong password {wrong_ms:.2f} ms (mean)")
+
+    def run(self, users, password, rounds):
+        client = APIClient()
+        logins = 0
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for user in users:
+                    response = client.post(
+                        "/api/auth/login/", {"email": user.email, "password": password}, format="json"
+                    )
+                    if response.status_code != 200:
+                        raise RuntimeError(f"Login returned {response.status_code}: {response.content[:200]}")
+                    logins += 1
+            elapsed = time.perf_counter() - started
+        return logins / elapsed, len(queries) / logins
+
+    def time_failures(self, email_template, password, count):
+        client = APIClient()
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)  # otherwise one "Bad Request" line per attempt
+        try:
+            started = time.perf_counter()
+            for n in range(count):
+                response = client.post(
+                    "/api/auth/login/", {"email": email_template.format(n=n), "password": password}, format="json"
+                )
+                if response.status_code != 400:
+                    raise RuntimeError(f"Failed login returned {response.status_code}")
+            return (time.perf_counter() - started) * 1000 / count
+        finally:
+            request_logger.setLevel(level)
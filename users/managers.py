@@ -1,4 +1,5 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 
@@ -43,3 +44,31 @@ class CustomUserManager(BaseUserManager):
             password=password,
             **extra_fields
         )
+
+    def bulk_create_users(self, users, batch_size=None):
+        """
+        Insert many users and their profiles with two bulk INSERTs in one
+        transaction. Model signals do not run: passwords must already be
+        hashed (make_password / set_password), and superuser defaults are
+        applied here.
+        """
+        for user in users:
+            user.email = self.normalize_email(user.email)
+            if user.is_superuser:
+                user.role = self.model.Roles.ADMIN
+                user.is_verified = True
+
+        Profile = self.model._meta.get_field("profile").related_model
+        with transaction.atomic(using=self.db):
+            users = self.bulk_create(users, batch_size=batch_size)
+            if any(user.pk is None for user in users):
+                # MySQL does not return ids from a bulk INSERT
+                ids = dict(
+                    self.filter(email__in=[user.email for user in users]).values_list("email", "id")
+                )
+                for user in users:
+                    user.pk = ids[user.email]
+            Profile.objects.using(self.db).bulk_create(
+                [Profile(user=user) for user in users], batch_size=batch_size
+            )
+        return users
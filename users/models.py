@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 import re
@@ -47,6 +47,15 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        # New users get their Profile from users.signals.create_profile;
+        # insert both or neither.
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
     
 class Profile(models.Model):
     user = models.OneToOneField(
@@ -59,16 +68,38 @@ class Profile(models.Model):
     avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True)
 
+    # Fields whose changes are tracked, so saving an unchanged profile is a no-op.
+    TRACKED_FIELDS = ("phone_number", "bio", "avatar", "birth_date")
+
     def __str__(self):
         return f"Profile of {self.user.full_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def changed_fields(self):
+        """
+        Tracked fields that differ from what was loaded or last saved.
+        Unsaved profiles, or ones built without loading, count as all changed.
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        if self._state.adding or loaded is None:
+            return set(self.TRACKED_FIELDS)
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
     def normalize_phone(self, phone):
         return re.sub(r"\D", "", phone or "")
 
     def save(self, *args, **kwargs):
-        if self.phone_number:
+        if self.phone_number and "phone_number" in self.changed_fields():
             self.phone_number = self.normalize_phone(self.phone_number)
         super().save(*args, **kwargs)
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
 
     class Meta:
         verbose_name = "Profile"
@@ -0,0 +1,53 @@
+"""
+Token-bucket rate limiting for the login endpoint, stored in Django's cache.
+
+Each bucket holds up to CAPACITY tokens and refills at RATE tokens per
+second; every login attempt takes one. Buckets are kept per client IP and
+per email, so one address can't spray many accounts and many addresses
+can't hammer one account. Limits come from LOGIN_RATE_LIMITS and are read
+on each call.
+
+The read-modify-write is not atomic across processes: under a burst a few
+extra attempts may get through. That is fine for slowing down credential
+stuffing and avoids a lock round-trip per login.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def bucket_key(scope, ident):
+    digest = hashlib.sha256(ident.encode()).hexdigest()[:32]
+    return f"ratelimit:login:{scope}:{digest}"
+
+
+def take_token(scope, ident, capacity, rate):
+    """
+    Take one token from the bucket. Returns 0 if allowed, otherwise the
+    number of seconds until a token is available.
+    """
+    key = bucket_key(scope, ident)
+    now = time.time()
+    tokens, stamp = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    # an untouched bucket is full again after capacity / rate seconds
+    cache.set(key, (tokens - 1, now), int(capacity / rate) + 1)
+    return 0
+
+
+def check_login_rate(ip, email):
+    """
+    Charge one attempt to the IP and email buckets. Returns 0 if the attempt
+    may proceed, otherwise the seconds to wait before retrying.
+    """
+    limits = getattr(settings, "LOGIN_RATE_LIMITS", None) or {}
+    waits = []
+    for scope, ident in (("IP", ip), ("EMAIL", (email or "").strip().lower())):
+        config = limits.get(scope)
+        if config and ident:
+            waits.append(take_token(scope, ident, config["CAPACITY"], config["RATE"]))
+    return max(waits, default=0)
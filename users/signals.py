@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from users.models import CustomUser, Profile
+from users.cache import auth_id, auth_id_of, invalidate_user_on_commit
 
 @receiver(post_save, sender=CustomUser)
 def create_profile(sender, instance, created, **kwargs):
@@ -8,14 +9,23 @@ def create_profile(sender, instance, created, **kwargs):
     Automatically create a Profile whenever a new CustomUser is created.
     """
     if created:
-        Profile.objects.create(user=instance)
+        Profile.objects.using(instance._state.db).create(user=instance)
 
 @receiver(post_save, sender=CustomUser)
-def save_profile(sender, instance, **kwargs):
+def save_profile(sender, instance, created, **kwargs):
     """
-    Save the user’s profile whenever the user object is saved.
+    Save the user’s profile along with the user, if it was loaded and edited.
+    Saves that never touched the profile (e.g. last_login on every login)
+    cost no profile queries.
     """
-    instance.profile.save()
+    if created or not CustomUser.profile.is_cached(instance):
+        return
+    profile = CustomUser.profile.related.get_cached_value(instance)
+    if profile is None:
+        return
+    changed = profile.changed_fields()
+    if changed:
+        profile.save(update_fields=changed)
 
 @receiver(pre_save, sender=CustomUser)
 def set_superuser_defaults(sender, instance, **kwargs):
@@ -27,3 +37,24 @@ def set_superuser_defaults(sender, instance, **kwargs):
     if instance.is_superuser:
         instance.role = CustomUser.Roles.ADMIN
         instance.is_verified = True
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop cached copies used by token authentication (users.cache), once the
+    change is committed. Login only touches last_login, which nothing reads
+    from the cache.
+    """
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_user_on_commit(auth_id(instance))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_user_profile(sender, instance, **kwargs):
+    user_id = auth_id_of(instance.user_id)
+    if user_id is not None:  # None: deleted along with its user, which invalidated the cache
+        invalidate_user_on_commit(user_id)
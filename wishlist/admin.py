@@ -1,11 +1,13 @@
 from django.contrib import admin
 
+from regive.admin_changelists import LargeChangelistMixin
 from wishlist.models import Wishlist
 
 
 @admin.register(Wishlist)
-class WishlistAdmin(admin.ModelAdmin):
+class WishlistAdmin(LargeChangelistMixin, admin.ModelAdmin):
     list_display = ("user", "item", "added_at")
+    list_select_related = ("user", "item")
     list_filter = ("added_at",)
     search_fields = ("user__email", "user__full_name", "item__name")
     ordering = ("-added_at",)
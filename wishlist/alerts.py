@@ -0,0 +1,195 @@
+"""
+Price-drop and back-in-stock alerts for wishlisted items.
+
+Saving an Item compares its price and stock with the stored row (read in
+pre_save by items.signals, in the same query as the facet columns) and, after commit, arms a WishlistAlert
+if the price went down or the stock went up from 0. Arming is an UPDATE of
+that item's alert row, whatever the number of wishlisters; nothing is
+fanned out during the save.
+
+`manage.py send_wishlist_alerts` (run every minute or so) sends the alerts
+that are due:
+
+- debounced: an alert waits until its item has gone QUIET_SECONDS without
+  another change, so a seller editing a price several times sends one
+  alert, with the final price;
+- at most once per COOLDOWN_HOURS per item and kind;
+- re-checked against the item when sent: a price that went back up, or
+  stock sold out again, sends nothing.
+
+Wishlisters are read in keyset batches of BATCH_SIZE (id > last id, on the
+wishlist item index), and each batch gets its notifications from one
+INSERT ... SELECT over the same id range. Every batch commits with the
+alert's cursor, so an interrupted run resumes where it stopped without
+notifying anyone twice. The inserts skip the Notification signals: unread
+counts are invalidated per batch, and open streams pick the rows up on
+their next poll (notifications.stream).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from items.models import Item
+from notifications.inbox import invalidate_unread_count
+from notifications.models import Notification
+from wishlist.models import Wishlist, WishlistAlert
+
+
+SEND_LOCK = "wishlist:alerts:lock"
+
+WATCHED_FIELDS = {"price", "stock"}
+
+
+def alert_settings():
+    return {
+        "QUIET_SECONDS": 300,
+        "COOLDOWN_HOURS": 24,
+        "BATCH_SIZE": 2000,
+        **getattr(settings, "WISHLIST_ALERTS", {}),
+    }
+
+
+# -- detecting changes --------------------------------------------------------------
+
+def watches(update_fields):
+    return update_fields is None or bool(WATCHED_FIELDS & set(update_fields))
+
+
+def changes(previous, item):
+    """[(kind, previous price)] for the alerts a save from `previous` to `item` arms."""
+    if previous is None:
+        return []
+    found = []
+    if previous["price"] is not None and item.price is not None and item.price < previous["price"]:
+        found.append((WishlistAlert.Kinds.PRICE_DROP, previous["price"]))
+    if previous["stock"] == 0 and item.stock:
+        found.append((WishlistAlert.Kinds.BACK_IN_STOCK, None))
+    return found
+
+
+def arm(item_id, kind, previous_price=None, when=None):
+    """
+    Mark the item's alert of `kind` pending, changed at `when`. A pending
+    alert keeps the price from its first change.
+    """
+    when = when or timezone.now()
+    if not Wishlist.objects.filter(item_id=item_id).exists():
+        return
+    alerts = WishlistAlert.objects.filter(item_id=item_id, kind=kind)
+    if alerts.filter(pending=True).update(changed_at=when):
+        return
+    if alerts.update(pending=True, previous_price=previous_price, changed_at=when, cursor=0):
+        return
+    try:
+        with transaction.atomic():
+            WishlistAlert.objects.create(item_id=item_id, kind=kind, previous_price=previous_price, changed_at=when)
+    except IntegrityError:  # created concurrently
+        alerts.update(pending=True, changed_at=when)
+
+
+def arm_on_commit(item_id, found):
+    when = timezone.now()
+    for kind, previous_price in found:
+        transaction.on_commit(lambda kind=kind, price=previous_price: arm(item_id, kind, price, when))
+
+
+# -- sending ------------------------------------------------------------------------
+
+def due(now=None, options=None):
+    options = options or alert_settings()
+    now = now or timezone.now()
+    return WishlistAlert.objects.filter(
+        Q(sent_at__isnull=True) | Q(sent_at__lte=now - timedelta(hours=options["COOLDOWN_HOURS"])),
+        pending=True,
+        changed_at__lte=now - timedelta(seconds=options["QUIET_SECONDS"]),
+    ).order_by("changed_at")
+
+
+def still_applies(alert, item):
+    if item is None or item["status"] != "PUBLISHED":
+        return False
+    if alert.kind == WishlistAlert.Kinds.PRICE_DROP:
+        return item["price"] is not None and alert.previous_price is not None and item["price"] < alert.previous_price
+    return item["stock"] > 0
+
+
+def text(alert, item):
+    """(title, message) of the notification."""
+    if alert.kind == WishlistAlert.Kinds.PRICE_DROP:
+        return (
+            "Price drop",
+            f"{item['name']} on your wishlist is now ₦{item['price']:,.2f} (was ₦{alert.previous_price:,.2f}).",
+        )
+    return "Back in stock", f"{item['name']} on your wishlist is back in stock."
+
+
+def insert_notifications(item_id, after, last, kind, title, message):
+    """
+    One Notification per wishlister of the item with after < Wishlist.id <=
+    last, as a single INSERT ... SELECT: bulk_create() spends far longer
+    preparing each row's values than the database spends inserting them.
+    """
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(column) for column in ("user_id", "kind", "title", "message", "count", "is_read", "created_at"))
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(Notification._meta.db_table)} ({columns}) "
+            f"SELECT {qn('user_id')}, %s, %s, %s, 1, %s, %s FROM {qn(Wishlist._meta.db_table)} "
+            f"WHERE {qn('item_id')} = %s AND {qn('id')} > %s AND {qn('id')} <= %s",
+            [kind, title, message, False, created_at, item_id, after, last],
+        )
+
+
+def send(alert, now=None, options=None):
+    """Notify the item's wishlisters of one alert. Returns the number notified."""
+    options = options or alert_settings()
+    now = now or timezone.now()
+    item = Item.objects.filter(pk=alert.item_id).values("name", "price", "stock", "status").first()
+    if not still_applies(alert, item):
+        WishlistAlert.objects.filter(pk=alert.pk, changed_at=alert.changed_at).update(pending=False, cursor=0)
+        return 0
+
+    title, message = text(alert, item)
+    wishlisters = Wishlist.objects.filter(item_id=alert.item_id).order_by("id").values_list("id", "user_id")
+    cursor, sent = alert.cursor, 0
+    while True:
+        with transaction.atomic():
+            batch = list(wishlisters.filter(id__gt=cursor)[: options["BATCH_SIZE"]])
+            if not batch:
+                break
+            insert_notifications(alert.item_id, cursor, batch[-1][0], alert.kind, title, message)
+            cursor = batch[-1][0]
+            WishlistAlert.objects.filter(pk=alert.pk).update(cursor=cursor)
+        invalidate_unread_count(*(user_id for _, user_id in batch))
+        sent += len(batch)
+
+    # the next round compares with the price just announced; a change armed
+    # during the fan-out keeps the alert pending for after the cooldown
+    announced = item["price"] if alert.kind == WishlistAlert.Kinds.PRICE_DROP else None
+    WishlistAlert.objects.filter(pk=alert.pk).update(cursor=0, sent_at=now, previous_price=announced)
+    WishlistAlert.objects.filter(pk=alert.pk, changed_at=alert.changed_at).update(pending=False)
+    return sent
+
+
+def send_due(now=None):
+    """
+    Send every due alert. Returns (alerts sent, notifications created), or
+    None if another run is in progress.
+    """
+    options = alert_settings()
+    if not cache.add(SEND_LOCK, 1, 15 * 60):
+        return None
+    try:
+        alerts = notified = 0
+        for alert in due(now, options):
+            sent = send(alert, now, options)
+            alerts += bool(sent)
+            notified += sent
+        return alerts, notified
+    finally:
+        cache.delete(SEND_LOCK)
@@ -0,0 +1,75 @@
+"""
+Set-based wishlist operations for the bulk and compact endpoints: each
+touches a whole list of items in a fixed number of queries.
+
+Adds run under a lock on the user's row (lock_wishlist), taken by the
+single-item add as well: the bulk INSERT ignores rows that already exist,
+so it only knows which rows it added, and which counters to bump, if no
+other add of the same user can commit in between.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from items import stats, trending
+from items.models import Item
+from wishlist.models import Wishlist
+
+
+# item ids accepted per request
+MAX_ITEMS = 500
+
+
+def lock_wishlist(user):
+    """Hold off other wishlist adds of `user` until the transaction ends."""
+    get_user_model()._base_manager.select_for_update().filter(pk=user.pk).values_list("pk").first()
+
+
+def add(user, item_ids):
+    """
+    Add existing items to the user's wishlist with one INSERT that ignores
+    rows already there. Returns the ids added, ascending.
+    """
+    with transaction.atomic():
+        lock_wishlist(user)
+        new = sorted(
+            Item.objects.filter(pk__in=set(item_ids))
+            .exclude(wishlisted_by__user=user)
+            .order_by()
+            .values_list("pk", flat=True)
+        )
+        # bulk_create() sends no post_save; count the adds as items.signals would
+        Wishlist.objects.bulk_create([Wishlist(user=user, item_id=item_id) for item_id in new], ignore_conflicts=True)
+        trending.record_many_on_commit(new, trending.weight("wishlist"))
+        stats.adjust_on_commit(new, "wishlist_count", 1)
+    return new
+
+
+def remove(user, item_ids):
+    """
+    Remove items from the user's wishlist in one DELETE. Returns the number
+    removed.
+    """
+    with transaction.atomic():
+        rows = Wishlist.objects.filter(user=user, item_id__in=set(item_ids)).select_for_update()
+        removed = list(rows.values_list("item_id", flat=True))
+        if removed:
+            # raw: QuerySet.delete() would load the rows and signal each one
+            table, qn = Wishlist._meta.db_table, connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {qn(table)} WHERE {qn('user_id')} = %s AND {qn('item_id')} IN ({', '.join(['%s'] * len(removed))})",
+                    [user.pk, *removed],
+                )
+        stats.adjust_on_commit(removed, "wishlist_count", -1)
+    return len(removed)
+
+
+def item_ids(user):
+    """Ids of every item on the user's wishlist, most recently added first."""
+    return list(Wishlist.objects.filter(user=user).values_list("item_id", flat=True))
+
+
+def wishlisted(user, item_ids):
+    """The subset of `item_ids` on the user's wishlist, ascending."""
+    rows = Wishlist.objects.filter(user=user, item_id__in=set(item_ids)).order_by("item_id")
+    return list(rows.values_list("item_id", flat=True))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wishlist import alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Notify wishlisters of price drops and restocks that are due (see "
+        "WISHLIST_ALERTS). Run periodically (e.g. every minute from cron)."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = alerts.send_due()
+        if result is None:
+            self.stdout.write(self.style.WARNING("Another run is sending alerts; skipped."))
+            return
+        sent, notified = result
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {sent} alert(s) to {notified} wishlister(s) in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_item_views'),
+        ('wishlist', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WishlistAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('PRICE_DROP', 'Price drop'), ('BACK_IN_STOCK', 'Back in stock')], max_length=20)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('changed_at', models.DateTimeField()),
+                ('pending', models.BooleanField(default=True)),
+                ('cursor', models.BigIntegerField(default=0)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_alerts', to='items.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pending', 'changed_at'], name='wishlist_wi_pending_3bed3b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item', 'kind'), name='unique_wishlist_alert')],
+            },
+        ),
+    ]
@@ -22,3 +22,35 @@ class Wishlist(models.Model):
     def __str__(self):
         return f"{self.user.email} → {self.item.name}"
 
+
+
+class WishlistAlert(models.Model):
+    """
+    A price drop or restock of a wishlisted item, waiting to be announced to
+    the item's wishlisters (wishlist.alerts). One row per item and kind:
+    further changes before it is sent only move `changed_at`.
+    """
+
+    class Kinds(models.TextChoices):
+        PRICE_DROP = "PRICE_DROP", "Price drop"
+        BACK_IN_STOCK = "BACK_IN_STOCK", "Back in stock"
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="wishlist_alerts")
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    # price when the change was first seen (PRICE_DROP); the alert is sent
+    # only if the item is still cheaper than this
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    changed_at = models.DateTimeField()
+    pending = models.BooleanField(default=True)
+    # last Wishlist id notified, so an interrupted fan-out resumes after it
+    cursor = models.BigIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["item", "kind"], name="unique_wishlist_alert"),
+        ]
+        indexes = [models.Index(fields=["pending", "changed_at"])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.item_id}"
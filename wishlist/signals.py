@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from items.models import Item
+from items.signals import remember_columns, stored_values
+from wishlist import alerts
+
+
+# Price drops and restocks arm a wishlist alert (wishlist.alerts); the
+# stored price and stock are read before the write by items.signals.
+remember_columns(alerts.WATCHED_FIELDS, alerts.watches)
+
+
+@receiver(post_save, sender=Item)
+def arm_wishlist_alerts(sender, instance, created, update_fields=None, **kwargs):
+    if created or not alerts.watches(update_fields):
+        return
+    found = alerts.changes(stored_values(instance), instance)
+    if found:
+        alerts.arm_on_commit(instance.pk, found)